@@ -0,0 +1,227 @@
+"""
+app/admission.py
+─────────────────
+Admission control and deadline-aware load shedding for prediction routes.
+
+Each admitted route gets an AdmissionController that:
+  - caps the number of in-flight requests with an adaptive (AIMD) limit,
+    grown while observed latency stays under ADMISSION_TARGET_LATENCY_MS
+    and cut back multiplicatively when it exceeds it;
+  - parks excess requests in a bounded FIFO queue;
+  - sheds a request immediately (503 + Retry-After) when the queue is full
+    or the expected queue wait exceeds the request's deadline, instead of
+    letting it pile up in the threadpool / DB pool behind get_db.
+
+The deadline comes from the client `X-Request-Deadline-ms` header (a budget
+in milliseconds, relative to arrival) or ADMISSION_DEFAULT_DEADLINE_MS.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Deadline-ms"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, route: str, reason: str, retry_after_s: int):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionController:
+    """Adaptive concurrency limiter with a bounded, deadline-aware wait queue."""
+
+    def __init__(
+        self,
+        route: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        target_latency_ms: float,
+        backoff: float = 0.9,
+        smoothing: float = 0.2,
+    ):
+        self.route = route
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._limit = float(min(max(initial_limit, self._min_limit), self._max_limit))
+        self._max_queue = max_queue
+        self._target_ms = target_latency_ms
+        self._backoff = backoff
+        self._alpha = smoothing
+
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._latency_ewma_ms: float | None = None
+
+        # Counters (reported via /v1/metrics/admission)
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self._queue_wait_ewma_ms = 0.0
+
+    # ── Introspection ──────────────────────────────────────────
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait_ms(self, position: int) -> float:
+        """Estimated wait for the request at 1-based queue `position`."""
+        service_ms = self._latency_ewma_ms if self._latency_ewma_ms is not None else self._target_ms
+        return position * service_ms / self.limit
+
+    def stats(self) -> dict:
+        return {
+            "route": self.route,
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed_queue_full + self.shed_deadline,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "avg_queue_wait_ms": round(self._queue_wait_ewma_ms, 3),
+            "expected_queue_wait_ms": round(self.expected_wait_ms(len(self._waiters) + 1), 3),
+            "avg_latency_ms": round(self._latency_ewma_ms or 0.0, 3),
+        }
+
+    # ── Acquire / release ──────────────────────────────────────
+
+    async def acquire(self, deadline_ms: float) -> float:
+        """
+        Wait for a slot. Returns the time spent queued (ms).
+        Raises AdmissionRejected if the request should be shed.
+        """
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            self._record_admit(0.0)
+            return 0.0
+
+        position = len(self._waiters) + 1
+        expected_ms = self.expected_wait_ms(position)
+        if len(self._waiters) >= self._max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(self.route, "queue full", self._retry_after(expected_ms))
+        if expected_ms > deadline_ms:
+            self.shed_deadline += 1
+            raise AdmissionRejected(self.route, "deadline", self._retry_after(expected_ms))
+
+        t0 = time.perf_counter()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=max(deadline_ms, 0.0) / 1000)
+        except BaseException as exc:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as the wait ended.
+                if not isinstance(exc, asyncio.TimeoutError):
+                    self._release_slot()
+                    raise
+            else:
+                fut.cancel()
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+                if not isinstance(exc, asyncio.TimeoutError):
+                    raise
+                self.shed_deadline += 1
+                raise AdmissionRejected(
+                    self.route, "deadline", self._retry_after(self.expected_wait_ms(position))
+                ) from None
+
+        waited_ms = (time.perf_counter() - t0) * 1000
+        self._record_admit(waited_ms)
+        return waited_ms
+
+    def release(self, latency_ms: float) -> None:
+        """Return a slot and feed the observed latency into the limit."""
+        if self._latency_ewma_ms is None:
+            self._latency_ewma_ms = latency_ms
+        else:
+            self._latency_ewma_ms += self._alpha * (latency_ms - self._latency_ewma_ms)
+
+        if latency_ms <= self._target_ms:
+            self._limit = min(self._max_limit, self._limit + 1.0 / self._limit)
+        else:
+            self._limit = max(self._min_limit, self._limit * self._backoff)
+
+        self._release_slot()
+
+    # ── Internals ──────────────────────────────────────────────
+
+    def _release_slot(self) -> None:
+        self._in_flight -= 1
+        while self._waiters and self._in_flight < self.limit:
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            self._in_flight += 1       # slot is handed directly to the waiter
+            fut.set_result(None)
+
+    def _record_admit(self, waited_ms: float) -> None:
+        self.admitted += 1
+        self._queue_wait_ewma_ms += self._alpha * (waited_ms - self._queue_wait_ewma_ms)
+
+    @staticmethod
+    def _retry_after(expected_ms: float) -> int:
+        return max(1, math.ceil(expected_ms / 1000))
+
+
+# ── Per-route registry ────────────────────────────────────────
+_controllers: dict[str, AdmissionController] = {}
+
+
+def get_admission_controller(path: str) -> AdmissionController | None:
+    """Returns the controller for `path`, or None if the route is not admission-controlled."""
+    if not settings.ADMISSION_ENABLED or path not in settings.ADMISSION_ROUTES:
+        return None
+    controller = _controllers.get(path)
+    if controller is None:
+        controller = AdmissionController(
+            route=path,
+            initial_limit=settings.ADMISSION_INITIAL_CONCURRENCY,
+            min_limit=settings.ADMISSION_MIN_CONCURRENCY,
+            max_limit=settings.ADMISSION_MAX_CONCURRENCY,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            target_latency_ms=settings.ADMISSION_TARGET_LATENCY_MS,
+        )
+        _controllers[path] = controller
+    return controller
+
+
+def admission_stats() -> list[dict]:
+    """Snapshot of every controller created so far."""
+    return [c.stats() for c in _controllers.values()]
+
+
+def request_deadline_ms(header_value: str | None) -> float:
+    """Parses the deadline header, falling back to the configured default."""
+    if header_value:
+        try:
+            value = float(header_value)
+            if value >= 0:
+                return value
+        except ValueError:
+            logger.debug(f"Ignoring malformed {DEADLINE_HEADER}: {header_value!r}")
+    return settings.ADMISSION_DEFAULT_DEADLINE_MS
@@ -0,0 +1,416 @@
+"""
+app/alerts.py
+──────────────
+In-process alert rules evaluated over the live score stream.
+
+The prediction routes hand every scored request (or whole batch) to
+`observe_alerts()`. Rules are declared as JSON in ALERT_RULES_PATH, e.g.:
+
+    [
+      {"name": "hot-host", "kind": "anomaly", "field": "anomaly_score",
+       "op": ">", "threshold": 0.8, "group_by": "host", "consecutive": 5},
+      {"name": "fraud-burst", "kind": "fraud", "field": "fraud_probability",
+       "op": ">", "threshold": 0.9, "group_by": "merchant_type",
+       "count": 21, "window_s": 60}
+    ]
+
+  - consecutive rules fire when `consecutive` samples in a row for the same
+    key match; they re-arm once a non-matching sample breaks the streak.
+  - count rules fire when at least `count` matching samples for the same key
+    fall within the last `window_s` seconds (to bucket resolution); the
+    key's window is cleared on firing, so it fires again only after another
+    `count` matches.
+
+Each rule is compiled once: the threshold comparison runs as one numpy
+operation over a batch, and only then are rows grouped by key. State per
+key is O(1): a streak counter, or a ring of ALERT_WINDOW_BUCKETS counts
+covering the window. Keys are held in a per-rule LRU capped at
+ALERT_MAX_KEYS_PER_RULE, so memory stays bounded however many hosts or
+merchants appear. Rows whose group value is missing are skipped by grouped
+rules; rules without `group_by` use a single global key.
+
+Fired alerts go into a bounded queue drained by a dispatcher thread that
+delivers them to the configured sinks (log / file / webhook), so a slow
+webhook never adds request latency. Alerts beyond ALERT_QUEUE_SIZE are
+dropped and counted. GET /v1/metrics/alerts exposes the counters and the
+most recent alerts.
+"""
+import json
+import logging
+import operator
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+import httpx
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+RULE_FIELDS = {
+    "fraud": ("fraud_probability", "transaction_amount", "time_delta"),
+    "anomaly": ("anomaly_score", "response_time", "error_rate", "cpu_usage", "memory_usage"),
+}
+RULE_GROUPS = {
+    "fraud": ("merchant_type", "country", "device_type", "entity_id"),
+    "anomaly": ("host",),
+}
+GLOBAL_KEY = "*"
+
+Sink = Callable[[dict], None]
+
+
+# ── Rules ─────────────────────────────────────────────────────
+
+class _Window:
+    """Matches per key over the last `window_s`, as a ring of fixed-width buckets."""
+
+    __slots__ = ("counts", "epochs")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.epochs = [-1] * n_buckets
+
+    def add(self, epoch: int, n: int) -> int:
+        """Adds `n` matches in bucket `epoch` and returns the windowed total."""
+        size = len(self.counts)
+        slot = epoch % size
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = 0
+        self.counts[slot] += n
+        horizon = epoch - size
+        return sum(c for c, e in zip(self.counts, self.epochs) if e > horizon)
+
+    def clear(self) -> None:
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+
+
+class AlertRule:
+    """One compiled rule plus its per-key state."""
+
+    def __init__(self, spec: dict, max_keys: int, n_buckets: int):
+        try:
+            self.name = str(spec["name"])
+            self.kind = spec["kind"]
+            self.field = spec["field"]
+            self.op = spec.get("op", ">")
+            self.threshold = float(spec["threshold"])
+        except KeyError as exc:
+            raise ValueError(f"Alert rule {spec!r} is missing {exc.args[0]!r}") from None
+        self.group_by = spec.get("group_by")
+        self.consecutive = spec.get("consecutive")
+        self.count = spec.get("count")
+        self.window_s = spec.get("window_s")
+
+        if self.kind not in RULE_FIELDS:
+            raise ValueError(f"Alert rule {self.name!r}: unknown kind {self.kind!r}")
+        if self.field not in RULE_FIELDS[self.kind]:
+            raise ValueError(f"Alert rule {self.name!r}: {self.kind} has no field "
+                             f"{self.field!r}; expected one of {RULE_FIELDS[self.kind]}")
+        if self.op not in OPERATORS:
+            raise ValueError(f"Alert rule {self.name!r}: unknown op {self.op!r}")
+        if self.group_by is not None and self.group_by not in RULE_GROUPS[self.kind]:
+            raise ValueError(f"Alert rule {self.name!r}: cannot group {self.kind} by "
+                             f"{self.group_by!r}; expected one of {RULE_GROUPS[self.kind]}")
+        if (self.consecutive is None) == (self.count is None):
+            raise ValueError(f"Alert rule {self.name!r}: set exactly one of "
+                             f"'consecutive' or 'count'")
+        if self.consecutive is not None and int(self.consecutive) < 1:
+            raise ValueError(f"Alert rule {self.name!r}: 'consecutive' must be >= 1")
+        if self.count is not None:
+            if int(self.count) < 1 or not self.window_s or float(self.window_s) <= 0:
+                raise ValueError(f"Alert rule {self.name!r}: count rules need "
+                                 f"'count' >= 1 and a positive 'window_s'")
+            self.window_s = float(self.window_s)
+            self._bucket_s = self.window_s / n_buckets
+
+        self._compare = OPERATORS[self.op]
+        self._max_keys = max_keys
+        self._n_buckets = n_buckets
+        self._state: OrderedDict = OrderedDict()     # key → streak int | _Window
+        self.fired = 0
+        self.evicted = 0
+
+    def describe(self) -> str:
+        cond = f"{self.field} {self.op} {self.threshold:g}"
+        if self.consecutive is not None:
+            return f"{cond} for {self.consecutive} consecutive samples"
+        return f"{cond} at least {self.count} times in {self.window_s:g}s"
+
+    def evaluate(self, values: np.ndarray, groups: list | None, ts: float) -> list[dict]:
+        """
+        Updates state with one batch (rows in arrival order) and returns the
+        fired alerts, at most one per key per batch.
+        """
+        if self.group_by is not None and groups is None:
+            return []
+        values = np.asarray(values, dtype=float)
+        mask = self._compare(values, self.threshold)
+        if self.count is not None:
+            rows = np.flatnonzero(mask)          # only matches touch window state
+        else:
+            rows = range(len(values))
+        by_key: dict[str, list[int]] = {}
+        for i in rows:
+            key = GLOBAL_KEY if self.group_by is None else groups[i]
+            if key is not None:
+                by_key.setdefault(key, []).append(i)
+
+        fired = []
+        for key, idx in by_key.items():
+            if self.count is not None:
+                total = self._window(key).add(int(ts // self._bucket_s), len(idx))
+                if total >= self.count:
+                    self._state[key].clear()
+                    fired.append(self._alert(key, float(values[idx[-1]]), total, ts))
+            else:
+                streak, hit = self._streak(self._state.get(key, 0), mask[idx])
+                self._touch(key, streak)
+                if hit is not None:
+                    fired.append(self._alert(key, float(values[idx[hit]]),
+                                             self.consecutive, ts))
+        self.fired += len(fired)
+        return fired
+
+    def _streak(self, streak: int, matched: np.ndarray) -> tuple[int, int | None]:
+        """
+        (streak after `matched`, offset of the first sample that completed a
+        streak of `consecutive`, or None). Runs are found with one diff.
+        """
+        n = self.consecutive
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], matched.astype(np.int8), [0]))))
+        starts, ends = edges[::2], edges[1::2]
+        hit = None
+        for start, end in zip(starts, ends):
+            before = streak if start == 0 else 0       # only the first run extends the carry
+            if before < n <= before + (end - start):
+                hit = int(start + n - before - 1)
+                break
+        if len(ends) and ends[-1] == len(matched):
+            run = int(ends[-1] - starts[-1])
+            return (streak + run if starts[-1] == 0 else run), hit
+        return 0, hit
+
+    def _window(self, key: str) -> _Window:
+        window = self._state.get(key)
+        if window is None:
+            window = _Window(self._n_buckets)
+        self._touch(key, window)
+        return window
+
+    def _touch(self, key: str, state) -> None:
+        self._state[key] = state
+        self._state.move_to_end(key)
+        if len(self._state) > self._max_keys:
+            self._state.popitem(last=False)
+            self.evicted += 1
+
+    def _alert(self, key: str, value: float, count: int, ts: float) -> dict:
+        return {
+            "rule": self.name,
+            "kind": self.kind,
+            "condition": self.describe(),
+            "group_by": self.group_by,
+            "key": key,
+            "value": round(value, 6),
+            "count": int(count),
+            "fired_at": ts,
+        }
+
+    def stats(self) -> dict:
+        return {"name": self.name, "kind": self.kind, "condition": self.describe(),
+                "group_by": self.group_by, "keys": len(self._state), "fired": self.fired,
+                "evicted_keys": self.evicted}
+
+
+def load_rules(path: str) -> list[dict]:
+    """Rule specs from a JSON file (a list of objects)."""
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a JSON list of alert rules")
+    return specs
+
+
+# ── Sinks ─────────────────────────────────────────────────────
+
+def log_sink(alert: dict) -> None:
+    logger.warning(f"[alert] {alert['rule']} key={alert['key']} {alert['condition']} "
+                   f"(value={alert['value']})")
+
+
+def file_sink(path: str) -> Sink:
+    """Appends each alert to `path` as one JSON line."""
+    def _write(alert: dict) -> None:
+        with open(path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+    return _write
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to `url` over one pooled client; `close()` releases it."""
+
+    def __init__(self, url: str, timeout_s: float):
+        self.url = url
+        self._client = httpx.Client(timeout=timeout_s)
+
+    def __call__(self, alert: dict) -> None:
+        self._client.post(self.url, json=alert).raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def build_sinks(names: list[str]) -> list[Sink]:
+    sinks = []
+    for name in names:
+        if name == "log":
+            sinks.append(log_sink)
+        elif name == "file":
+            sinks.append(file_sink(settings.ALERT_FILE_PATH))
+        elif name == "webhook":
+            if not settings.ALERT_WEBHOOK_URL:
+                raise ValueError("ALERT_SINKS includes 'webhook' but ALERT_WEBHOOK_URL is blank")
+            sinks.append(WebhookSink(settings.ALERT_WEBHOOK_URL, settings.ALERT_WEBHOOK_TIMEOUT_S))
+        else:
+            raise ValueError(f"Unknown alert sink {name!r}; expected log, file or webhook")
+    return sinks
+
+
+# ── Engine ────────────────────────────────────────────────────
+
+class AlertEngine:
+    """Evaluates compiled rules on the request path; delivers alerts off it."""
+
+    def __init__(self, specs: list[dict], sinks: list[Sink], queue_size: int = 1000,
+                 max_keys: int = 10_000, n_buckets: int = 12):
+        self.rules = [AlertRule(spec, max_keys, n_buckets) for spec in specs]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Alert rule names must be unique: {names}")
+        self._by_kind = {kind: [r for r in self.rules if r.kind == kind] for kind in RULE_FIELDS}
+        self._sinks = sinks
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._counters = {"observed": 0, "fired": 0, "dropped": 0, "delivered": 0,
+                          "sink_errors": 0}
+        self._recent: deque = deque(maxlen=100)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the dispatcher after delivering what is already queued, then closes sinks."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+        if self._thread.is_alive():
+            logger.warning("[alert] dispatcher still delivering after 5s; sinks left open")
+            return
+        for sink in self._sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+    def wants(self, kind: str) -> bool:
+        return bool(self._by_kind.get(kind))
+
+    def observe(self, kind: str, values: dict[str, np.ndarray],
+                groups: dict[str, list] | None = None, ts: float | None = None) -> list[dict]:
+        """
+        Feeds one batch of scored rows: `values` maps field → (n,) array,
+        `groups` maps group_by name → n key values (None = unknown).
+        Returns the alerts fired by this batch.
+        """
+        rules = self._by_kind.get(kind)
+        if not rules:
+            return []
+        ts = time.time() if ts is None else ts
+        groups = groups or {}
+        fired = []
+        with self._lock:
+            for rule in rules:
+                fired.extend(rule.evaluate(values[rule.field], groups.get(rule.group_by), ts))
+            self._counters["observed"] += len(next(iter(values.values())))
+            self._counters["fired"] += len(fired)
+            self._recent.extend(fired)
+        for alert in fired:
+            try:
+                self._queue.put_nowait(alert)
+            except queue.Full:
+                with self._lock:
+                    self._counters["dropped"] += 1
+        return fired
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"queue_depth": self._queue.qsize(), "queue_capacity": self._queue.maxsize,
+                    **self._counters, "rules": [rule.stats() for rule in self.rules],
+                    "recent": list(self._recent)}
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                alert = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self.deliver(alert)
+
+    def deliver(self, alert: dict) -> None:
+        for sink in self._sinks:
+            try:
+                sink(alert)
+                outcome = "delivered"
+            except Exception as exc:       # one broken sink must not starve the others
+                outcome = "sink_errors"
+                logger.error(f"[alert] delivery of {alert['rule']} failed: {exc}")
+            with self._lock:
+                self._counters[outcome] += 1
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_alert_engine: AlertEngine | None = None
+
+
+def get_alert_engine() -> AlertEngine | None:
+    """The running AlertEngine, or None when no rules are configured."""
+    return _alert_engine
+
+
+def start_alert_engine() -> None:
+    """Startup hook: compiles ALERT_RULES_PATH and starts the dispatcher."""
+    global _alert_engine
+    if not settings.ALERT_RULES_PATH:
+        return
+    specs = load_rules(settings.ALERT_RULES_PATH)
+    _alert_engine = AlertEngine(specs, build_sinks(settings.ALERT_SINKS),
+                                queue_size=settings.ALERT_QUEUE_SIZE,
+                                max_keys=settings.ALERT_MAX_KEYS_PER_RULE,
+                                n_buckets=settings.ALERT_WINDOW_BUCKETS)
+    _alert_engine.start()
+    logger.info(f"Alert engine started with {len(specs)} rule(s) → "
+                f"{', '.join(settings.ALERT_SINKS)}")
+
+
+def stop_alert_engine() -> None:
+    global _alert_engine
+    if _alert_engine is not None:
+        _alert_engine.stop()
+        _alert_engine = None
+
+
+def observe_alerts(kind: str, values: dict[str, np.ndarray],
+                   groups: dict[str, list] | None = None) -> None:
+    """Route hook: evaluates alert rules for scored rows, if any are configured."""
+    engine = _alert_engine
+    if engine is not None and engine.wants(kind):
+        engine.observe(kind, values, groups)
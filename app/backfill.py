@@ -0,0 +1,265 @@
+"""
+app/backfill.py
+────────────────
+Re-scores historical predictions with another model artifact, so a new
+version can be compared against what was actually served.
+
+    python -m app.backfill fraud app/models/artifacts/fraud_model_v2.pkl
+    python -m app.backfill anomaly candidate.pkl --workers 4 --max-rows-per-s 20000
+    python -m app.backfill fraud candidate.pkl --resume
+
+  - The prediction table is walked by keyset on `id` (WHERE id > :last
+    ORDER BY id LIMIT :chunk_rows) up to the max id seen at start, so the
+    job has a fixed end even while live traffic keeps inserting.
+  - Chunks are scored in a process pool; each worker loads the artifact
+    once (pool initializer) and encodes + scores a whole chunk with one
+    vectorised call. The parent keeps 2 × workers chunks in flight and
+    writes results in id order.
+  - Results go to fraud_rescores / anomaly_rescores, keyed by
+    (prediction_id, model_version), one executemany INSERT and commit per
+    chunk. Because chunks commit in id order, the highest rescored id IS the
+    checkpoint: `--resume` continues after it.
+  - `--max-rows-per-s` throttles the walk (sleeping between chunks) so
+    the job does not saturate the primary.
+
+The run ends with a summary of how scores shift under the new version
+over every row rescored for it so far: mean / max shifts, how many rows
+moved by more than 0.01 / 0.05 / 0.1 / 0.25, and decision flips at
+`--threshold`.
+
+Only the stored inputs are replayed: velocity features were never
+persisted, so each row is encoded as its entity's first transaction.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator
+
+import joblib
+import numpy as np
+from sqlalchemy import case, func, insert, select
+
+from app.config import settings
+from app.db.models import AnomalyRescore, FraudRescore
+from app.models.loader import MODEL_CLASSES
+from app.scoring import INPUT_FIELDS, KINDS, SCORE_FIELDS, TABLES
+
+logger = logging.getLogger(__name__)
+
+RESCORE_TABLES = {"fraud": FraudRescore, "anomaly": AnomalyRescore}
+DEFAULT_CHUNK_ROWS = 20_000
+SHIFT_BANDS = (0.01, 0.05, 0.1, 0.25)
+
+# Per-worker state, filled in by _init_worker
+_WORKER: dict = {}
+
+
+# ── Worker side ───────────────────────────────────────────────
+
+def _init_worker(kind: str, artifact_path: str) -> None:
+    _WORKER.update(kind=kind, model=MODEL_CLASSES[kind](joblib.load(artifact_path)))
+
+
+def _score_chunk(task: tuple[int, list[tuple]]) -> tuple[int, np.ndarray]:
+    """Scores one chunk of stored input rows (INPUT_FIELDS order)."""
+    index, rows = task
+    model = _WORKER["model"]
+    if _WORKER["kind"] == "fraud":
+        X = np.array([model.encode(*row) for row in rows], dtype=float)
+    else:
+        X = np.array(rows, dtype=float).reshape(len(rows), 4)
+    return index, model.score(X)
+
+
+# ── Parent side ───────────────────────────────────────────────
+
+def keyset_chunks(db, kind: str, after_id: int, end_id: int,
+                  chunk_rows: int) -> Iterator[tuple[list[int], list[tuple], list[float]]]:
+    """Yields (ids, input rows, served scores) in id order, `chunk_rows` at a time."""
+    table = TABLES[kind]
+    columns = [getattr(table, f) for f in INPUT_FIELDS[kind]]
+    served = getattr(table, SCORE_FIELDS[kind])
+    while after_id < end_id:
+        rows = db.execute(
+            select(table.id, served, *columns)
+            .where(table.id > after_id, table.id <= end_id)
+            .order_by(table.id).limit(chunk_rows)
+        ).all()
+        if not rows:
+            return
+        after_id = rows[-1][0]
+        yield [r[0] for r in rows], [tuple(r[2:]) for r in rows], [r[1] for r in rows]
+
+
+def _round4(value) -> float:
+    return round(float(value or 0.0), 4)
+
+
+def shift_summary(db, kind: str, model_version: str, threshold: float) -> dict:
+    """Score shift of `model_version` vs the served scores, over all its rescored rows."""
+    rescore = RESCORE_TABLES[kind]
+    delta = rescore.score - rescore.original_score
+    abs_delta = func.abs(delta)
+    flipped = (rescore.score >= threshold) != (rescore.original_score >= threshold)
+    row = db.execute(
+        select(
+            func.count(), func.avg(rescore.original_score), func.avg(rescore.score),
+            func.avg(delta), func.avg(abs_delta), func.max(abs_delta),
+            func.sum(case((rescore.score >= threshold, 1), else_=0)),
+            func.sum(case((rescore.original_score >= threshold, 1), else_=0)),
+            func.sum(case((flipped, 1), else_=0)),
+            *[func.sum(case((abs_delta > band, 1), else_=0)) for band in SHIFT_BANDS],
+        ).where(rescore.model_version == model_version)
+    ).one()
+    n = int(row[0])
+    return {
+        "rows": n,
+        "avg_original_score": _round4(row[1]),
+        "avg_score": _round4(row[2]),
+        "mean_shift": _round4(row[3]),
+        "mean_abs_shift": _round4(row[4]),
+        "max_abs_shift": _round4(row[5]),
+        "threshold": threshold,
+        "above_threshold": int(row[6] or 0),
+        "original_above_threshold": int(row[7] or 0),
+        "decision_flips": int(row[8] or 0),
+        "shifted_more_than": {str(band): int(v or 0) for band, v in zip(SHIFT_BANDS, row[9:])},
+    }
+
+
+def run(
+    kind: str,
+    artifact_path: str,
+    workers: int | None = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    max_rows_per_s: float = 0.0,
+    start_id: int = 0,
+    end_id: int | None = None,
+    resume: bool = False,
+    threshold: float = 0.5,
+    session_factory=None,
+) -> dict:
+    """
+    Re-scores `kind` predictions with ids in (start_id, end_id] using the
+    artifact at `artifact_path`. Returns the run and shift summary.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind}")
+    model_version = MODEL_CLASSES[kind](joblib.load(artifact_path)).model_version
+    workers = workers or os.cpu_count() or 1
+    if session_factory is None:
+        from app.db.init_db import init_db
+        from app.db.session import SessionLocal
+        init_db()
+        session_factory = SessionLocal
+
+    table, rescore = TABLES[kind], RESCORE_TABLES[kind]
+    with session_factory() as db:
+        if end_id is None:
+            end_id = db.scalar(select(func.max(table.id))) or 0
+        done_before = db.scalar(select(func.count()).where(
+            rescore.model_version == model_version)) or 0
+        if done_before and not resume:
+            raise ValueError(f"{done_before} {kind} rows are already rescored with "
+                             f"{model_version}; pass --resume to continue")
+        if resume:
+            last = db.scalar(select(func.max(rescore.prediction_id)).where(
+                rescore.model_version == model_version))
+            start_id = max(start_id, last or 0)
+            logger.info(f"[backfill] resuming {model_version} after id {start_id} "
+                        f"({done_before} rows done)")
+
+    t0 = time.perf_counter()
+    rows_done = 0
+    with session_factory() as db, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(kind, artifact_path)) as pool:
+        # One session: each chunk's commit also ends the read transaction
+        chunks = keyset_chunks(db, kind, start_id, end_id, chunk_rows)
+        meta: dict[int, tuple[list[int], list[float]]] = {}
+
+        def submit(index_chunk):
+            index, (ids, rows, served) = index_chunk
+            meta[index] = (ids, served)
+            return pool.submit(_score_chunk, (index, rows))
+
+        tasks = enumerate(chunks)
+        pending = deque(submit(t) for t in islice(tasks, 2 * workers))
+        while pending:
+            index, scores = pending.popleft().result()
+            for task in islice(tasks, 1):
+                pending.append(submit(task))
+
+            ids, served = meta.pop(index)
+            db.execute(insert(rescore), [
+                {"prediction_id": pid, "model_version": model_version,
+                 "score": float(s), "original_score": float(o)}
+                for pid, s, o in zip(ids, scores, served)
+            ])
+            db.commit()
+            rows_done += len(ids)
+
+            elapsed = time.perf_counter() - t0
+            logger.info(f"[backfill] {kind} ids ≤ {ids[-1]}: total={rows_done} "
+                        f"rate={rows_done / elapsed:.0f} rows/s")
+            if max_rows_per_s > 0:
+                ahead_s = rows_done / max_rows_per_s - elapsed
+                if ahead_s > 0:
+                    time.sleep(ahead_s)
+
+    elapsed_s = time.perf_counter() - t0
+    with session_factory() as db:
+        summary = shift_summary(db, kind, model_version, threshold)
+    return {
+        "kind": kind,
+        "model_version": model_version,
+        "end_id": end_id,
+        "rows_this_run": rows_done,
+        "elapsed_s": round(elapsed_s, 3),
+        "rows_per_s": round(rows_done / elapsed_s, 1) if elapsed_s > 0 else None,
+        "shift": summary,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.backfill",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("artifact", help="Model artifact (.pkl) to re-score with")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows per keyset chunk / INSERT")
+    parser.add_argument("--max-rows-per-s", type=float, default=0.0,
+                        help="Throttle (0 = unlimited)")
+    parser.add_argument("--start-id", type=int, default=0, help="Only ids greater than this")
+    parser.add_argument("--end-id", type=int, default=None,
+                        help="Only ids up to this (default: max id at start)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue after the last id already rescored for this version")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Decision threshold for the flip count in the summary")
+    args = parser.parse_args(argv)
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be >= 1")
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    try:
+        summary = run(args.kind, args.artifact, workers=args.workers,
+                      chunk_rows=args.chunk_rows, max_rows_per_s=args.max_rows_per_s,
+                      start_id=args.start_id, end_id=args.end_id, resume=args.resume,
+                      threshold=args.threshold)
+    except (ValueError, OSError) as exc:
+        parser.error(str(exc))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+app/capture.py
+───────────────
+Samples live requests into compressed capture files for `python -m
+app.replay`.
+
+The latency middleware (app/main.py) asks `sample()` whether to capture a
+request and, if so, reads its body before the route runs and hands
+`record()` the arrival time, method, path, body, status and server
+latency once the response is ready. `record()` is a non-blocking put into
+a bounded queue: when the queue is full the request is dropped and
+counted, so a slow disk never adds latency to live traffic. A background
+thread drains the queue, serialises each request as one JSON line and
+appends it to a gzip stream:
+
+    {"ts": 1760870400.123456, "method": "POST", "path": "/v1/fraud/predict",
+     "headers": {"x-tenant-id": "acme"}, "body": "{...}", "status": 200,
+     "latency_ms": 1.84}
+
+  - Only paths under CAPTURE_PATHS are sampled, each request with
+    probability CAPTURE_SAMPLE_RATE (0 disables capture). Replay keeps the
+    sampled arrival times, so a sample rate below 1 replays a thinner
+    version of the same burst pattern.
+  - Bodies larger than CAPTURE_MAX_BODY_BYTES, or sent without a
+    Content-Length, are not captured (they are counted as skipped), so
+    streaming uploads are never buffered here.
+  - Only the headers in CAPTURED_HEADERS are kept: never cookies or
+    credentials.
+  - Files are named `capture-{ms}-{pid}-{seq}.ndjson.gz`. They carry an
+    `.open` suffix while being written and are renamed on rotation
+    (CAPTURE_FILE_MAX_BYTES of JSON, or CAPTURE_FILE_MAX_AGE_S). The
+    stream is sync-flushed about once per second, so an open file is
+    readable up to its last flush, and a file cut short by a crash loses
+    only its unflushed tail.
+
+Lines are written in completion order, which is close to but not exactly
+arrival order; `read_capture()` sorts by `ts`.
+"""
+import base64
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from typing import Iterator
+
+from app.admission import DEADLINE_HEADER
+from app.config import settings
+from app.models.registry import TENANT_HEADER
+
+logger = logging.getLogger(__name__)
+
+CAPTURED_HEADERS = ("content-type", TENANT_HEADER.lower(), DEADLINE_HEADER.lower())
+FLUSH_INTERVAL_S = 1.0
+STOP_TIMEOUT_S = 5.0
+
+
+class TrafficCapture:
+    """Bounded queue + background thread that appends sampled requests to capture files."""
+
+    def __init__(self, directory: str, sample_rate: float, paths: list[str],
+                 max_body_bytes: int, file_max_bytes: int, file_max_age_s: float,
+                 queue_size: int):
+        self.directory = directory
+        self._sample_rate = sample_rate
+        self._paths = tuple(paths)
+        self._max_body_bytes = max_body_bytes
+        self._file_max_bytes = file_max_bytes
+        self._file_max_age_s = file_max_age_s
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._counters = {"captured": 0, "dropped": 0, "skipped": 0, "written": 0,
+                          "files": 0, "write_failures": 0}
+        self._file = None
+        self._path = ""
+        self._opened_at = 0.0
+        self._file_bytes = 0
+        self._seq = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the writer after draining what is already queued; the writer closes the file."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=STOP_TIMEOUT_S)
+        if self._thread.is_alive():
+            # still writing: leave the .open file to the thread (readers accept it as is)
+            logger.warning(f"[capture] writer did not stop within {STOP_TIMEOUT_S:.0f}s; "
+                           f"{self._path} left open")
+
+    def sample(self, method: str, path: str, content_length: str | None) -> bool:
+        """Whether to capture this request: path prefix, sample rate, then body size."""
+        if not path.startswith(self._paths) or random.random() >= self._sample_rate:
+            return False
+        if content_length is None:
+            ok = method in ("GET", "HEAD", "DELETE")
+        else:
+            ok = content_length.isdigit() and int(content_length) <= self._max_body_bytes
+        if not ok:
+            self._count("skipped")
+        return ok
+
+    def record(self, ts: float, method: str, path: str, headers: dict, body: bytes,
+               status: int, latency_ms: float) -> bool:
+        """Queues one finished request; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((ts, method, path, headers, body, status, latency_ms))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("captured")
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"directory": self.directory, "sample_rate": self._sample_rate,
+                "queue_depth": self._queue.qsize(), "queue_capacity": self._queue.maxsize,
+                **counters}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    # ── Writer thread ─────────────────────────────────────────
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                item = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                item = None
+            try:
+                if item is not None:
+                    self._write(item)
+                now = time.monotonic()
+                if self._file is not None and now - last_flush >= FLUSH_INTERVAL_S:
+                    self._file.flush()                  # Z_SYNC_FLUSH: readable up to here
+                    last_flush = now
+                    if now - self._opened_at >= self._file_max_age_s:
+                        self._close()
+            except OSError as exc:
+                self._count("write_failures")
+                logger.error(f"[capture] write to {self._path} failed: {exc}")
+                self._close()
+        self._close()
+
+    def _write(self, item: tuple) -> None:
+        ts, method, path, headers, body, status, latency_ms = item
+        line = {"ts": round(ts, 6), "method": method, "path": path, "headers": headers}
+        try:
+            line["body"] = body.decode()
+        except UnicodeDecodeError:
+            line["body_b64"] = base64.b64encode(body).decode()
+        line.update(status=status, latency_ms=round(latency_ms, 3))
+        data = (json.dumps(line, separators=(",", ":")) + "\n").encode()
+
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self._count("written")
+        if self._file_bytes >= self._file_max_bytes:
+            self._close()
+
+    def _open(self) -> None:
+        self._seq += 1
+        name = f"capture-{int(time.time() * 1000)}-{os.getpid()}-{self._seq}.ndjson.gz"
+        self._path = os.path.join(self.directory, name + ".open")
+        self._file = gzip.open(self._path, "wb", compresslevel=6)
+        self._opened_at = time.monotonic()
+        self._file_bytes = 0
+        self._count("files")
+
+    def _close(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            os.replace(self._path, self._path[:-len(".open")])
+        except OSError as exc:
+            logger.error(f"[capture] closing {self._path} failed: {exc}")
+        self._file = None
+
+
+# ── Reading ───────────────────────────────────────────────────
+
+def capture_files(paths: list[str]) -> list[str]:
+    """Capture files named by `paths` (files, or directories searched for capture files)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "capture-*.ndjson.gz"))
+                            + glob.glob(os.path.join(path, "capture-*.ndjson.gz.open")))
+        else:
+            files.append(path)
+    return files
+
+
+def _lines(path: str) -> Iterator[dict]:
+    """Lines of one capture file, stopping quietly at a truncated tail."""
+    with gzip.open(path, "rb") as f:
+        try:
+            for raw in f:
+                try:
+                    yield json.loads(raw)
+                except ValueError:          # partial last line of an unfinished stream
+                    return
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def read_capture(paths: list[str], limit: int | None = None) -> list[dict]:
+    """All captured requests in `paths`, in arrival (`ts`) order; the first `limit` if given."""
+    records = [line for path in capture_files(paths) for line in _lines(path)]
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+def request_body(record: dict) -> bytes:
+    if "body_b64" in record:
+        return base64.b64decode(record["body_b64"])
+    return record.get("body", "").encode()
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_traffic_capture: TrafficCapture | None = None
+
+
+def get_traffic_capture() -> TrafficCapture | None:
+    """The running TrafficCapture, or None when capture is disabled."""
+    return _traffic_capture
+
+
+def start_traffic_capture() -> None:
+    """Startup hook: starts the capture writer if CAPTURE_SAMPLE_RATE > 0."""
+    global _traffic_capture
+    if settings.CAPTURE_SAMPLE_RATE <= 0:
+        return
+    _traffic_capture = TrafficCapture(
+        settings.CAPTURE_DIR, min(settings.CAPTURE_SAMPLE_RATE, 1.0), settings.CAPTURE_PATHS,
+        settings.CAPTURE_MAX_BODY_BYTES, settings.CAPTURE_FILE_MAX_BYTES,
+        settings.CAPTURE_FILE_MAX_AGE_S, settings.CAPTURE_QUEUE_SIZE,
+    )
+    _traffic_capture.start()
+    logger.info(f"Traffic capture: sampling {settings.CAPTURE_SAMPLE_RATE:.0%} of "
+                f"{', '.join(settings.CAPTURE_PATHS)} into {settings.CAPTURE_DIR}")
+
+
+def stop_traffic_capture() -> None:
+    global _traffic_capture
+    if _traffic_capture is not None:
+        _traffic_capture.stop()
+        logger.info(f"Traffic capture stopped: {_traffic_capture.stats()}")
+        _traffic_capture = None
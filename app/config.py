@@ -16,11 +16,144 @@ class Settings(BaseSettings):
     # Leave blank locally → auto-uses SQLite
     # Set to Neon/Postgres URL in production
     DATABASE_URL: str = ""
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_S: float = 30.0
+
+    # ── Read replica ──────────────────────────────────────────
+    # Read-only routes (GET /v1/metrics*) use the replica while it is up and
+    # at most MAX_LAG_S behind the primary; otherwise they fall back to the
+    # primary. Blank URL → all reads use the primary.
+    DATABASE_REPLICA_URL: str = ""
+    DATABASE_REPLICA_POOL_SIZE: int = 5
+    DATABASE_REPLICA_MAX_OVERFLOW: int = 5
+    DATABASE_REPLICA_POOL_TIMEOUT_S: float = 5.0
+    DATABASE_REPLICA_MAX_LAG_S: float = 30.0
+    DATABASE_REPLICA_CHECK_INTERVAL_S: float = 10.0
 
     # ── Model artifacts ───────────────────────────────────────
     FRAUD_MODEL_PATH: str = "app/models/artifacts/fraud_model.pkl"
     ANOMALY_MODEL_PATH: str = "app/models/artifacts/anomaly_model.pkl"
 
+    # ── Canary / shadow models ────────────────────────────────
+    # Canary: serves CANARY_PERCENT of live traffic (sticky per entity_id).
+    # Shadow: re-scores requests on a background thread; results go to
+    # shadow_predictions only. Leave a path blank to disable that variant.
+    FRAUD_CANARY_MODEL_PATH: str = ""
+    FRAUD_CANARY_PERCENT: float = 0.0
+    FRAUD_SHADOW_MODEL_PATH: str = ""
+    ANOMALY_CANARY_MODEL_PATH: str = ""
+    ANOMALY_CANARY_PERCENT: float = 0.0
+    ANOMALY_SHADOW_MODEL_PATH: str = ""
+    SHADOW_QUEUE_SIZE: int = 10_000       # requests beyond this are dropped, not queued
+    SHADOW_BATCH_SIZE: int = 256
+
+    # ── Multi-tenant model registry ───────────────────────────
+    # <DIR>/<tenant>/<fraud|anomaly>/<version>.pkl, selected by X-Tenant-ID.
+    # Blank DIR disables tenant models (everyone gets the shared model).
+    MODEL_REGISTRY_DIR: str = ""
+    MODEL_REGISTRY_MAX_BYTES: int = 512 * 1024 * 1024
+    MODEL_REGISTRY_SCAN_INTERVAL_S: float = 30.0
+    MODEL_REGISTRY_WARM_COUNT: int = 20
+    MODEL_REGISTRY_USAGE_PATH: str = "app/db/registry_usage.json"
+
+    # ── Admission control ─────────────────────────────────────
+    # Per-route concurrency limit adapts between MIN and MAX based on
+    # observed latency vs. TARGET; excess requests wait in a bounded queue
+    # and are shed with 503 once their deadline cannot be met.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_ROUTES: list[str] = [
+        "/v1/fraud/predict", "/v1/fraud/predict-batch",
+        "/v1/anomaly/predict", "/v1/anomaly/predict-batch",
+    ]
+    ADMISSION_INITIAL_CONCURRENCY: int = 8
+    ADMISSION_MIN_CONCURRENCY: int = 1
+    ADMISSION_MAX_CONCURRENCY: int = 32
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_TARGET_LATENCY_MS: float = 50.0
+    ADMISSION_DEFAULT_DEADLINE_MS: float = 2000.0
+
+    # ── Velocity feature store ────────────────────────────────
+    # Per-entity sliding-window counters for fraud requests carrying entity_id.
+    FEATURE_STORE_ENABLED: bool = True
+    FEATURE_STORE_MAX_ENTITIES: int = 100_000
+    FEATURE_STORE_MAX_EVENTS_PER_ENTITY: int = 256
+    FEATURE_STORE_TTL_S: float = 86_400.0
+    FEATURE_STORE_SNAPSHOT_PATH: str = "app/db/feature_store.pkl"
+    # Periodic snapshot (plus one at shutdown); 0 = shutdown only
+    FEATURE_STORE_SNAPSHOT_INTERVAL_S: float = 60.0
+    # time_delta used when neither the caller nor the store knows it (training mean)
+    FEATURE_STORE_DEFAULT_TIME_DELTA_H: float = 24.0
+
+    # ── Drift monitoring ──────────────────────────────────────
+    # Each worker persists its histogram counts here; GET /v1/drift merges them.
+    DRIFT_STATE_DIR: str = "app/db/drift"
+    DRIFT_PERSIST_INTERVAL_S: float = 60.0
+    DRIFT_STATE_MAX_AGE_S: float = 7 * 86_400.0
+    DRIFT_PSI_THRESHOLD: float = 0.2
+    DRIFT_MIN_SAMPLES: int = 100
+
+    # ── Similar-anomaly index ─────────────────────────────────
+    # Predictions scoring >= MIN_SCORE are indexed for ?similar=k lookups.
+    SIMILARITY_MIN_SCORE: float = 0.7
+    SIMILARITY_MAX_POINTS: int = 200_000
+    SIMILARITY_MAX_K: int = 50
+    SIMILARITY_REBUILD_RATIO: float = 0.1
+    SIMILARITY_INDEX_PATH: str = "app/db/anomaly_index.pkl"
+
+    # ── Alert rules ───────────────────────────────────────────
+    # JSON list of rules evaluated in-process on every prediction (see
+    # app/alerts.py). Blank disables alerting.
+    ALERT_RULES_PATH: str = ""
+    ALERT_SINKS: list[str] = ["log"]      # any of: log, file, webhook
+    ALERT_FILE_PATH: str = "app/db/alerts.ndjson"
+    ALERT_WEBHOOK_URL: str = ""
+    ALERT_WEBHOOK_TIMEOUT_S: float = 2.0
+    ALERT_QUEUE_SIZE: int = 1000          # undelivered alerts beyond this are dropped
+    ALERT_MAX_KEYS_PER_RULE: int = 10_000
+    ALERT_WINDOW_BUCKETS: int = 12        # resolution of count windows
+
+    # ── Queue worker (python -m app.worker) ───────────────────
+    # redis://host:6379/0 (Redis Streams) or sqlite:///path/queue.db (local).
+    QUEUE_URL: str = ""
+    QUEUE_STREAM: str = "scoring-jobs"
+    QUEUE_GROUP: str = "scorers"
+    QUEUE_VISIBILITY_TIMEOUT_S: float = 60.0   # unacked messages are redelivered after this
+    WORKER_CONCURRENCY: int = 1
+    WORKER_PREFETCH: int = 512
+    WORKER_BATCH_SIZE: int = 256
+    WORKER_STATS_DIR: str = "app/db/worker"
+    WORKER_STATS_INTERVAL_S: float = 5.0
+    WORKER_STATS_MAX_AGE_S: float = 60.0
+
+    # ── Prediction sink ───────────────────────────────────────
+    # sql: each predict request INSERTs and commits. segment: requests append
+    # to a local segment log that a background compactor bulk-loads into the
+    # database (see app/sinks.py).
+    PREDICTION_SINK: str = "sql"
+    PREDICTION_SEGMENT_DIR: str = "app/db/segments"
+    PREDICTION_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+    PREDICTION_SEGMENT_MAX_AGE_S: float = 5.0     # rows reach the database within ~this
+    PREDICTION_SEGMENT_FSYNC: bool = False        # fsync every append (power-loss safe, slower)
+    PREDICTION_COMPACT_INTERVAL_S: float = 1.0
+    PREDICTION_COMPACT_BATCH_ROWS: int = 20_000
+
+    # ── Traffic capture (python -m app.replay) ────────────────
+    # Share of requests under CAPTURE_PATHS written to gzip capture files by
+    # the latency middleware (see app/capture.py). 0 disables capture.
+    CAPTURE_SAMPLE_RATE: float = 0.0
+    CAPTURE_DIR: str = "app/db/capture"
+    CAPTURE_PATHS: list[str] = ["/v1/fraud", "/v1/anomaly"]
+    CAPTURE_MAX_BODY_BYTES: int = 256 * 1024     # larger bodies are not captured
+    CAPTURE_FILE_MAX_BYTES: int = 64 * 1024 * 1024   # uncompressed JSON per file
+    CAPTURE_FILE_MAX_AGE_S: float = 300.0
+    CAPTURE_QUEUE_SIZE: int = 10_000             # unwritten requests beyond this are dropped
+
+    # ── Streaming bulk scoring ────────────────────────────────
+    SCORE_STREAM_BLOCK_SIZE: int = 1024
+    SCORE_STREAM_MAX_LINE_BYTES: int = 1024 * 1024    # longer rows are rejected, not buffered
+    SCORE_STREAM_SPOOL_BYTES: int = 4 * 1024 * 1024   # results buffered in RAM before disk
+
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
     def resolve_database_url(cls, v: str, info) -> str:
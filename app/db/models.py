@@ -2,7 +2,7 @@
 app/db/models.py — SQLAlchemy ORM models for persisted predictions.
 """
 from sqlalchemy import (
-    Column, Integer, Float, String, DateTime, func
+    Column, Integer, Float, String, Text, DateTime, func
 )
 from sqlalchemy.orm import DeclarativeBase
 
@@ -48,3 +48,68 @@ class AnomalyPrediction(Base):
     latency_ms = Column(Float, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class _RescoreColumns:
+    """A stored prediction re-scored by another model version (python -m app.backfill)."""
+
+    prediction_id = Column(Integer, primary_key=True)
+    model_version = Column(String(50), primary_key=True)
+    score = Column(Float, nullable=False)
+    original_score = Column(Float, nullable=False)        # as served at prediction time
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class FraudRescore(_RescoreColumns, Base):
+    __tablename__ = "fraud_rescores"
+
+
+class AnomalyRescore(_RescoreColumns, Base):
+    __tablename__ = "anomaly_rescores"
+
+
+class ShadowPrediction(Base):
+    """A shadow model's score for a live request, next to the served score."""
+    __tablename__ = "shadow_predictions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(20), nullable=False, index=True)      # "fraud" | "anomaly"
+
+    # Shadow (candidate) output
+    model_version = Column(String(50), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    latency_ms = Column(Float, nullable=False)
+
+    # Served output for the same request
+    primary_model_version = Column(String(50), nullable=False)
+    primary_score = Column(Float, nullable=False)
+    primary_latency_ms = Column(Float, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ScoringJob(Base):
+    """Outcome of one queued scoring job; job_id makes redelivered jobs no-ops."""
+    __tablename__ = "scoring_jobs"
+
+    job_id = Column(String(128), primary_key=True)
+    kind = Column(String(20), nullable=False)                 # "fraud" | "anomaly"
+    status = Column(String(20), nullable=False)               # "scored" | "invalid"
+    prediction_id = Column(Integer, nullable=True)            # row in the kind's table
+    score = Column(Float, nullable=True)
+    model_version = Column(String(50), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SegmentLoad(Base):
+    """A prediction segment bulk-loaded by the compactor (app/sinks.py); loads are exactly-once."""
+    __tablename__ = "segment_loads"
+
+    segment = Column(String(128), primary_key=True)
+    kind = Column(String(20), nullable=False)
+    rows = Column(Integer, nullable=False)
+
+    loaded_at = Column(DateTime(timezone=True), server_default=func.now())
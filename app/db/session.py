@@ -1,22 +1,120 @@
 """
-app/db/session.py — SQLAlchemy engine and session factory.
+app/db/session.py — SQLAlchemy engines and session factories.
 Supports both SQLite (local) and PostgreSQL (docker / production).
+
+Writes (prediction inserts) go through the primary engine and `get_db`.
+Read-only routes use `get_read_db`, which serves from the read replica
+(DATABASE_REPLICA_URL) when one is configured, healthy and no more than
+DATABASE_REPLICA_MAX_LAG_S behind, and from the primary otherwise. Each
+engine has its own pool, so dashboard reads cannot starve write
+connections.
+
+Replica lag is measured by a background check: the age of the oldest row
+on the primary that the replica does not have yet, over the prediction
+tables read routes aggregate. Every engine's pool checkouts are timed and
+exposed with the replica state via GET /v1/metrics/db.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
 from app.config import settings
+from app.db.models import AnomalyPrediction, FraudPrediction, ShadowPrediction
 
-# SQLite check_same_thread fix
-connect_args = {}
-if settings.DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True,          # reconnect on stale connections
-)
+# Tables read routes aggregate; replica lag is measured over these
+REPLICATED_TABLES = (FraudPrediction, AnomalyPrediction, ShadowPrediction)
+
+
+# ── Pool instrumentation ──────────────────────────────────────
+
+class PoolStats:
+    """Checkout count, wait time and timeouts for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_ms_total / self.checkouts, 3)
+                if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 3),
+            }
+
+
+def _timed_pool_class(base: type, stats: PoolStats) -> type:
+    """`base` with connect() timed into `stats` (class-level, so it survives recreate())."""
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            conn = base.connect(self)
+        except PoolTimeoutError:
+            stats.record((time.perf_counter() - t0) * 1000, timed_out=True)
+            raise
+        stats.record((time.perf_counter() - t0) * 1000)
+        return conn
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect})
 
+
+def make_engine(name: str, url: str, pool_size: int, max_overflow: int,
+                pool_timeout_s: float):
+    """An engine whose pool checkouts are timed; returns (engine, PoolStats)."""
+    stats = PoolStats(name)
+    kwargs = {"pool_pre_ping": True}           # reconnect on stale connections
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}    # SQLite check_same_thread fix
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite: one connection per thread, nothing to size
+        kwargs["poolclass"] = _timed_pool_class(SingletonThreadPool, stats)
+    else:
+        kwargs.update(poolclass=_timed_pool_class(QueuePool, stats), pool_size=pool_size,
+                      max_overflow=max_overflow, pool_timeout=pool_timeout_s)
+    return create_engine(url, **kwargs), stats
+
+
+def pool_status(engine, stats: PoolStats) -> dict:
+    pool = engine.pool
+    return {
+        "name": stats.name,
+        "url": engine.url.render_as_string(hide_password=True).split("@")[-1],
+        "pool_class": type(pool).__bases__[0].__name__,
+        "pool_size": pool.size() if hasattr(pool, "size") else 0,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+        "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0,
+        **stats.snapshot(),
+    }
+
+
+engine, pool_stats = make_engine(
+    "primary", settings.DATABASE_URL, settings.DATABASE_POOL_SIZE,
+    settings.DATABASE_MAX_OVERFLOW, settings.DATABASE_POOL_TIMEOUT_S,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -27,3 +125,150 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ── Read replica routing ──────────────────────────────────────
+
+class ReadRouter:
+    """Chooses replica or primary for read-only sessions, tracking replica lag."""
+
+    def __init__(self, primary_factory, replica_factory, max_lag_s: float):
+        self._primary_factory = primary_factory
+        self._replica_factory = replica_factory
+        self.max_lag_s = max_lag_s
+        self._lock = threading.Lock()
+        self.state = "unknown"            # unknown | ok | stale | down
+        self.lag_s: float | None = None
+        self.checked_at: float | None = None
+        self.last_error: str | None = None
+        self._counters = {"replica_reads": 0, "primary_reads": 0, "fallbacks": 0}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ── Staleness ─────────────────────────────────────────────
+
+    def check(self) -> None:
+        """Measures replica lag and updates the routing state."""
+        try:
+            with self._replica_factory() as replica, self._primary_factory() as primary:
+                lag = 0.0
+                for table in REPLICATED_TABLES:
+                    seen = replica.scalar(select(func.max(table.id))) or 0
+                    oldest_missing = primary.scalar(
+                        select(table.created_at).where(table.id > seen)
+                        .order_by(table.id).limit(1))
+                    if oldest_missing is not None:
+                        lag = max(lag, _age_s(oldest_missing))
+        except SQLAlchemyError as exc:
+            self._set_state("down", None, str(exc).splitlines()[0])
+            return
+        self._set_state("ok" if lag <= self.max_lag_s else "stale", lag, None)
+
+    def _set_state(self, state: str, lag_s: float | None, error: str | None) -> None:
+        with self._lock:
+            if state != self.state and self.state != "unknown":
+                log = logger.info if state == "ok" else logger.warning
+                log(f"[replica] {self.state} → {state}"
+                    + (f" (lag {lag_s:.1f}s)" if lag_s is not None else f" ({error})"))
+            self.state, self.lag_s, self.last_error = state, lag_s, error
+            self.checked_at = time.time()
+
+    def start(self, interval_s: float) -> None:
+        self.check()
+
+        def _loop():
+            while not self._stop.wait(interval_s):
+                self.check()
+
+        self._thread = threading.Thread(target=_loop, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ── Routing ───────────────────────────────────────────────
+
+    def session(self) -> Session:
+        """A replica session when the replica is usable, else a primary one."""
+        if self.state == "ok":
+            db = self._replica_factory()
+            try:
+                db.connection()           # fail over now rather than mid-query
+                self._count("replica_reads")
+                return db
+            except SQLAlchemyError as exc:
+                db.close()
+                self._set_state("down", None, str(exc).splitlines()[0])
+                self._count("fallbacks")
+        self._count("primary_reads")
+        return self._primary_factory()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "lag_s": self.lag_s, "max_lag_s": self.max_lag_s,
+                    "checked_at": self.checked_at, "last_error": self.last_error,
+                    **self._counters}
+
+
+def _age_s(created_at: datetime) -> float:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)   # SQLite CURRENT_TIMESTAMP is UTC
+    return max((datetime.now(timezone.utc) - created_at).total_seconds(), 0.0)
+
+
+replica_engine = replica_pool_stats = None
+_read_router: ReadRouter | None = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine, replica_pool_stats = make_engine(
+        "replica", settings.DATABASE_REPLICA_URL, settings.DATABASE_REPLICA_POOL_SIZE,
+        settings.DATABASE_REPLICA_MAX_OVERFLOW, settings.DATABASE_REPLICA_POOL_TIMEOUT_S,
+    )
+    _read_router = ReadRouter(
+        SessionLocal,
+        sessionmaker(autocommit=False, autoflush=False, bind=replica_engine),
+        settings.DATABASE_REPLICA_MAX_LAG_S,
+    )
+
+
+def get_read_router() -> ReadRouter | None:
+    """The replica router, or None when no DATABASE_REPLICA_URL is set."""
+    return _read_router
+
+
+def start_replica_monitor() -> None:
+    """Startup hook: checks replica lag now and every DATABASE_REPLICA_CHECK_INTERVAL_S."""
+    if _read_router is not None:
+        _read_router.start(settings.DATABASE_REPLICA_CHECK_INTERVAL_S)
+        logger.info(f"Read replica {_read_router.state} "
+                    f"(lag {_read_router.lag_s}s, tolerance {_read_router.max_lag_s}s)")
+
+
+def stop_replica_monitor() -> None:
+    if _read_router is not None:
+        _read_router.stop()
+
+
+def get_read_db():
+    """
+    FastAPI dependency for read-only routes: a replica session when the
+    replica is up and within its staleness tolerance, else a primary one.
+    """
+    router = _read_router
+    db = router.session() if router is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def engine_stats() -> list[dict]:
+    out = [pool_status(engine, pool_stats)]
+    if replica_engine is not None:
+        out.append(pool_status(replica_engine, replica_pool_stats))
+    return out
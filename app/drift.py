@@ -0,0 +1,247 @@
+"""
+app/drift.py
+─────────────
+Constant-memory input / score drift monitoring.
+
+Training scripts capture a reference histogram per model input feature and
+for the output score (see `reference_histogram`) and store them in the
+artifact metadata under "reference". At serving time a DriftMonitor keeps
+live counts over the *same* bin edges, so:
+
+  - each prediction costs one bisect per feature (a handful of bins → O(1));
+  - memory is fixed (n_features × n_bins counters) regardless of traffic;
+  - states are plain count vectors, so they merge across workers by addition.
+
+PSI and a binned two-sample KS statistic are computed on demand for
+GET /v1/drift. Each worker persists its state to DRIFT_STATE_DIR and the
+endpoint merges every worker's file with the live in-process state.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCORE_KEY = "__score__"
+_PSI_EPS = 1e-4
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+
+
+def reference_histogram(
+    values: np.ndarray,
+    n_bins: int = 10,
+    edges: list[float] | None = None,
+) -> dict:
+    """
+    Builds a reference histogram for one feature.
+    Quantile edges are used unless explicit `edges` are given (e.g. i + 0.5
+    boundaries for label-encoded categoricals). Bins are open-ended:
+    (-inf, e0], (e0, e1], ..., (e_last, +inf).
+    """
+    values = np.asarray(values, dtype=float)
+    if edges is None:
+        qs = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+        edges = np.unique(qs).tolist()
+    counts = np.bincount(np.searchsorted(edges, values, side="left"),
+                         minlength=len(edges) + 1)
+    return {"edges": [float(e) for e in edges], "counts": counts.astype(int).tolist()}
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index between two count vectors over the same bins."""
+    e = expected / max(expected.sum(), 1)
+    a = actual / max(actual.sum(), 1)
+    e = np.clip(e, _PSI_EPS, None)
+    a = np.clip(a, _PSI_EPS, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Two-sample KS statistic evaluated at the bin edges."""
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(e - a)))
+
+
+class DriftMonitor:
+    """Live fixed-bin histograms for one model's inputs and score."""
+
+    def __init__(self, model_version: str, features: list[str], reference: dict | None):
+        self.model_version = model_version
+        self.features = features
+        self.reference = reference
+        self._lock = threading.Lock()
+        self._edges: dict[str, list[float]] = {}
+        self._counts: dict[str, np.ndarray] = {}
+        if reference:
+            for name in [*features, SCORE_KEY]:
+                ref = reference["features"][name] if name != SCORE_KEY else reference["score"]
+                self._edges[name] = ref["edges"]
+                self._counts[name] = np.zeros(len(ref["edges"]) + 1, dtype=np.int64)
+
+    @classmethod
+    def from_metadata(cls, metadata: dict) -> "DriftMonitor":
+        return cls(metadata["model_version"], list(metadata["features"]),
+                   metadata.get("reference"))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._counts)
+
+    # ── Hot path ───────────────────────────────────────────────
+
+    def observe(self, row, score: float) -> None:
+        """Records one model input row (in metadata["features"] order) and its score."""
+        if not self._counts:
+            return
+        with self._lock:
+            for name, value in zip(self.features, row):
+                self._counts[name][bisect_left(self._edges[name], value)] += 1
+            self._counts[SCORE_KEY][bisect_left(self._edges[SCORE_KEY], score)] += 1
+
+    def observe_batch(self, X: np.ndarray, scores: np.ndarray) -> None:
+        """Vectorised variant of `observe` for a block of rows."""
+        if not self._counts or len(X) == 0:
+            return
+        columns = {name: X[:, i] for i, name in enumerate(self.features)}
+        columns[SCORE_KEY] = np.asarray(scores)
+        with self._lock:
+            for name, values in columns.items():
+                idx = np.searchsorted(self._edges[name], values, side="left")
+                self._counts[name] += np.bincount(idx, minlength=len(self._counts[name]))
+
+    # ── State (persist / merge) ────────────────────────────────
+
+    def state(self) -> dict:
+        with self._lock:
+            return {
+                "model_version": self.model_version,
+                "counts": {name: c.tolist() for name, c in self._counts.items()},
+            }
+
+    def merged_counts(self, states: list[dict]) -> dict[str, np.ndarray]:
+        """Live counts plus every compatible persisted state."""
+        with self._lock:
+            totals = {name: c.copy() for name, c in self._counts.items()}
+        for st in states:
+            if st.get("model_version") != self.model_version:
+                continue
+            for name, counts in st.get("counts", {}).items():
+                if name in totals and len(counts) == len(totals[name]):
+                    totals[name] += np.asarray(counts, dtype=np.int64)
+        return totals
+
+    # ── Report ─────────────────────────────────────────────────
+
+    def report(self, states: list[dict] | None = None) -> dict:
+        if not self._counts:
+            return {"model_version": self.model_version, "reference_available": False,
+                    "samples": 0, "features": [], "score": None}
+        totals = self.merged_counts(states or [])
+        threshold = settings.DRIFT_PSI_THRESHOLD
+
+        def stat(name: str, ref: dict) -> dict:
+            expected = np.asarray(ref["counts"], dtype=float)
+            actual = totals[name].astype(float)
+            n = int(actual.sum())
+            value_psi = psi(expected, actual) if n else 0.0
+            return {
+                "name": name if name != SCORE_KEY else "score",
+                "samples": n,
+                "psi": round(value_psi, 4),
+                "ks": round(ks_statistic(expected, actual) if n else 0.0, 4),
+                "drifted": bool(n >= settings.DRIFT_MIN_SAMPLES and value_psi > threshold),
+            }
+
+        feature_stats = [stat(name, self.reference["features"][name]) for name in self.features]
+        return {
+            "model_version": self.model_version,
+            "reference_available": True,
+            "samples": int(totals[SCORE_KEY].sum()),
+            "features": feature_stats,
+            "score": stat(SCORE_KEY, self.reference["score"]),
+        }
+
+
+# ── Cross-worker persistence ──────────────────────────────────
+
+def _state_path(directory: str, worker_id: str) -> str:
+    return os.path.join(directory, f"drift-{worker_id}.json")
+
+
+def persist_drift_state(monitors: dict[str, DriftMonitor]) -> None:
+    """Writes this worker's live drift state to DRIFT_STATE_DIR (atomic replace)."""
+    directory = settings.DRIFT_STATE_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _state_path(directory, WORKER_ID)
+    payload = {"worker_id": WORKER_ID, "saved_at": time.time(),
+               "monitors": {kind: m.state() for kind, m in monitors.items()}}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(payload, fh)
+    os.replace(tmp_path, path)
+
+
+def load_peer_states() -> dict[str, list[dict]]:
+    """Reads every other worker's persisted state (ignoring stale files)."""
+    directory = settings.DRIFT_STATE_DIR
+    peers: dict[str, list[dict]] = {}
+    if not directory or not os.path.isdir(directory):
+        return peers
+    horizon = time.time() - settings.DRIFT_STATE_MAX_AGE_S
+    own = os.path.basename(_state_path(directory, WORKER_ID))
+    for fname in os.listdir(directory):
+        if not fname.startswith("drift-") or not fname.endswith(".json") or fname == own:
+            continue
+        path = os.path.join(directory, fname)
+        try:
+            if os.path.getmtime(path) < horizon:
+                continue
+            with open(path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Skipping unreadable drift state {path}: {exc}")
+            continue
+        for kind, state in data.get("monitors", {}).items():
+            peers.setdefault(kind, []).append(state)
+    return peers
+
+
+class DriftPersister:
+    """Background thread that persists drift state every DRIFT_PERSIST_INTERVAL_S."""
+
+    def __init__(self, monitors: dict[str, DriftMonitor], interval_s: float):
+        self._monitors = monitors
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="drift-persister", daemon=True)
+
+    def start(self) -> None:
+        if settings.DRIFT_STATE_DIR and self._interval_s > 0:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+        try:
+            persist_drift_state(self._monitors)
+        except OSError as exc:
+            logger.warning(f"Final drift state persist failed: {exc}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                persist_drift_state(self._monitors)
+            except OSError as exc:
+                logger.warning(f"Drift state persist failed: {exc}")
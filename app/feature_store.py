@@ -0,0 +1,292 @@
+"""
+app/feature_store.py
+─────────────────────
+In-process velocity feature store for fraud scoring.
+
+Keeps, per entity (card / account id), the recent transactions in bounded
+ring buffers and maintains sliding-window aggregates incrementally:
+
+  - txn_count_1m / amount_sum_1m   — last 60 s
+  - txn_count_1h / amount_sum_1h   — last 3600 s
+  - distinct_countries_1h          — distinct countries in the last hour
+  - time_delta                     — hours since the entity's previous transaction
+
+Every update is amortised O(1): each event is appended once and expired once
+per window. Idle entities are evicted by TTL (LRU order), and the number of
+entities and events per entity are capped, so memory stays bounded at
+roughly FEATURE_STORE_MAX_ENTITIES × FEATURE_STORE_MAX_EVENTS_PER_ENTITY events.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import joblib
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+VELOCITY_FEATURES = [
+    "txn_count_1m",
+    "amount_sum_1m",
+    "txn_count_1h",
+    "amount_sum_1h",
+    "distinct_countries_1h",
+]
+SNAPSHOT_VERSION = 1
+
+
+def first_transaction_features(amount: float) -> dict:
+    """Velocity features of an entity with no history: only this transaction."""
+    return {"txn_count_1m": 1, "amount_sum_1m": amount, "txn_count_1h": 1,
+            "amount_sum_1h": amount, "distinct_countries_1h": 1}
+
+
+class _SlidingWindow:
+    """Events in the last `span_s` seconds with running count/sum (+ country counts)."""
+
+    __slots__ = ("span_s", "max_events", "events", "amount_sum", "countries")
+
+    def __init__(self, span_s: float, max_events: int, track_countries: bool = False):
+        self.span_s = span_s
+        self.max_events = max_events
+        self.events: deque[tuple[float, float, str]] = deque()
+        self.amount_sum = 0.0
+        self.countries: dict[str, int] | None = {} if track_countries else None
+
+    def add(self, ts: float, amount: float, country: str) -> None:
+        if len(self.events) >= self.max_events:
+            self._pop()
+        self.events.append((ts, amount, country))
+        self.amount_sum += amount
+        if self.countries is not None:
+            self.countries[country] = self.countries.get(country, 0) + 1
+
+    def expire(self, now: float) -> None:
+        horizon = now - self.span_s
+        while self.events and self.events[0][0] <= horizon:
+            self._pop()
+
+    def _pop(self) -> None:
+        _, amount, country = self.events.popleft()
+        self.amount_sum -= amount
+        if self.countries is not None:
+            remaining = self.countries[country] - 1
+            if remaining:
+                self.countries[country] = remaining
+            else:
+                del self.countries[country]
+        if not self.events:
+            self.amount_sum = 0.0       # reset accumulated float error
+
+    @property
+    def count(self) -> int:
+        return len(self.events)
+
+
+class _EntityState:
+    __slots__ = ("last_ts", "minute", "hour")
+
+    def __init__(self, max_events: int):
+        self.last_ts: float | None = None
+        self.minute = _SlidingWindow(60.0, max_events)
+        self.hour = _SlidingWindow(3600.0, max_events, track_countries=True)
+
+
+class VelocityFeatureStore:
+    """Thread-safe, memory-bounded store of per-entity sliding-window counters."""
+
+    def __init__(self, max_entities: int, max_events_per_entity: int, ttl_s: float):
+        self._max_entities = max_entities
+        self._max_events = max_events_per_entity
+        self._ttl_s = ttl_s
+        self._entities: OrderedDict[str, _EntityState] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_ttl = 0
+        self.evicted_capacity = 0
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    # ── Hot path ───────────────────────────────────────────────
+
+    def observe(
+        self,
+        entity_id: str,
+        amount: float,
+        country: str,
+        ts: float | None = None,
+    ) -> dict:
+        """Records a transaction and returns the entity's velocity features (incl. it)."""
+        now = time.time() if ts is None else ts
+        with self._lock:
+            self._evict_idle(now)
+
+            state = self._entities.get(entity_id)
+            if state is None:
+                state = _EntityState(self._max_events)
+                self._entities[entity_id] = state
+                if len(self._entities) > self._max_entities:
+                    self._entities.popitem(last=False)
+                    self.evicted_capacity += 1
+            else:
+                self._entities.move_to_end(entity_id)
+
+            time_delta = None
+            if state.last_ts is not None:
+                time_delta = max(now - state.last_ts, 0.0) / 3600.0
+            state.last_ts = now if state.last_ts is None else max(state.last_ts, now)
+
+            for window in (state.minute, state.hour):
+                window.expire(now)
+                window.add(now, amount, country)
+
+            return self._features(state, time_delta)
+
+    # ── Maintenance ────────────────────────────────────────────
+
+    def _evict_idle(self, now: float) -> None:
+        # Entities are kept in last-seen order, so only the head can be idle.
+        horizon = now - self._ttl_s
+        while self._entities:
+            entity_id, state = next(iter(self._entities.items()))
+            if state.last_ts is None or state.last_ts > horizon:
+                break
+            del self._entities[entity_id]
+            self.evicted_ttl += 1
+
+    @staticmethod
+    def _features(state: _EntityState, time_delta: float | None) -> dict:
+        return {
+            "time_delta": time_delta,
+            "txn_count_1m": state.minute.count,
+            "amount_sum_1m": state.minute.amount_sum,
+            "txn_count_1h": state.hour.count,
+            "amount_sum_1h": state.hour.amount_sum,
+            "distinct_countries_1h": len(state.hour.countries),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "entities": len(self._entities),
+            "max_entities": self._max_entities,
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+    # ── Snapshot / restore ─────────────────────────────────────
+
+    def snapshot(self, path: str) -> int:
+        """Writes the store to `path` atomically. Returns the number of entities saved."""
+        with self._lock:
+            entities = {
+                entity_id: (state.last_ts, list(state.hour.events))
+                for entity_id, state in self._entities.items()
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({"version": SNAPSHOT_VERSION, "entities": entities}, tmp_path)
+        os.replace(tmp_path, path)
+        return len(entities)
+
+    def restore(self, path: str, now: float | None = None) -> int:
+        """Loads a snapshot written by `snapshot`, dropping expired data. Returns entity count."""
+        data = joblib.load(path)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported feature-store snapshot version: {data.get('version')}")
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entities.clear()
+            for entity_id, (last_ts, events) in data["entities"].items():
+                state = _EntityState(self._max_events)
+                state.last_ts = last_ts
+                for ts, amount, country in events:
+                    state.minute.add(ts, amount, country)
+                    state.hour.add(ts, amount, country)
+                state.minute.expire(now)
+                state.hour.expire(now)
+                self._entities[entity_id] = state
+                if len(self._entities) > self._max_entities:
+                    self._entities.popitem(last=False)
+            self._evict_idle(now)
+            return len(self._entities)
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_feature_store: VelocityFeatureStore | None = None
+
+
+def get_feature_store() -> VelocityFeatureStore:
+    """Returns the singleton VelocityFeatureStore, initialising it on first call."""
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = VelocityFeatureStore(
+            max_entities=settings.FEATURE_STORE_MAX_ENTITIES,
+            max_events_per_entity=settings.FEATURE_STORE_MAX_EVENTS_PER_ENTITY,
+            ttl_s=settings.FEATURE_STORE_TTL_S,
+        )
+    return _feature_store
+
+
+_snapshot_stop = threading.Event()
+_snapshot_thread: threading.Thread | None = None
+
+
+def restore_feature_store() -> None:
+    """Restores the snapshot from FEATURE_STORE_SNAPSHOT_PATH if present."""
+    path = settings.FEATURE_STORE_SNAPSHOT_PATH
+    if not settings.FEATURE_STORE_ENABLED or not path or not os.path.exists(path):
+        return
+    try:
+        n = get_feature_store().restore(path)
+        logger.info(f"Feature store restored — {n} entities from {path}")
+    except Exception as exc:   # a stale/corrupt snapshot must not block startup
+        logger.warning(f"Feature store snapshot {path} ignored: {exc}")
+
+
+def snapshot_feature_store() -> int | None:
+    """Persists the store to FEATURE_STORE_SNAPSHOT_PATH. Returns the entity count."""
+    path = settings.FEATURE_STORE_SNAPSHOT_PATH
+    if not settings.FEATURE_STORE_ENABLED or not path or _feature_store is None:
+        return None
+    return _feature_store.snapshot(path)
+
+
+def _snapshot_loop(interval_s: float) -> None:
+    while not _snapshot_stop.wait(interval_s):
+        try:
+            snapshot_feature_store()
+        except OSError as exc:
+            logger.warning(f"Feature store snapshot failed: {exc}")
+
+
+def start_feature_store() -> None:
+    """
+    Startup hook: restores the last snapshot, then snapshots every
+    FEATURE_STORE_SNAPSHOT_INTERVAL_S so a crash loses at most one interval.
+    """
+    global _snapshot_thread
+    restore_feature_store()
+    interval_s = settings.FEATURE_STORE_SNAPSHOT_INTERVAL_S
+    if not settings.FEATURE_STORE_ENABLED or not settings.FEATURE_STORE_SNAPSHOT_PATH \
+            or interval_s <= 0:
+        return
+    _snapshot_stop.clear()
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, args=(interval_s,),
+                                        name="feature-store-snapshot", daemon=True)
+    _snapshot_thread.start()
+
+
+def stop_feature_store() -> None:
+    """Shutdown hook: stops the periodic snapshots and writes a final one."""
+    global _snapshot_thread
+    _snapshot_stop.set()
+    if _snapshot_thread is not None:
+        _snapshot_thread.join(timeout=5)
+        _snapshot_thread = None
+    n = snapshot_feature_store()
+    if n is not None:
+        logger.info(f"Feature store snapshot — {n} entities to "
+                    f"{settings.FEATURE_STORE_SNAPSHOT_PATH}")
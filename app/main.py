@@ -4,12 +4,24 @@ app/main.py
 FastAPI application entry-point.
 
 Startup sequence:
-  1. DB tables are created (create_all).
+  1. DB tables are created (create_all); the read-replica lag monitor starts.
   2. ML models are loaded into the singleton ModelLoader.
-  3. Routers are mounted.
+  3. The velocity feature store is restored from its last snapshot and
+     periodic snapshots start.
+  4. The drift-state persister is started.
+  5. The similar-anomaly index is loaded (or rebuilt from the DB).
+  6. The prediction sink is started (segment log: leftover segments are
+     recovered and the compactor starts).
+  7. The shadow scorer is started if a shadow model is configured.
+  8. The tenant model registry is scanned and its most used models warmed.
+  9. Alert rules are compiled and the alert dispatcher is started.
+ 10. Traffic capture is started if CAPTURE_SAMPLE_RATE > 0.
+ 11. Routers are mounted.
 
 Middleware:
-  - Latency header (X-Process-Time-ms) on every response.
+  - Admission control / load shedding on prediction routes (see app/admission.py).
+  - Latency header (X-Process-Time-ms) on every response; sampled requests
+    are captured for replay (see app/capture.py).
   - Structured request logging.
 """
 import logging
@@ -18,10 +30,28 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.alerts import start_alert_engine, stop_alert_engine
+from app.capture import (
+    CAPTURED_HEADERS, get_traffic_capture, start_traffic_capture, stop_traffic_capture,
+)
+from app.admission import (
+    DEADLINE_HEADER, AdmissionRejected, get_admission_controller, request_deadline_ms,
+)
 from app.db.init_db import init_db
+from app.db.session import SessionLocal, start_replica_monitor, stop_replica_monitor
+from app.drift import DriftPersister
+from app.feature_store import start_feature_store, stop_feature_store
+from app.shadow import start_shadow_scorer, stop_shadow_scorer
+from app.sinks import start_prediction_sink, stop_prediction_sink
 from app.models.loader import get_model_loader
-from app.routers import fraud, anomaly, metrics
+from app.queues import close_lag_reader
+from app.models.registry import (
+    TenantModelUnavailable, start_model_registry, stop_model_registry,
+)
+from app.similarity import init_anomaly_index, save_anomaly_index
+from app.routers import fraud, anomaly, metrics, drift, stream
 from app.config import settings
 
 # ── Logging setup ─────────────────────────────────────────────
@@ -40,10 +70,30 @@ async def lifespan(app: FastAPI):
     logger.info(f"Database    : {settings.DATABASE_URL.split('@')[-1]}")  # hide credentials
     init_db()
     logger.info("Database tables initialised.")
-    get_model_loader()   # warm up the singleton
+    start_replica_monitor()
+    loader = get_model_loader()   # warm up the singleton
     logger.info("ML models loaded and ready.")
+    start_feature_store()
+    drift_persister = DriftPersister(loader.drift_monitors, settings.DRIFT_PERSIST_INTERVAL_S)
+    drift_persister.start()
+    init_anomaly_index(SessionLocal)
+    start_prediction_sink(SessionLocal)
+    start_shadow_scorer(SessionLocal)
+    start_model_registry()
+    start_alert_engine()
+    start_traffic_capture()
     yield
     logger.info("=== Platform shutting down ===")
+    stop_traffic_capture()
+    stop_alert_engine()
+    stop_model_registry()
+    stop_shadow_scorer()
+    stop_prediction_sink()          # flushes segments (and their similar-anomaly points)
+    save_anomaly_index()
+    drift_persister.stop()
+    stop_feature_store()
+    stop_replica_monitor()
+    close_lag_reader()
 
 
 # ── Application ───────────────────────────────────────────────
@@ -70,13 +120,57 @@ app.add_middleware(
 )
 
 
+# ── Error handlers ────────────────────────────────────────────
+@app.exception_handler(TenantModelUnavailable)
+async def tenant_model_unavailable(request: Request, exc: TenantModelUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+# ── Admission control middleware ──────────────────────────────
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    controller = get_admission_controller(request.url.path)
+    if controller is None:
+        return await call_next(request)
+
+    deadline_ms = request_deadline_ms(request.headers.get(DEADLINE_HEADER))
+    try:
+        queued_ms = await controller.acquire(deadline_ms)
+    except AdmissionRejected as exc:
+        logger.warning(f"Shed {request.method} {request.url.path}: {exc.reason}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Service overloaded ({exc.reason}); retry later."},
+            headers={"Retry-After": str(exc.retry_after_s)},
+        )
+
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        controller.release((time.perf_counter() - t0) * 1000)
+    response.headers["X-Queue-Time-ms"] = f"{queued_ms:.3f}"
+    return response
+
+
 # ── Latency middleware ────────────────────────────────────────
 @app.middleware("http")
 async def add_latency_header(request: Request, call_next):
+    arrived_at = time.time()
     t0 = time.perf_counter()
+    capture = get_traffic_capture()
+    body = None
+    if capture is not None and capture.sample(request.method, request.url.path,
+                                              request.headers.get("content-length")):
+        body = await request.body()         # cached: the route still reads it
     response = await call_next(request)
     elapsed_ms = (time.perf_counter() - t0) * 1000
     response.headers["X-Process-Time-ms"] = f"{elapsed_ms:.3f}"
+    if body is not None:
+        path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        headers = {k: v for k, v in request.headers.items() if k in CAPTURED_HEADERS}
+        capture.record(arrived_at, request.method, path, headers, body,
+                       response.status_code, elapsed_ms)
     logger.debug(f"{request.method} {request.url.path} → {response.status_code} "
                  f"({elapsed_ms:.2f}ms)")
     return response
@@ -86,6 +180,8 @@ async def add_latency_header(request: Request, call_next):
 app.include_router(fraud.router)
 app.include_router(anomaly.router)
 app.include_router(metrics.router)
+app.include_router(drift.router)
+app.include_router(stream.router)
 
 
 # ── Health check ──────────────────────────────────────────────
@@ -94,6 +190,6 @@ def health():
     return {
         "status": "ok",
         "environment": settings.ENV,
-        "fraud_model": get_model_loader()._fraud_meta["model_version"],
-        "anomaly_model": get_model_loader()._anomaly_meta["model_version"],
+        "fraud_model": get_model_loader().model_version("fraud"),
+        "anomaly_model": get_model_loader().model_version("anomaly"),
     }
@@ -3,35 +3,243 @@ app/models/loader.py
 ─────────────────────
 Singleton ModelLoader: loads both fraud and anomaly models at startup.
 Thread-safe via module-level singleton pattern.
+
+Every prediction also updates the model's DriftMonitor (app/drift.py).
+The `score_*` / `explain_*` methods are the vectorised (n, n_features)
+entry points used by the batch endpoints; `predict_*` wrap them for a
+single row.
+
+Besides the primary artifact, each kind may have candidate variants:
+  - "canary": serves FRAUD/ANOMALY_CANARY_PERCENT of live traffic
+    (`route()` picks the variant synchronously per request);
+  - "shadow": never serves; app/shadow.py re-scores requests with it on a
+    background thread for comparison.
+All scoring methods take `variant=` (default "primary"), which may also be
+a FraudModel / AnomalyModel from the tenant registry (app/models/registry.py).
+Only primary traffic feeds the drift monitors, whose reference is the
+primary model.
 """
 import logging
+import random
+import zlib
+
 import numpy as np
 import joblib
 from app.config import settings
+from app.drift import DriftMonitor
+from app.feature_store import first_transaction_features
+from app.models.explain import IsolationForestExplainer, LinearExplainer
 
 logger = logging.getLogger(__name__)
 
+KINDS = ("fraud", "anomaly")
+VARIANTS = ("primary", "canary", "shadow")
+
+
+class FraudModel:
+    """One fraud artifact: StandardScaler → LogisticRegression pipeline + metadata."""
+
+    def __init__(self, artifact: dict):
+        self.pipeline = artifact["pipeline"]
+        self.meta = artifact["metadata"]
+        self.explainer = LinearExplainer(self.pipeline)
+
+    @property
+    def model_version(self) -> str:
+        return self.meta["model_version"]
+
+    @property
+    def features(self) -> list[str]:
+        return self.meta["features"]
+
+    def encode(
+        self,
+        transaction_amount: float,
+        merchant_type: str,
+        country: str,
+        time_delta: float,
+        device_type: str,
+        velocity: dict | None = None,
+    ) -> list[float]:
+        """
+        Builds one model input row in metadata["features"] order.
+
+        `velocity` carries the derived per-entity features from the feature
+        store; any of them listed in the artifact's metadata["features"] are
+        fed to the model. Without it (no entity_id, bulk scoring, backfill)
+        they take the values of an entity's first transaction.
+        """
+        enc = self.meta["encodings"]
+        values = {
+            "transaction_amount": transaction_amount,
+            "merchant_type": enc["merchant_type"].get(merchant_type, 0),
+            "country": enc["country"].get(country, 0),
+            "time_delta": time_delta,
+            "device_type": enc["device_type"].get(device_type, 0),
+        }
+        velocity = velocity or first_transaction_features(transaction_amount)
+        return [
+            values[name] if name in values else velocity.get(name, 0.0)
+            for name in self.features
+        ]
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        return self.pipeline.predict_proba(X)[:, 1]
+
+    def explain(self, X: np.ndarray) -> tuple[float, np.ndarray]:
+        return self.explainer.base_value, self.explainer.explain(X)
+
+
+class AnomalyModel:
+    """One anomaly artifact: StandardScaler → IsolationForest pipeline + metadata."""
+
+    def __init__(self, artifact: dict):
+        self.pipeline = artifact["pipeline"]
+        self.meta = artifact["metadata"]
+        self.explainer = IsolationForestExplainer(
+            self.pipeline.named_steps["iso"], n_features=len(self.features)
+        )
+
+    @property
+    def model_version(self) -> str:
+        return self.meta["model_version"]
+
+    @property
+    def features(self) -> list[str]:
+        return self.meta["features"]
+
+    def scale(self, X: np.ndarray) -> np.ndarray:
+        return self.pipeline.named_steps["scaler"].transform(
+            np.asarray(X, dtype=float).reshape(-1, 4)
+        )
+
+    def normalise(self, raw: np.ndarray) -> np.ndarray:
+        # Normalise using training-time range stored in metadata
+        s_min = self.meta["score_range"]["min"]
+        s_max = self.meta["score_range"]["max"]
+        return np.clip(1.0 - (raw - s_min) / (s_max - s_min + 1e-9), 0.0, 1.0)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        iso = self.pipeline.named_steps["iso"]
+        return self.normalise(iso.decision_function(self.scale(X)))
+
+    def explain(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        raw, shares = self.explainer.explain(self.scale(X))
+        return self.normalise(raw), shares
+
+
+MODEL_CLASSES = {"fraud": FraudModel, "anomaly": AnomalyModel}
+Variant = str | FraudModel | AnomalyModel
+
 
 class ModelLoader:
     """Loads and wraps the fraud + anomaly model pipelines."""
 
     def __init__(self):
         logger.info("Loading ML models from disk …")
-        fraud_artifact = joblib.load(settings.FRAUD_MODEL_PATH)
-        anomaly_artifact = joblib.load(settings.ANOMALY_MODEL_PATH)
-
-        self._fraud_pipeline = fraud_artifact["pipeline"]
-        self._fraud_meta = fraud_artifact["metadata"]
-        self._anomaly_pipeline = anomaly_artifact["pipeline"]
-        self._anomaly_meta = anomaly_artifact["metadata"]
-
+        self.models: dict[str, dict[str, FraudModel | AnomalyModel]] = {
+            "fraud": {"primary": FraudModel(joblib.load(settings.FRAUD_MODEL_PATH))},
+            "anomaly": {"primary": AnomalyModel(joblib.load(settings.ANOMALY_MODEL_PATH))},
+        }
+        self.drift_monitors = {
+            kind: DriftMonitor.from_metadata(self.models[kind]["primary"].meta) for kind in KINDS
+        }
         logger.info(
-            f"Models loaded — fraud={self._fraud_meta['model_version']}  "
-            f"anomaly={self._anomaly_meta['model_version']}"
+            f"Models loaded — fraud={self.model_version('fraud')}  "
+            f"anomaly={self.model_version('anomaly')}"
         )
 
+        for kind, variant, path in (
+            ("fraud", "canary", settings.FRAUD_CANARY_MODEL_PATH),
+            ("fraud", "shadow", settings.FRAUD_SHADOW_MODEL_PATH),
+            ("anomaly", "canary", settings.ANOMALY_CANARY_MODEL_PATH),
+            ("anomaly", "shadow", settings.ANOMALY_SHADOW_MODEL_PATH),
+        ):
+            if path:
+                try:
+                    self.load_variant(kind, variant, path)
+                except Exception as exc:
+                    # A broken candidate must never take the primary down with it
+                    logger.error(f"Could not load {kind} {variant} model from {path}: {exc}")
+
+    # ── Variants ───────────────────────────────────────────────
+
+    def load_variant(self, kind: str, variant: str, path: str) -> None:
+        """Loads a candidate artifact ("canary" / "shadow") next to the primary."""
+        if variant not in VARIANTS[1:]:
+            raise ValueError(f"Unknown candidate variant: {variant}")
+        model = MODEL_CLASSES[kind](joblib.load(path))
+        self.models[kind][variant] = model
+        logger.info(f"Loaded {kind} {variant} model {model.model_version}")
+
+    def has_variant(self, kind: str, variant: str) -> bool:
+        return variant in self.models[kind]
+
+    def model_version(self, kind: str, variant: Variant = "primary") -> str:
+        return self.get_model(kind, variant).model_version
+
+    def features(self, kind: str, variant: Variant = "primary") -> list[str]:
+        return self.get_model(kind, variant).features
+
+    def get_model(self, kind: str, variant: Variant) -> FraudModel | AnomalyModel:
+        """A variant name, or a model object (e.g. a tenant model) passed through."""
+        if isinstance(variant, str):
+            return self.models[kind][variant]
+        return variant
+
+    def route(self, kind: str, key: str | None = None) -> str:
+        """
+        Picks the serving variant for one request: "canary" for the
+        configured percentage of traffic when a canary is loaded, else
+        "primary". With a `key` (e.g. entity_id) the choice is sticky.
+        """
+        if "canary" not in self.models[kind]:
+            return "primary"
+        percent = (settings.FRAUD_CANARY_PERCENT if kind == "fraud"
+                   else settings.ANOMALY_CANARY_PERCENT)
+        if percent <= 0:
+            return "primary"
+        if key is not None:
+            draw = zlib.crc32(key.encode()) % 10_000 / 100.0
+        else:
+            draw = random.random() * 100.0
+        return "canary" if draw < percent else "primary"
+
     # ── Fraud ──────────────────────────────────────────────────
 
+    @property
+    def fraud_features(self) -> list[str]:
+        return self.models["fraud"]["primary"].features
+
+    def encode_fraud(
+        self,
+        transaction_amount: float,
+        merchant_type: str,
+        country: str,
+        time_delta: float,
+        device_type: str,
+        velocity: dict | None = None,
+        variant: Variant = "primary",
+    ) -> list[float]:
+        """One model input row in the variant's metadata["features"] order."""
+        return self.get_model("fraud", variant).encode(
+            transaction_amount, merchant_type, country, time_delta, device_type, velocity
+        )
+
+    def score_fraud(self, X: np.ndarray, variant: Variant = "primary") -> np.ndarray:
+        """Fraud probabilities for an encoded (n, n_features) matrix."""
+        X = np.asarray(X, dtype=float)
+        probs = self.get_model("fraud", variant).score(X)
+        if variant == "primary":
+            self._observe_drift("fraud", X, probs)
+        return probs
+
+    def explain_fraud(
+        self, X: np.ndarray, variant: Variant = "primary",
+    ) -> tuple[float, np.ndarray]:
+        """(base logit, (n, n_features) per-feature logit contributions)."""
+        return self.get_model("fraud", variant).explain(X)
+
     def predict_fraud(
         self,
         transaction_amount: float,
@@ -39,42 +247,66 @@ class ModelLoader:
         country: str,
         time_delta: float,
         device_type: str,
+        velocity: dict | None = None,
+        variant: Variant = "primary",
     ) -> tuple[float, str]:
         """Returns (fraud_probability, model_version)."""
-        enc = self._fraud_meta["encodings"]
-        merchant_idx = enc["merchant_type"].get(merchant_type, 0)
-        country_idx = enc["country"].get(country, 0)
-        device_idx = enc["device_type"].get(device_type, 0)
-
-        X = np.array([[transaction_amount, merchant_idx, country_idx,
-                       time_delta, device_idx]], dtype=float)
-        prob = float(self._fraud_pipeline.predict_proba(X)[0][1])
-        return prob, self._fraud_meta["model_version"]
+        row = self.encode_fraud(transaction_amount, merchant_type, country,
+                                time_delta, device_type, velocity, variant=variant)
+        prob = float(self.score_fraud(np.array([row], dtype=float), variant=variant)[0])
+        return prob, self.model_version("fraud", variant)
 
     # ── Anomaly ────────────────────────────────────────────────
 
+    @property
+    def anomaly_features(self) -> list[str]:
+        return self.models["anomaly"]["primary"].features
+
+    def scale_anomaly(self, X: np.ndarray, variant: Variant = "primary") -> np.ndarray:
+        """Raw anomaly features (n, 4) → the scaled space the IsolationForest sees."""
+        return self.get_model("anomaly", variant).scale(X)
+
+    def score_anomaly(self, X: np.ndarray, variant: Variant = "primary") -> np.ndarray:
+        """Anomaly scores [0-1] for a raw (n, 4) feature matrix."""
+        X = np.asarray(X, dtype=float)
+        scores = self.get_model("anomaly", variant).score(X)
+        if variant == "primary":
+            self._observe_drift("anomaly", X, scores)
+        return scores
+
+    def explain_anomaly(
+        self, X: np.ndarray, variant: Variant = "primary",
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (anomaly scores [0-1], (n, 4) path-split attribution shares), computed
+        in a single pass over the forest.
+        """
+        X = np.asarray(X, dtype=float)
+        scores, shares = self.get_model("anomaly", variant).explain(X)
+        if variant == "primary":
+            self._observe_drift("anomaly", X, scores)
+        return scores, shares
+
     def predict_anomaly(
         self,
         response_time: float,
         error_rate: float,
         cpu_usage: float,
         memory_usage: float,
+        variant: Variant = "primary",
     ) -> tuple[float, str]:
         """Returns (anomaly_score [0-1], model_version)."""
         X = np.array([[response_time, error_rate, cpu_usage, memory_usage]], dtype=float)
+        score = float(self.score_anomaly(X, variant=variant)[0])
+        return score, self.model_version("anomaly", variant)
 
-        iso = self._anomaly_pipeline.named_steps["iso"]
-        scaler = self._anomaly_pipeline.named_steps["scaler"]
-        X_sc = scaler.transform(X)
-        raw = float(iso.decision_function(X_sc)[0])
-
-        # Normalise using training-time range stored in metadata
-        s_min = self._anomaly_meta["score_range"]["min"]
-        s_max = self._anomaly_meta["score_range"]["max"]
-        score = 1.0 - (raw - s_min) / (s_max - s_min + 1e-9)
-        score = float(np.clip(score, 0.0, 1.0))
+    # ── Drift ──────────────────────────────────────────────────
 
-        return score, self._anomaly_meta["model_version"]
+    def _observe_drift(self, kind: str, X: np.ndarray, scores: np.ndarray) -> None:
+        if len(X) == 1:
+            self.drift_monitors[kind].observe(X[0], float(scores[0]))
+        else:
+            self.drift_monitors[kind].observe_batch(X, scores)
 
 
 # ── Module-level singleton ─────────────────────────────────────
@@ -0,0 +1,383 @@
+"""
+app/models/registry.py
+───────────────────────
+Multi-tenant model registry: per-customer fraud / anomaly artifacts,
+selected per request by the X-Tenant-ID header.
+
+Layout under MODEL_REGISTRY_DIR:
+
+    <tenant>/<fraud|anomaly>/<model_version>.pkl
+    <tenant>/<fraud|anomaly>/CURRENT            optional: pins a version
+
+Without CURRENT the highest version (natural sort) is served.
+
+  - Discovery: a periodic scan builds the catalogue of available artifacts;
+    nothing is loaded until a tenant's first request (lazy).
+  - Residency: loaded models sit in an LRU bounded by MODEL_REGISTRY_MAX_BYTES
+    (artifact file size as the footprint estimate); least-recently-used
+    models are evicted to make room.
+  - Warm start: per-(tenant, kind) request counts are saved to
+    MODEL_REGISTRY_USAGE_PATH and the most used models are loaded at startup.
+  - Atomic swaps: when a scan finds a new current version for a resident
+    model, the new artifact is loaded on the scanner thread and replaces the
+    old one in a single dict assignment; in-flight requests finish on the
+    model object they already hold.
+
+Loads, evictions, swaps, hit rate and per-tenant latency are exposed via
+GET /v1/metrics/registry.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import joblib
+
+from app.config import settings
+from app.models.loader import KINDS, MODEL_CLASSES, AnomalyModel, FraudModel
+
+logger = logging.getLogger(__name__)
+
+TENANT_HEADER = "X-Tenant-ID"
+CURRENT_FILE = "CURRENT"
+
+
+class TenantModelUnavailable(RuntimeError):
+    """A tenant's artifact exists but could not be loaded."""
+
+    def __init__(self, tenant: str, kind: str, version: str):
+        super().__init__(f"{kind} model {version} for tenant {tenant!r} could not be loaded")
+        self.tenant = tenant
+        self.kind = kind
+        self.version = version
+
+
+def _version_key(version: str) -> list:
+    """Natural sort key: 'fraud-v1.10.0' > 'fraud-v1.9.0'."""
+    return [(0, int(part)) if part.isdigit() else (1, part)
+            for part in re.split(r"(\d+)", version) if part]
+
+
+class _Resident:
+    __slots__ = ("model", "version", "nbytes")
+
+    def __init__(self, model, version: str, nbytes: int):
+        self.model = model
+        self.version = version
+        self.nbytes = nbytes
+
+
+class ModelRegistry:
+    """Lazily loaded, byte-bounded LRU of per-tenant models."""
+
+    def __init__(self, root: str, max_bytes: int, usage_path: str = ""):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.usage_path = usage_path
+        self._lock = threading.Lock()
+        self._catalogue: dict[tuple[str, str], tuple[str, str]] = {}   # key → (version, path)
+        self._resident: OrderedDict[tuple[str, str], _Resident] = OrderedDict()
+        self._resident_bytes = 0
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._usage: dict[tuple[str, str], int] = {}
+        self._latency: dict[tuple[str, str], list[float]] = {}        # key → [count, total, max]
+        self._counters = {"hits": 0, "misses": 0, "loads": 0, "evictions": 0, "swaps": 0,
+                          "load_errors": 0, "load_ms_total": 0.0}
+        self._events: deque = deque(maxlen=100)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._load_usage()
+
+    # ── Discovery ─────────────────────────────────────────────
+
+    def _discover(self) -> dict[tuple[str, str], tuple[str, str]]:
+        catalogue = {}
+        try:
+            tenants = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return catalogue
+        for tenant in tenants:
+            for kind in KINDS:
+                kind_dir = os.path.join(self.root, tenant, kind)
+                if not os.path.isdir(kind_dir):
+                    continue
+                versions = {f[:-4]: os.path.join(kind_dir, f)
+                            for f in os.listdir(kind_dir) if f.endswith(".pkl")}
+                if not versions:
+                    continue
+                current = None
+                current_path = os.path.join(kind_dir, CURRENT_FILE)
+                if os.path.exists(current_path):
+                    with open(current_path) as f:
+                        current = f.read().strip()
+                    if current not in versions:
+                        logger.warning(f"[registry] {tenant}/{kind}: CURRENT names "
+                                       f"unknown version {current!r}; using latest")
+                        current = None
+                if current is None:
+                    current = max(versions, key=_version_key)
+                catalogue[(tenant, kind)] = (current, versions[current])
+        return catalogue
+
+    def scan(self) -> None:
+        """Refreshes the catalogue and swaps resident models whose version changed."""
+        catalogue = self._discover()
+        with self._lock:
+            self._catalogue = catalogue
+            stale = [(key, catalogue.get(key)) for key, entry in self._resident.items()
+                     if catalogue.get(key, (entry.version,))[0] != entry.version]
+        for key, target in stale:
+            if target is None:
+                continue                    # artifact removed: keep serving what is loaded
+            try:
+                model, nbytes, load_ms = self._load_artifact(target[1])
+            except Exception as exc:
+                self._record_load_error(key, target[0], exc)
+                continue
+            with self._lock:
+                old = self._resident.get(key)
+                if old is None:
+                    continue                # evicted meanwhile; next request loads lazily
+                self._resident[key] = _Resident(model, target[0], nbytes)
+                self._resident_bytes += nbytes - old.nbytes
+                self._counters["swaps"] += 1
+                self._event("swap", key, target[0], f"from {old.version}")
+                self._evict_over_budget(keep=key)
+            logger.info(f"[registry] swapped {key[0]}/{key[1]} {old.version} → {target[0]} "
+                        f"({load_ms:.1f}ms)")
+
+    # ── Lookup ────────────────────────────────────────────────
+
+    def has(self, tenant: str, kind: str) -> bool:
+        return (tenant, kind) in self._catalogue
+
+    def get(self, tenant: str, kind: str) -> FraudModel | AnomalyModel | None:
+        """The tenant's current model, loading it on first use; None if it has none."""
+        key = (tenant, kind)
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is None and key not in self._catalogue:
+                return None
+            self._usage[key] = self._usage.get(key, 0) + 1
+            if entry is not None:
+                self._resident.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry.model
+            self._counters["misses"] += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:                      # one load per key, other tenants unaffected
+            with self._lock:
+                entry = self._resident.get(key)
+                if entry is not None:
+                    return entry.model
+                target = self._catalogue.get(key)
+            if target is None:
+                return None
+            try:
+                model, nbytes, _ = self._load_artifact(target[1])
+            except Exception as exc:
+                self._record_load_error(key, target[0], exc)
+                raise TenantModelUnavailable(tenant, kind, target[0]) from exc
+            with self._lock:
+                self._insert(key, _Resident(model, target[0], nbytes))
+            return model
+
+    def record_latency(self, tenant: str, kind: str, latency_ms: float) -> None:
+        with self._lock:
+            stat = self._latency.setdefault((tenant, kind), [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += latency_ms
+            stat[2] = max(stat[2], latency_ms)
+
+    # ── Residency ─────────────────────────────────────────────
+
+    def _load_artifact(self, path: str):
+        t0 = time.perf_counter()
+        artifact = joblib.load(path)
+        kind = os.path.basename(os.path.dirname(path))
+        model = MODEL_CLASSES[kind](artifact)
+        load_ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._counters["loads"] += 1
+            self._counters["load_ms_total"] += load_ms
+        return model, os.path.getsize(path), load_ms
+
+    def _insert(self, key: tuple[str, str], entry: _Resident) -> None:
+        """Adds a resident model (caller holds the lock) and evicts LRU to fit."""
+        self._resident[key] = entry
+        self._resident_bytes += entry.nbytes
+        self._event("load", key, entry.version, f"{entry.nbytes} bytes")
+        logger.info(f"[registry] loaded {key[0]}/{key[1]} {entry.version} "
+                    f"({entry.nbytes} bytes, resident={self._resident_bytes})")
+        self._evict_over_budget(keep=key)
+
+    def _evict_over_budget(self, keep: tuple[str, str]) -> None:
+        while self._resident_bytes > self.max_bytes and len(self._resident) > 1:
+            key = next(iter(self._resident))
+            if key == keep:
+                self._resident.move_to_end(key)
+                key = next(iter(self._resident))
+            entry = self._resident.pop(key)
+            self._resident_bytes -= entry.nbytes
+            self._counters["evictions"] += 1
+            self._event("evict", key, entry.version, f"{entry.nbytes} bytes")
+            logger.info(f"[registry] evicted {key[0]}/{key[1]} {entry.version}")
+
+    def _record_load_error(self, key: tuple[str, str], version: str, exc: Exception) -> None:
+        with self._lock:
+            self._counters["load_errors"] += 1
+            self._event("load_error", key, version, str(exc))
+        logger.error(f"[registry] failed to load {key[0]}/{key[1]} {version}: {exc}")
+
+    def _event(self, event: str, key: tuple[str, str], version: str, detail: str) -> None:
+        self._events.append({"ts": round(time.time(), 3), "event": event, "tenant": key[0],
+                             "kind": key[1], "model_version": version, "detail": detail})
+
+    # ── Warm start ────────────────────────────────────────────
+
+    def warm(self, count: int) -> int:
+        """Loads the `count` most used models that fit in the byte budget."""
+        with self._lock:
+            ranked = sorted(self._usage.items(), key=lambda kv: kv[1], reverse=True)
+            candidates = [key for key, _ in ranked if key in self._catalogue][:count]
+        loaded = 0
+        for tenant, kind in candidates:
+            path = self._catalogue[(tenant, kind)][1]
+            if self._resident_bytes + os.path.getsize(path) > self.max_bytes:
+                break
+            try:
+                if self.get(tenant, kind) is not None:
+                    loaded += 1
+            except TenantModelUnavailable:
+                continue                    # already counted as a load error
+        if loaded:
+            logger.info(f"[registry] warmed {loaded} model(s)")
+        return loaded
+
+    def _load_usage(self) -> None:
+        if not self.usage_path or not os.path.exists(self.usage_path):
+            return
+        try:
+            with open(self.usage_path) as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"[registry] ignoring unreadable usage file: {exc}")
+            return
+        self._usage = {tuple(k.split("/", 1)): int(v) for k, v in raw.items() if "/" in k}
+
+    def save_usage(self) -> None:
+        if not self.usage_path:
+            return
+        with self._lock:
+            raw = {f"{t}/{k}": n for (t, k), n in self._usage.items()}
+        tmp = f"{self.usage_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(raw, f)
+        os.replace(tmp, self.usage_path)
+
+    # ── Background scanner ────────────────────────────────────
+
+    def start(self, interval_s: float) -> None:
+        if interval_s > 0:
+            self._thread = threading.Thread(target=self._run, args=(interval_s,),
+                                            name="model-registry-scan", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        try:
+            self.save_usage()
+        except OSError as exc:
+            logger.warning(f"[registry] usage save failed: {exc}")
+
+    def _run(self, interval_s: float) -> None:
+        while not self._stop.wait(interval_s):
+            try:
+                self.scan()
+                self.save_usage()
+            except OSError as exc:
+                logger.warning(f"[registry] scan failed: {exc}")
+
+    # ── Reporting ─────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self._counters)
+            lookups = c["hits"] + c["misses"]
+            return {
+                "root": self.root,
+                "tenants": len({t for t, _ in self._catalogue}),
+                "available_models": len(self._catalogue),
+                "resident_models": len(self._resident),
+                "resident_bytes": self._resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "hit_rate": round(c["hits"] / lookups, 4) if lookups else 0.0,
+                "loads": c["loads"],
+                "load_errors": c["load_errors"],
+                "avg_load_ms": round(c["load_ms_total"] / c["loads"], 3) if c["loads"] else 0.0,
+                "evictions": c["evictions"],
+                "swaps": c["swaps"],
+                "resident": [
+                    {"tenant": t, "kind": k, "model_version": e.version, "bytes": e.nbytes}
+                    for (t, k), e in reversed(self._resident.items())
+                ],
+                "latency": [
+                    {"tenant": t, "kind": k, "requests": n,
+                     "avg_latency_ms": round(total / n, 3), "max_latency_ms": round(mx, 3)}
+                    for (t, k), (n, total, mx) in sorted(self._latency.items())
+                ],
+                "events": list(self._events),
+            }
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_registry: ModelRegistry | None = None
+
+
+def get_model_registry() -> ModelRegistry | None:
+    """The registry, or None when MODEL_REGISTRY_DIR is not configured."""
+    return _registry
+
+
+def start_model_registry() -> None:
+    """Startup hook: discover artifacts, warm the most used models, start scanning."""
+    global _registry
+    if not settings.MODEL_REGISTRY_DIR:
+        return
+    _registry = ModelRegistry(settings.MODEL_REGISTRY_DIR, settings.MODEL_REGISTRY_MAX_BYTES,
+                              settings.MODEL_REGISTRY_USAGE_PATH)
+    _registry.scan()
+    logger.info(f"Model registry: {_registry.stats()['available_models']} tenant model(s) "
+                f"under {settings.MODEL_REGISTRY_DIR}")
+    _registry.warm(settings.MODEL_REGISTRY_WARM_COUNT)
+    _registry.start(settings.MODEL_REGISTRY_SCAN_INTERVAL_S)
+
+
+def stop_model_registry() -> None:
+    global _registry
+    if _registry is not None:
+        _registry.stop()
+        _registry = None
+
+
+def get_tenant_model(kind: str, tenant_id: str | None) -> FraudModel | AnomalyModel | None:
+    """
+    Route hook: the tenant's model for `kind`, or None to serve the shared
+    model. Raises TenantModelUnavailable if the tenant's artifact is broken.
+    """
+    if tenant_id is None or _registry is None:
+        return None
+    return _registry.get(tenant_id, kind)
+
+
+def record_tenant_latency(kind: str, tenant_id: str, latency_ms: float) -> None:
+    if _registry is not None:
+        _registry.record_latency(tenant_id, kind, latency_ms)
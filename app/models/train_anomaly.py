@@ -14,6 +14,8 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
+from app.drift import reference_histogram
+
 # ── Reproducibility ──────────────────────────────────────────
 SEED = 42
 np.random.seed(SEED)
@@ -68,13 +70,27 @@ avg_normal = scores_norm[:50].mean()
 avg_anom = scores_norm[50:].mean()
 print(f"[anomaly] Sanity — avg normal score: {avg_normal:.3f} | avg anomaly score: {avg_anom:.3f}")
 
+# ── Reference distributions (drift monitoring) ───────────────
+feature_names = ["response_time", "error_rate", "cpu_usage", "memory_usage"]
+train_raw = pipeline.named_steps["iso"].decision_function(
+    pipeline.named_steps["scaler"].transform(X_train)
+)
+train_scores = np.clip(1 - (train_raw - score_min) / (score_max - score_min + 1e-9), 0.0, 1.0)
+reference = {
+    "features": {
+        name: reference_histogram(X_train[:, i]) for i, name in enumerate(feature_names)
+    },
+    "score": reference_histogram(train_scores),
+}
+
 # ── Metadata ─────────────────────────────────────────────────
 metadata = {
     "model_version": "anomaly-v1.0.0",
     "algorithm": "IsolationForest",
-    "features": ["response_time", "error_rate", "cpu_usage", "memory_usage"],
+    "features": feature_names,
     "contamination": 0.05,
     "score_range": {"min": float(score_min), "max": float(score_max)},
+    "reference": reference,
     "training_samples": int(len(X_train)),
     "trained_at": "2026-02-19",
 }
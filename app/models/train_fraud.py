@@ -16,6 +16,9 @@ from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 
+from app.drift import reference_histogram
+from app.feature_store import VELOCITY_FEATURES
+
 # ── Reproducibility ──────────────────────────────────────────
 SEED = 42
 np.random.seed(SEED)
@@ -37,12 +40,25 @@ country_idx = np.random.choice(len(countries), size=N)
 time_delta = np.random.exponential(scale=24, size=N)
 device_type_idx = np.random.choice(len(device_types), size=N)
 
-# Fraud signal: high amount + short time_delta + risky country/device
+# Velocity features (app/feature_store.py): the card's recent activity,
+# including this transaction. A minority of cards are in a burst.
+burst = np.random.rand(N) < 0.08
+txn_count_1h = 1 + np.random.poisson(1.0, size=N) + burst * np.random.poisson(6.0, size=N)
+txn_count_1m = 1 + np.random.binomial(txn_count_1h - 1, np.where(burst, 0.7, 0.05))
+amount_sum_1m = transaction_amount + (txn_count_1m - 1) * np.random.exponential(scale=500, size=N)
+amount_sum_1h = amount_sum_1m + (txn_count_1h - txn_count_1m) * np.random.exponential(
+    scale=500, size=N)
+distinct_countries_1h = 1 + np.random.binomial(
+    np.minimum(txn_count_1h - 1, len(countries) - 1), np.where(burst, 0.5, 0.1))
+
+# Fraud signal: high amount + short time_delta + risky country/device + bursts
 fraud_score = (
     (transaction_amount > 1500).astype(float) * 0.4
     + (time_delta < 1.0).astype(float) * 0.3
     + (country_idx >= 4).astype(float) * 0.2          # CN, NG, RU = riskier
     + (merchant_type_idx == 4).astype(float) * 0.1    # gaming = riskier
+    + (txn_count_1m >= 3).astype(float) * 0.3         # card-testing bursts
+    + (distinct_countries_1h >= 3).astype(float) * 0.2
 )
 labels = (fraud_score + np.random.normal(0, 0.1, N) > 0.45).astype(int)
 
@@ -52,6 +68,11 @@ X = np.column_stack([
     country_idx,
     time_delta,
     device_type_idx,
+    txn_count_1m,
+    amount_sum_1m,
+    txn_count_1h,
+    amount_sum_1h,
+    distinct_countries_1h,
 ])
 y = labels
 
@@ -71,18 +92,35 @@ y_pred = pipeline.predict(X_test)
 print("[fraud] Classification report:")
 print(classification_report(y_test, y_pred))
 
+# ── Reference distributions (drift monitoring) ───────────────
+categorical_edges = {
+    "merchant_type": [i + 0.5 for i in range(len(merchant_types) - 1)],
+    "country": [i + 0.5 for i in range(len(countries) - 1)],
+    "device_type": [i + 0.5 for i in range(len(device_types) - 1)],
+}
+feature_names = ["transaction_amount", "merchant_type", "country", "time_delta",
+                 "device_type"] + VELOCITY_FEATURES
+reference = {
+    "features": {
+        name: reference_histogram(X_train[:, i], edges=categorical_edges.get(name))
+        for i, name in enumerate(feature_names)
+    },
+    "score": reference_histogram(pipeline.predict_proba(X_train)[:, 1]),
+}
+
 # ── Metadata ─────────────────────────────────────────────────
 metadata = {
-    "model_version": "fraud-v1.0.0",
+    "model_version": "fraud-v1.1.0",
     "algorithm": "LogisticRegression",
-    "features": ["transaction_amount", "merchant_type", "country", "time_delta", "device_type"],
+    "features": feature_names,
     "encodings": {
         "merchant_type": merchant_enc,
         "country": country_enc,
         "device_type": device_enc,
     },
+    "reference": reference,
     "training_samples": int(len(X_train)),
-    "trained_at": "2026-02-19",
+    "trained_at": "2026-10-19",
 }
 
 # ── Persist ──────────────────────────────────────────────────
@@ -0,0 +1,304 @@
+"""
+app/queues.py
+──────────────
+Queue backends for asynchronous scoring jobs (consumed by app/worker.py).
+
+A job is one JSON object:
+
+    {"job_id": "order-81723", "kind": "fraud", "payload": {...predict request...}}
+
+`job_id` is the idempotency key; when omitted, the queue message id is used
+(stable across redeliveries of the same message).
+
+Two backends, chosen by URL scheme (QUEUE_URL / --queue):
+
+  - redis://host:6379/0  — Redis Streams with a consumer group. Delivery is
+    XREADGROUP; messages stay in the group's pending list until XACK, and
+    pending messages idle longer than QUEUE_VISIBILITY_TIMEOUT_S are
+    reclaimed (XAUTOCLAIM) by the next fetch. Optional dependency: redis.
+  - sqlite:///path/queue.db — a local file-backed queue for development
+    and tests. Fetch claims rows in one write transaction; acknowledged
+    rows are deleted, and claims older than the visibility timeout are
+    handed out again.
+
+Both are at-least-once: a consumer that dies before acking has its
+messages redelivered, so writes downstream must be idempotent.
+
+GET /v1/metrics/queue reads the backlog through `get_lag_reader()`, one
+shared backend per process that never creates the Redis stream or group,
+and merges it with the per-consumer stats that workers write to
+WORKER_STATS_DIR (`load_consumer_stats()`).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+
+def _import_redis():
+    try:
+        import redis
+    except ImportError:
+        raise ValueError("Redis queues require the redis package (pip install redis)") from None
+    return redis
+
+
+class QueueBackend(ABC):
+    """Interface shared by the queue backends."""
+
+    name = "queue"
+
+    @abstractmethod
+    def publish(self, jobs: list[dict]) -> list[str]:
+        """Appends jobs to the queue; returns their message ids."""
+
+    @abstractmethod
+    def fetch(self, count: int, block_ms: int = 1000) -> list[tuple[str, dict]]:
+        """Up to `count` (message_id, job) pairs, waiting up to `block_ms` for the first."""
+
+    @abstractmethod
+    def ack(self, message_ids: list[str]) -> None:
+        """Acknowledges processed messages so they are never redelivered."""
+
+    @abstractmethod
+    def lag(self) -> dict:
+        """{"backlog": unacknowledged messages, "oldest_age_s": age of the oldest}."""
+
+    def close(self) -> None:
+        pass
+
+
+# ── SQLite (local) ────────────────────────────────────────────
+
+class SQLiteQueue(QueueBackend):
+    """File-backed queue table; safe across threads and processes."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, consumer: str = "local", visibility_timeout_s: float = 60.0):
+        self.path = path
+        self.consumer = consumer
+        self.visibility_timeout_s = visibility_timeout_s
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue_messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " body TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " claimed_by TEXT,"
+            " deliveries INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def publish(self, jobs: list[dict]) -> list[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            ids = [str(self._conn.execute(
+                "INSERT INTO queue_messages (body, enqueued_at) VALUES (?, ?)",
+                (json.dumps(job), now)).lastrowid) for job in jobs]
+            self._conn.execute("COMMIT")
+        return ids
+
+    def fetch(self, count: int, block_ms: int = 1000) -> list[tuple[str, dict]]:
+        deadline = time.monotonic() + block_ms / 1000
+        while True:
+            messages = self._claim(count)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(min(0.05, max(deadline - time.monotonic(), 0)))
+
+    def _claim(self, count: int) -> list[tuple[str, dict]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")     # one claimer at a time across processes
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body FROM queue_messages"
+                    " WHERE claimed_at IS NULL OR claimed_at < ? ORDER BY id LIMIT ?",
+                    (now - self.visibility_timeout_s, count)).fetchall()
+                self._conn.executemany(
+                    "UPDATE queue_messages SET claimed_at = ?, claimed_by = ?,"
+                    " deliveries = deliveries + 1 WHERE id = ?",
+                    [(now, self.consumer, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(str(i), json.loads(body)) for i, body in rows]
+
+    def ack(self, message_ids: list[str]) -> None:
+        if not message_ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM queue_messages WHERE id = ?",
+                                   [(int(i),) for i in message_ids])
+
+    def lag(self) -> dict:
+        with self._lock:
+            backlog, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM queue_messages").fetchone()
+        return {"backlog": backlog,
+                "oldest_age_s": round(time.time() - oldest, 3) if oldest is not None else None}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ── Redis Streams ─────────────────────────────────────────────
+
+class RedisStreamQueue(QueueBackend):
+    """Redis Stream + consumer group; pending entries are reclaimed after a timeout."""
+
+    name = "redis"
+
+    def __init__(self, url: str, stream: str, group: str, consumer: str,
+                 visibility_timeout_s: float = 60.0, create_group: bool = True):
+        redis = _import_redis()
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self._idle_ms = int(visibility_timeout_s * 1000)
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        if not create_group:            # lag readers must not create the stream
+            return
+        try:
+            self._client.xgroup_create(stream, group, id="0", mkstream=True)
+        except redis.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def publish(self, jobs: list[dict]) -> list[str]:
+        pipe = self._client.pipeline(transaction=False)
+        for job in jobs:
+            pipe.xadd(self.stream, {"job": json.dumps(job)})
+        return pipe.execute()
+
+    def fetch(self, count: int, block_ms: int = 1000) -> list[tuple[str, dict]]:
+        # Messages a dead consumer left pending come back first
+        _, entries, *_ = self._client.xautoclaim(self.stream, self.group, self.consumer,
+                                                 min_idle_time=self._idle_ms, count=count)
+        if not entries:
+            reply = self._client.xreadgroup(self.group, self.consumer, {self.stream: ">"},
+                                            count=count, block=block_ms)
+            entries = reply[0][1] if reply else []
+        return [(msg_id, json.loads(fields["job"])) for msg_id, fields in entries if fields]
+
+    def ack(self, message_ids: list[str]) -> None:
+        if message_ids:
+            self._client.xack(self.stream, self.group, *message_ids)
+
+    def lag(self) -> dict:
+        if not self._client.exists(self.stream):
+            return {"backlog": 0, "oldest_age_s": None}
+        info = next((g for g in self._client.xinfo_groups(self.stream)
+                     if g["name"] == self.group), None)
+        if info is None:
+            return {"backlog": 0, "oldest_age_s": None}
+        pending = int(info.get("pending") or 0)
+        undelivered = int(info.get("lag") or 0)
+        oldest_id = None
+        if pending:
+            oldest_id = self._client.xpending(self.stream, self.group)["min"]
+        elif undelivered:
+            after = self._client.xrange(self.stream, min=f"({info['last-delivered-id']}",
+                                        count=1)
+            oldest_id = after[0][0] if after else None
+        oldest_age_s = None
+        if oldest_id is not None:       # stream ids start with the enqueue time in ms
+            oldest_age_s = round(time.time() - int(oldest_id.split("-")[0]) / 1000, 3)
+        return {"backlog": pending + undelivered, "oldest_age_s": oldest_age_s}
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def open_queue(url: str, consumer: str = "local", create_group: bool = True) -> QueueBackend:
+    """
+    Backend for a redis:// or sqlite:/// queue URL. `create_group=False`
+    opens Redis without creating the stream / consumer group.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStreamQueue(url, settings.QUEUE_STREAM, settings.QUEUE_GROUP, consumer,
+                                settings.QUEUE_VISIBILITY_TIMEOUT_S, create_group)
+    if url.startswith("sqlite"):
+        path = make_url(url).database
+        if not path:
+            raise ValueError("A sqlite queue needs a file path, e.g. sqlite:///app/db/queue.db")
+        return SQLiteQueue(path, consumer, settings.QUEUE_VISIBILITY_TIMEOUT_S)
+    raise ValueError(f"Unsupported queue URL {url!r}; expected redis:// or sqlite:///")
+
+
+# ── Lag reader for GET /v1/metrics/queue ──────────────────────
+_lag_reader: tuple[str, QueueBackend] | None = None
+_lag_reader_lock = threading.Lock()
+
+
+def get_lag_reader() -> QueueBackend | None:
+    """
+    The process-wide backend used to read QUEUE_URL's lag, opened on first
+    use (and reopened if QUEUE_URL changes); None when no queue is set.
+    """
+    global _lag_reader
+    url = settings.QUEUE_URL
+    if not url:
+        return None
+    with _lag_reader_lock:
+        if _lag_reader is None or _lag_reader[0] != url:
+            if _lag_reader is not None:
+                _lag_reader[1].close()
+                _lag_reader = None
+            _lag_reader = (url, open_queue(url, "metrics", create_group=False))
+        return _lag_reader[1]
+
+
+def close_lag_reader() -> None:
+    global _lag_reader
+    with _lag_reader_lock:
+        if _lag_reader is not None:
+            _lag_reader[1].close()
+            _lag_reader = None
+
+
+# ── Consumer stats ────────────────────────────────────────────
+STATS_PREFIX = "worker-"
+
+
+def write_consumer_stats(directory: str, consumer: str, stats: dict) -> None:
+    """Persists one consumer's stats for GET /v1/metrics/queue (atomic replace)."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{STATS_PREFIX}{consumer}.json")
+    with open(f"{path}.tmp", "w") as fh:
+        json.dump(stats, fh)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_consumer_stats() -> list[dict]:
+    """Every consumer's persisted stats, ignoring files older than WORKER_STATS_MAX_AGE_S."""
+    directory = settings.WORKER_STATS_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    horizon = time.time() - settings.WORKER_STATS_MAX_AGE_S
+    out = []
+    for fname in sorted(os.listdir(directory)):
+        if not fname.startswith(STATS_PREFIX) or not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, fname)) as fh:
+                stats = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if stats.get("updated_at", 0) >= horizon:
+            out.append(stats)
+    return out
@@ -0,0 +1,239 @@
+"""
+app/replay.py
+──────────────
+Replays captured production traffic (app/capture.py) against the app and
+reports latency percentiles and error rates.
+
+    python -m app.replay app/db/capture                          # in-process, 1× speed
+    python -m app.replay app/db/capture --speed 10               # 10× faster
+    python -m app.replay app/db/capture --speed max --concurrency 32
+    python -m app.replay app/db/capture --target http://localhost:8000
+
+  - Requests are sent open-loop on the captured schedule: request i goes
+    out (ts_i − ts_0) / speed seconds after the start, whether or not
+    earlier requests have returned, so the captured route mix, payloads,
+    bursts and gaps are reproduced. At most `--concurrency` requests are
+    in flight; a request that has to wait for a slot is sent late and the
+    lateness is reported as `send_lag_ms` (a large lag means the client,
+    not the app, was the bottleneck).
+  - `--speed max` ignores timing: `--concurrency` workers send the
+    requests back to back in captured order, which measures the peak
+    throughput of the captured mix.
+  - Without `--target` the app is driven in-process through httpx's ASGI
+    transport inside its lifespan (models loaded, background workers
+    running), so the numbers cover everything but the network and the
+    server loop. Predictions are written to DATABASE_URL, so point it at
+    a scratch database. Capture is switched off for the replay.
+  - With `--target` the requests go over HTTP to a running server.
+
+The JSON report has, overall and per route (method + path): requests,
+achieved req/s, p50 / p95 / p99 / max latency and error rate (non-2xx
+responses and transport errors), next to the latency and error rate
+recorded when the traffic was captured.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import numpy as np
+
+from app.capture import read_capture, request_body
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 64
+REQUEST_TIMEOUT_S = 30.0
+
+
+def route_key(record: dict) -> str:
+    return f"{record['method']} {record['path'].split('?', 1)[0]}"
+
+
+def _percentiles(values: np.ndarray, prefix: str = "") -> dict:
+    if not len(values):
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {f"{prefix}p50_ms": round(float(p50), 3), f"{prefix}p95_ms": round(float(p95), 3),
+            f"{prefix}p99_ms": round(float(p99), 3)}
+
+
+def _summary(records: list[dict], idx: np.ndarray, latencies: np.ndarray, ok: np.ndarray,
+             wall_s: float) -> dict:
+    captured_ms = np.array([records[i].get("latency_ms", np.nan) for i in idx], dtype=float)
+    captured_ok = np.array([200 <= records[i].get("status", 200) < 300 for i in idx])
+    return {
+        "requests": len(idx),
+        "req_per_s": round(len(idx) / wall_s, 1) if wall_s > 0 else None,
+        **_percentiles(latencies[idx]),
+        "max_ms": round(float(latencies[idx].max()), 3),
+        "error_rate": round(1 - float(ok[idx].mean()), 4),
+        **_percentiles(captured_ms[~np.isnan(captured_ms)], "captured_"),
+        "captured_error_rate": round(1 - float(captured_ok.mean()), 4),
+    }
+
+
+async def replay(records: list[dict], client: httpx.AsyncClient, speed: float | None = 1.0,
+                 concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """
+    Sends `records` (in `ts` order) through `client`: on the captured
+    schedule scaled by `speed`, or back to back when `speed` is None.
+    """
+    n = len(records)
+    latencies = np.zeros(n)
+    ok = np.zeros(n, dtype=bool)
+    send_lag_ms = np.zeros(n)
+    transport_errors = 0
+
+    async def send(i: int) -> None:
+        nonlocal transport_errors
+        record = records[i]
+        t0 = time.perf_counter()
+        try:
+            response = await client.request(record["method"], record["path"],
+                                            content=request_body(record),
+                                            headers=record.get("headers") or {})
+            ok[i] = 200 <= response.status_code < 300
+        except httpx.HTTPError as exc:
+            transport_errors += 1
+            logger.debug(f"[replay] {route_key(record)} failed: {exc}")
+        latencies[i] = (time.perf_counter() - t0) * 1000
+
+    start = time.perf_counter()
+    if speed is None:
+        slots = iter(range(n))
+
+        async def worker():
+            for i in slots:
+                await send(i)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def scheduled(i: int) -> None:
+            try:
+                await send(i)
+            finally:
+                in_flight.release()
+
+        ts0 = records[0]["ts"]
+        tasks = []
+        for i, record in enumerate(records):
+            due = start + (record["ts"] - ts0) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            send_lag_ms[i] = max(0.0, time.perf_counter() - due) * 1000
+            tasks.append(asyncio.create_task(scheduled(i)))
+        await asyncio.gather(*tasks)
+    wall_s = time.perf_counter() - start
+
+    keys = np.array([route_key(r) for r in records])
+    report = {
+        "speed": "max" if speed is None else speed,
+        "concurrency": concurrency,
+        "captured_s": round(records[-1]["ts"] - records[0]["ts"], 3),
+        "wall_s": round(wall_s, 3),
+        "transport_errors": transport_errors,
+        "overall": _summary(records, np.arange(n), latencies, ok, wall_s),
+        "routes": {key: _summary(records, np.flatnonzero(keys == key), latencies, ok, wall_s)
+                   for key in sorted(set(keys))},
+    }
+    if speed is not None:
+        report["send_lag_ms"] = {**_percentiles(send_lag_ms),
+                                 "max_ms": round(float(send_lag_ms.max()), 3)}
+    return report
+
+
+async def _replay_in_process(records: list[dict], speed: float | None,
+                             concurrency: int) -> dict:
+    from app.main import app
+
+    sample_rate = settings.CAPTURE_SAMPLE_RATE
+    settings.CAPTURE_SAMPLE_RATE = 0.0          # do not capture the replay itself
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay",
+                                         timeout=REQUEST_TIMEOUT_S) as client:
+                return await replay(records, client, speed, concurrency)
+    finally:
+        settings.CAPTURE_SAMPLE_RATE = sample_rate
+
+
+async def _replay_remote(records: list[dict], target: str, speed: float | None,
+                         concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits,
+                                 timeout=REQUEST_TIMEOUT_S) as client:
+        return await replay(records, client, speed, concurrency)
+
+
+def run(paths: list[str], target: str | None = None, speed: float | None = 1.0,
+        concurrency: int = DEFAULT_CONCURRENCY, limit: int | None = None) -> dict:
+    """Replays the capture files in `paths` in-process, or against `target` if given."""
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be > 0 (or None for max)")
+    records = read_capture(paths, limit)
+    if not records:
+        raise ValueError(f"No captured requests in {', '.join(paths)}")
+    logger.info(f"[replay] {len(records)} requests over "
+                f"{records[-1]['ts'] - records[0]['ts']:.1f}s → {target or 'in-process'} "
+                f"at {'max' if speed is None else f'{speed:g}×'} speed")
+    if target:
+        report = asyncio.run(_replay_remote(records, target, speed, concurrency))
+    else:
+        report = asyncio.run(_replay_in_process(records, speed, concurrency))
+    return {"target": target or "in-process", **report}
+
+
+def parse_speed(value: str) -> float | None:
+    """'max' → None; '1', '2.5', '10x' → float."""
+    if value.lower() == "max":
+        return None
+    speed = float(value.lower().rstrip("x×"))
+    if speed <= 0:
+        raise ValueError("speed must be > 0")
+    return speed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.replay",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", default=[settings.CAPTURE_DIR],
+                        help="Capture files or directories (default: CAPTURE_DIR)")
+    parser.add_argument("--target", default=None,
+                        help="Base URL of a running server (default: replay in-process)")
+    parser.add_argument("--speed", default="1",
+                        help="Time scale: 1 = as captured, 10 = 10× faster, max = no waiting")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Replay only the first N captured requests")
+    args = parser.parse_args(argv)
+    try:
+        speed = parse_speed(args.speed)
+    except ValueError:
+        parser.error(f"--speed must be a positive number or 'max', not {args.speed!r}")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    try:
+        report = run(args.paths, target=args.target, speed=speed,
+                     concurrency=args.concurrency, limit=args.limit)
+    except (ValueError, OSError) as exc:
+        parser.error(str(exc))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,85 @@
 """
 app/routers/anomaly.py
 ───────────────────────
-POST /v1/anomaly/predict — System anomaly detection endpoint.
+POST /v1/anomaly/predict       — System anomaly detection endpoint.
+POST /v1/anomaly/predict-batch — Vectorised scoring of up to 1000 metric samples.
+
+`?similar=k` returns the k nearest past high-score anomalies from the
+in-memory index (app/similarity.py); high-score predictions are added to
+that index once they have a database id — right away with the SQL sink,
+when their segment is loaded with the segment-log sink (app/sinks.py).
+
+`?explain=true` adds per-feature path-split attributions, collected in the
+same forest traversal that produces the score.
+
+A loaded canary model serves ANOMALY_CANARY_PERCENT of requests (batches
+are routed as a unit), and every served request is queued for the shadow
+model if one is loaded (app/shadow.py).
+
+An X-Tenant-ID header with a model in the tenant registry
+(app/models/registry.py) is served by that tenant's model instead; tenant
+requests bypass canary routing, shadow scoring and the shared
+similar-anomaly index.
+
+Every scored sample is fed to the alert rules (app/alerts.py), grouped by
+the optional `host` field.
 """
 import time
 import logging
-from fastapi import APIRouter, Depends
+import numpy as np
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 
-from app.schemas.anomaly import AnomalyRequest, AnomalyResponse
+from app.schemas.anomaly import (
+    AnomalyRequest, AnomalyResponse, AnomalyBatchRequest, AnomalyBatchResponse, SimilarAnomaly,
+)
+from app.schemas.explanation import Explanation
+from app.config import settings
 from app.db.session import get_db
-from app.db.models import AnomalyPrediction
+from app.alerts import observe_alerts
 from app.models.loader import get_model_loader
+from app.models.registry import TENANT_HEADER, get_tenant_model, record_tenant_latency
+from app.shadow import submit_shadow
+from app.similarity import get_anomaly_index
+from app.sinks import write_predictions
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1/anomaly", tags=["Anomaly Detection"])
 
 
+def _features(payload: AnomalyRequest) -> list[float]:
+    return [payload.response_time, payload.error_rate, payload.cpu_usage, payload.memory_usage]
+
+
+def _explanation(features: list[str], shares) -> Explanation:
+    return Explanation(
+        method="path_split",
+        contributions={name: round(float(s), 6) for name, s in zip(features, shares)},
+    )
+
+
+def _observe_alerts(items: list[AnomalyRequest], X: np.ndarray, scores) -> None:
+    observe_alerts(
+        "anomaly",
+        {"anomaly_score": scores, "response_time": X[:, 0], "error_rate": X[:, 1],
+         "cpu_usage": X[:, 2], "memory_usage": X[:, 3]},
+        {"host": [item.host for item in items]},
+    )
+
+
+def _record(payload: AnomalyRequest, anomaly_score: float, model_version: str,
+            latency_ms: float) -> dict:
+    return {
+        "response_time": payload.response_time,
+        "error_rate": payload.error_rate,
+        "cpu_usage": payload.cpu_usage,
+        "memory_usage": payload.memory_usage,
+        "anomaly_score": anomaly_score,
+        "model_version": model_version,
+        "latency_ms": latency_ms,
+    }
+
+
 @router.post(
     "/predict",
     response_model=AnomalyResponse,
@@ -29,31 +92,57 @@ router = APIRouter(prefix="/v1/anomaly", tags=["Anomaly Detection"])
 )
 def predict_anomaly(
     payload: AnomalyRequest,
+    similar: int = Query(0, ge=0, le=settings.SIMILARITY_MAX_K,
+                         description="Return the k most similar past anomalies"),
+    explain: bool = Query(False, description="Include per-feature attributions"),
+    tenant_id: str | None = Header(None, alias=TENANT_HEADER),
     db: Session = Depends(get_db),
 ) -> AnomalyResponse:
     loader = get_model_loader()
 
     t0 = time.perf_counter()
-    anomaly_score, model_version = loader.predict_anomaly(
-        response_time=payload.response_time,
-        error_rate=payload.error_rate,
-        cpu_usage=payload.cpu_usage,
-        memory_usage=payload.memory_usage,
-    )
+    tenant_model = get_tenant_model("anomaly", tenant_id)
+    variant = tenant_model if tenant_model is not None else loader.route("anomaly")
+    explanation = None
+    if explain:
+        scores, shares = loader.explain_anomaly(np.array([_features(payload)], dtype=float),
+                                                variant=variant)
+        anomaly_score = float(scores[0])
+        model_version = loader.model_version("anomaly", variant)
+        explanation = _explanation(loader.features("anomaly", variant), shares[0])
+    else:
+        anomaly_score, model_version = loader.predict_anomaly(
+            response_time=payload.response_time,
+            error_rate=payload.error_rate,
+            cpu_usage=payload.cpu_usage,
+            memory_usage=payload.memory_usage,
+            variant=variant,
+        )
     latency_ms = (time.perf_counter() - t0) * 1000
 
-    # ── Persist to DB ─────────────────────────────────────────
-    record = AnomalyPrediction(
-        response_time=payload.response_time,
-        error_rate=payload.error_rate,
-        cpu_usage=payload.cpu_usage,
-        memory_usage=payload.memory_usage,
-        anomaly_score=anomaly_score,
-        model_version=model_version,
-        latency_ms=latency_ms,
+    # ── Persist (app/sinks.py) ────────────────────────────────
+    indexed = tenant_model is None and anomaly_score >= settings.SIMILARITY_MIN_SCORE
+    record_ids = write_predictions(
+        db, "anomaly", [_record(payload, anomaly_score, model_version, latency_ms)],
+        similar=[indexed],
     )
-    db.add(record)
-    db.commit()
+    if tenant_model is not None:
+        record_tenant_latency("anomaly", tenant_id, latency_ms)
+    else:
+        submit_shadow("anomaly", tuple(_features(payload)), anomaly_score, model_version,
+                      latency_ms)
+    _observe_alerts([payload], np.array([_features(payload)], dtype=float), [anomaly_score])
+
+    # ── Similar past anomalies (shared index: not for tenant models) ──
+    neighbours = None
+    if tenant_model is None and (similar or indexed):
+        index = get_anomaly_index()
+        point = loader.scale_anomaly([_features(payload)])[0]
+        if similar:
+            neighbours = [SimilarAnomaly(id=i, distance=round(d, 4))
+                          for i, d in index.query(point, similar)]
+        if indexed and record_ids is not None:      # else indexed when its segment is loaded
+            index.add(record_ids[0], point)
 
     logger.info(
         f"[anomaly] score={anomaly_score:.4f} version={model_version} "
@@ -63,4 +152,75 @@ def predict_anomaly(
         anomaly_score=round(anomaly_score, 4),
         model_version=model_version,
         latency_ms=round(latency_ms, 3),
+        similar=neighbours,
+        explanation=explanation,
     )
+
+
+@router.post(
+    "/predict-batch",
+    response_model=AnomalyBatchResponse,
+    summary="Predict anomaly scores for a batch of metric samples",
+    description=(
+        "Scores up to 1000 metric samples in one vectorised model call. "
+        "Each row is persisted with its share of the batch latency."
+    ),
+)
+def predict_anomaly_batch(
+    payload: AnomalyBatchRequest,
+    explain: bool = Query(False, description="Include per-feature attributions"),
+    tenant_id: str | None = Header(None, alias=TENANT_HEADER),
+    db: Session = Depends(get_db),
+) -> AnomalyBatchResponse:
+    loader = get_model_loader()
+    items = payload.items
+
+    t0 = time.perf_counter()
+    tenant_model = get_tenant_model("anomaly", tenant_id)
+    variant = tenant_model if tenant_model is not None else loader.route("anomaly")
+    X = np.array([_features(item) for item in items], dtype=float)
+    shares = None
+    if explain:
+        scores, shares = loader.explain_anomaly(X, variant=variant)
+    else:
+        scores = loader.score_anomaly(X, variant=variant)
+    latency_ms = (time.perf_counter() - t0) * 1000
+    model_version = loader.model_version("anomaly", variant)
+
+    # ── Persist (app/sinks.py) ────────────────────────────────
+    row_latency_ms = latency_ms / len(items)
+    indexed = (scores >= settings.SIMILARITY_MIN_SCORE) & (tenant_model is None)
+    record_ids = write_predictions(
+        db, "anomaly",
+        [_record(item, float(s), model_version, row_latency_ms) for item, s in zip(items, scores)],
+        similar=indexed.tolist(),
+    )
+    if tenant_model is not None:
+        record_tenant_latency("anomaly", tenant_id, latency_ms)
+    else:
+        for x, s in zip(X, scores):
+            submit_shadow("anomaly", tuple(x), float(s), model_version, row_latency_ms)
+    _observe_alerts(items, X, scores)
+
+    # ── Index high-score rows for similarity search ───────────
+    high = np.flatnonzero(indexed)
+    if len(high) and record_ids is not None:
+        index = get_anomaly_index()
+        points = loader.scale_anomaly(X[high])
+        for i, point in zip(high, points):
+            index.add(record_ids[i], point)
+
+    logger.info(f"[anomaly] batch n={len(items)} version={model_version} "
+                f"latency={latency_ms:.2f}ms")
+    predictions = [
+        AnomalyResponse(
+            anomaly_score=round(float(s), 4),
+            model_version=model_version,
+            latency_ms=round(row_latency_ms, 3),
+            explanation=(_explanation(loader.features("anomaly", variant), shares[i])
+                         if shares is not None else None),
+        )
+        for i, s in enumerate(scores)
+    ]
+    return AnomalyBatchResponse(predictions=predictions, model_version=model_version,
+                                latency_ms=round(latency_ms, 3))
@@ -0,0 +1,56 @@
+"""
+app/routers/drift.py
+─────────────────────
+GET /v1/drift — Input / score drift statistics against training reference.
+Computed on demand from constant-memory histograms (see app/drift.py),
+merged across every worker that persisted its state to DRIFT_STATE_DIR.
+"""
+import logging
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+from app.drift import load_peer_states
+from app.models.loader import get_model_loader
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/v1", tags=["Drift"])
+
+
+class DriftStat(BaseModel):
+    name: str
+    samples: int
+    psi: float
+    ks: float
+    drifted: bool
+
+
+class ModelDrift(BaseModel):
+    model_version: str
+    reference_available: bool
+    samples: int
+    features: list[DriftStat]
+    score: DriftStat | None
+
+
+class DriftResponse(BaseModel):
+    fraud: ModelDrift
+    anomaly: ModelDrift
+
+
+@router.get(
+    "/drift",
+    response_model=DriftResponse,
+    summary="Production input / score drift",
+    description=(
+        "Returns Population Stability Index (PSI) and a binned KS statistic for "
+        "every model input feature and the output score, comparing live traffic "
+        "with the training-time reference distribution stored in the artifact."
+    ),
+)
+def get_drift() -> DriftResponse:
+    monitors = get_model_loader().drift_monitors
+    peers = load_peer_states()
+    return DriftResponse(**{
+        kind: ModelDrift(**monitor.report(peers.get(kind, [])))
+        for kind, monitor in monitors.items()
+    })
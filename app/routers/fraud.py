@@ -1,22 +1,105 @@
 """
 app/routers/fraud.py
 ─────────────────────
-POST /v1/fraud/predict — Fraud detection endpoint.
+POST /v1/fraud/predict       — Fraud detection endpoint.
+POST /v1/fraud/predict-batch — Vectorised scoring of up to 1000 transactions.
+
+Requests carrying `entity_id` update the in-process velocity feature store
+(app/feature_store.py); the derived features are used for scoring and
+returned in the response, and `time_delta` is derived when omitted.
+
+`?explain=true` adds closed-form per-feature logit contributions.
+
+A loaded canary model serves FRAUD_CANARY_PERCENT of requests (sticky per
+entity_id; batches are routed as a unit), and every served request is
+queued for the shadow model if one is loaded (app/shadow.py).
+
+An X-Tenant-ID header with a model in the tenant registry
+(app/models/registry.py) is served by that tenant's model instead; tenant
+requests bypass canary routing and shadow scoring.
+
+Every scored transaction is fed to the alert rules (app/alerts.py).
+Predictions are persisted through the configured sink (app/sinks.py).
 """
 import time
 import logging
-from fastapi import APIRouter, Depends
+import numpy as np
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.orm import Session
 
-from app.schemas.fraud import FraudRequest, FraudResponse
+from app.schemas.explanation import Explanation
+from app.schemas.fraud import (
+    FraudRequest, FraudResponse, FraudBatchRequest, FraudBatchResponse, VelocityFeatures,
+)
+from app.config import settings
 from app.db.session import get_db
-from app.db.models import FraudPrediction
+from app.alerts import observe_alerts
+from app.feature_store import get_feature_store
 from app.models.loader import get_model_loader
+from app.models.registry import TENANT_HEADER, get_tenant_model, record_tenant_latency
+from app.shadow import submit_shadow
+from app.sinks import write_predictions
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1/fraud", tags=["Fraud Detection"])
 
 
+def _resolve_velocity(payload: FraudRequest) -> tuple[float, dict | None]:
+    """Updates the feature store for `entity_id` and resolves time_delta."""
+    velocity = None
+    if payload.entity_id is not None and settings.FEATURE_STORE_ENABLED:
+        velocity = get_feature_store().observe(
+            payload.entity_id, payload.transaction_amount, payload.country,
+        )
+
+    time_delta = payload.time_delta
+    if time_delta is None:
+        time_delta = (velocity or {}).get("time_delta")
+        if time_delta is None:
+            time_delta = settings.FEATURE_STORE_DEFAULT_TIME_DELTA_H
+    return time_delta, velocity
+
+
+def _shadow_inputs(payload: FraudRequest, time_delta: float, velocity: dict | None) -> tuple:
+    return (payload.transaction_amount, payload.merchant_type, payload.country,
+            time_delta, payload.device_type, velocity)
+
+
+def _observe_alerts(items: list[FraudRequest], time_deltas: list[float], probs) -> None:
+    observe_alerts(
+        "fraud",
+        {"fraud_probability": probs,
+         "transaction_amount": [item.transaction_amount for item in items],
+         "time_delta": time_deltas},
+        {"merchant_type": [item.merchant_type for item in items],
+         "country": [item.country for item in items],
+         "device_type": [item.device_type for item in items],
+         "entity_id": [item.entity_id for item in items]},
+    )
+
+
+def _explanation(features: list[str], base_value: float, contributions) -> Explanation:
+    return Explanation(
+        method="linear_logit",
+        base_value=round(base_value, 6),
+        contributions={name: round(float(c), 6) for name, c in zip(features, contributions)},
+    )
+
+
+def _record(payload: FraudRequest, time_delta: float, fraud_probability: float,
+            model_version: str, latency_ms: float) -> dict:
+    return {
+        "transaction_amount": payload.transaction_amount,
+        "merchant_type": payload.merchant_type,
+        "country": payload.country,
+        "time_delta": time_delta,
+        "device_type": payload.device_type,
+        "fraud_probability": fraud_probability,
+        "model_version": model_version,
+        "latency_ms": latency_ms,
+    }
+
+
 @router.post(
     "/predict",
     response_model=FraudResponse,
@@ -28,33 +111,47 @@ router = APIRouter(prefix="/v1/fraud", tags=["Fraud Detection"])
 )
 def predict_fraud(
     payload: FraudRequest,
+    explain: bool = Query(False, description="Include per-feature contributions"),
+    tenant_id: str | None = Header(None, alias=TENANT_HEADER),
     db: Session = Depends(get_db),
 ) -> FraudResponse:
     loader = get_model_loader()
 
     t0 = time.perf_counter()
+    time_delta, velocity = _resolve_velocity(payload)
+    tenant_model = get_tenant_model("fraud", tenant_id)
+    variant = (tenant_model if tenant_model is not None
+               else loader.route("fraud", payload.entity_id))
+
     fraud_probability, model_version = loader.predict_fraud(
         transaction_amount=payload.transaction_amount,
         merchant_type=payload.merchant_type,
         country=payload.country,
-        time_delta=payload.time_delta,
+        time_delta=time_delta,
         device_type=payload.device_type,
+        velocity=velocity,
+        variant=variant,
     )
+    explanation = None
+    if explain:
+        row = loader.encode_fraud(payload.transaction_amount, payload.merchant_type,
+                                  payload.country, time_delta, payload.device_type, velocity,
+                                  variant=variant)
+        base_value, contributions = loader.explain_fraud(np.array([row], dtype=float),
+                                                         variant=variant)
+        explanation = _explanation(loader.features("fraud", variant), base_value,
+                                   contributions[0])
     latency_ms = (time.perf_counter() - t0) * 1000
 
-    # ── Persist to DB ─────────────────────────────────────────
-    record = FraudPrediction(
-        transaction_amount=payload.transaction_amount,
-        merchant_type=payload.merchant_type,
-        country=payload.country,
-        time_delta=payload.time_delta,
-        device_type=payload.device_type,
-        fraud_probability=fraud_probability,
-        model_version=model_version,
-        latency_ms=latency_ms,
-    )
-    db.add(record)
-    db.commit()
+    # ── Persist (app/sinks.py) ────────────────────────────────
+    write_predictions(db, "fraud",
+                      [_record(payload, time_delta, fraud_probability, model_version, latency_ms)])
+    if tenant_model is not None:
+        record_tenant_latency("fraud", tenant_id, latency_ms)
+    else:
+        submit_shadow("fraud", _shadow_inputs(payload, time_delta, velocity),
+                      fraud_probability, model_version, latency_ms)
+    _observe_alerts([payload], [time_delta], [fraud_probability])
 
     logger.info(
         f"[fraud] prob={fraud_probability:.4f} version={model_version} "
@@ -64,4 +161,73 @@ def predict_fraud(
         fraud_probability=round(fraud_probability, 4),
         model_version=model_version,
         latency_ms=round(latency_ms, 3),
+        velocity=VelocityFeatures(**{**velocity, "time_delta": time_delta}) if velocity else None,
+        explanation=explanation,
     )
+
+
+@router.post(
+    "/predict-batch",
+    response_model=FraudBatchResponse,
+    summary="Predict fraud probability for a batch of transactions",
+    description=(
+        "Scores up to 1000 transactions in one vectorised model call. "
+        "Each row is persisted with its share of the batch latency."
+    ),
+)
+def predict_fraud_batch(
+    payload: FraudBatchRequest,
+    explain: bool = Query(False, description="Include per-feature contributions"),
+    tenant_id: str | None = Header(None, alias=TENANT_HEADER),
+    db: Session = Depends(get_db),
+) -> FraudBatchResponse:
+    loader = get_model_loader()
+    items = payload.items
+
+    t0 = time.perf_counter()
+    resolved = [_resolve_velocity(item) for item in items]
+    tenant_model = get_tenant_model("fraud", tenant_id)
+    variant = tenant_model if tenant_model is not None else loader.route("fraud")
+    X = np.array([
+        loader.encode_fraud(item.transaction_amount, item.merchant_type, item.country,
+                            time_delta, item.device_type, velocity, variant=variant)
+        for item, (time_delta, velocity) in zip(items, resolved)
+    ], dtype=float)
+    probs = loader.score_fraud(X, variant=variant)
+    contributions = None
+    if explain:
+        base_value, contributions = loader.explain_fraud(X, variant=variant)
+    latency_ms = (time.perf_counter() - t0) * 1000
+    model_version = loader.model_version("fraud", variant)
+
+    # ── Persist (app/sinks.py) ────────────────────────────────
+    row_latency_ms = latency_ms / len(items)
+    write_predictions(db, "fraud", [
+        _record(item, time_delta, float(p), model_version, row_latency_ms)
+        for item, (time_delta, _), p in zip(items, resolved, probs)
+    ])
+    if tenant_model is not None:
+        record_tenant_latency("fraud", tenant_id, latency_ms)
+    else:
+        for item, (time_delta, velocity), p in zip(items, resolved, probs):
+            submit_shadow("fraud", _shadow_inputs(item, time_delta, velocity),
+                          float(p), model_version, row_latency_ms)
+    _observe_alerts(items, [time_delta for time_delta, _ in resolved], probs)
+
+    logger.info(f"[fraud] batch n={len(items)} version={model_version} "
+                f"latency={latency_ms:.2f}ms")
+    predictions = [
+        FraudResponse(
+            fraud_probability=round(float(p), 4),
+            model_version=model_version,
+            latency_ms=round(row_latency_ms, 3),
+            velocity=(VelocityFeatures(**{**velocity, "time_delta": time_delta})
+                      if velocity else None),
+            explanation=(_explanation(loader.features("fraud", variant), base_value,
+                                      contributions[i])
+                         if contributions is not None else None),
+        )
+        for i, (p, (time_delta, velocity)) in enumerate(zip(probs, resolved))
+    ]
+    return FraudBatchResponse(predictions=predictions, model_version=model_version,
+                              latency_ms=round(latency_ms, 3))
@@ -3,6 +3,19 @@ app/routers/metrics.py
 ───────────────────────
 GET /v1/metrics — Aggregated platform metrics endpoint.
 Returns total prediction counts, average latencies, and per-model call counts.
+
+GET /v1/metrics/admission — Live admission-control counters per route.
+GET /v1/metrics/shadow    — Shadow-vs-served score deltas and latency.
+GET /v1/metrics/registry  — Tenant model residency, cache hit rate, latency.
+GET /v1/metrics/alerts    — Alert rule state, delivery counters, recent alerts.
+GET /v1/metrics/db        — Pool usage / wait time per engine, replica lag and routing.
+GET /v1/metrics/queue     — Scoring-job backlog and per-consumer throughput.
+GET /v1/metrics/sink      — Prediction sink: segment backlog and compaction throughput.
+
+Routes that query the database read through `get_read_db`, i.e. from the
+read replica when one is configured and fresh enough. With the segment-log
+sink, GET /v1/metrics also counts predictions not yet loaded into the
+database (app/sinks.py).
 """
 import logging
 from fastapi import APIRouter, Depends
@@ -10,8 +23,15 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from app.db.session import get_db
-from app.db.models import FraudPrediction, AnomalyPrediction
+from app.admission import admission_stats
+from app.alerts import get_alert_engine
+from app.config import settings
+from app.db.session import engine_stats, get_read_db, get_read_router
+from app.db.models import FraudPrediction, AnomalyPrediction, ShadowPrediction
+from app.models.registry import get_model_registry
+from app.queues import get_lag_reader, load_consumer_stats
+from app.shadow import get_shadow_scorer
+from app.sinks import get_prediction_sink
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1", tags=["Metrics"])
@@ -25,6 +45,198 @@ class MetricsResponse(BaseModel):
     avg_anomaly_latency_ms: float
     avg_fraud_probability: float
     avg_anomaly_score: float
+    unflushed_predictions: int = 0       # included above; still in the sink's segment log
+
+
+class AdmissionRouteStats(BaseModel):
+    route: str
+    limit: int
+    in_flight: int
+    queue_depth: int
+    admitted: int
+    shed: int
+    shed_queue_full: int
+    shed_deadline: int
+    avg_queue_wait_ms: float
+    expected_queue_wait_ms: float
+    avg_latency_ms: float
+
+
+class ShadowModelStats(BaseModel):
+    kind: str
+    model_version: str
+    primary_model_version: str
+    samples: int
+    avg_score: float
+    avg_primary_score: float
+    mean_delta: float            # shadow - served
+    mean_abs_delta: float
+    max_abs_delta: float
+    avg_latency_ms: float
+    avg_primary_latency_ms: float
+
+
+class ShadowQueueStats(BaseModel):
+    queue_depth: int
+    queue_capacity: int
+    submitted: int
+    dropped: int
+    processed: int
+    failed: int
+
+
+class ShadowMetricsResponse(BaseModel):
+    queue: ShadowQueueStats | None      # None when no shadow model is loaded here
+    models: list[ShadowModelStats]
+
+
+class RegistryResident(BaseModel):
+    tenant: str
+    kind: str
+    model_version: str
+    bytes: int
+
+
+class RegistryTenantLatency(BaseModel):
+    tenant: str
+    kind: str
+    requests: int
+    avg_latency_ms: float
+    max_latency_ms: float
+
+
+class RegistryEvent(BaseModel):
+    ts: float
+    event: str                   # load | evict | swap | load_error
+    tenant: str
+    kind: str
+    model_version: str
+    detail: str
+
+
+class RegistryMetricsResponse(BaseModel):
+    enabled: bool
+    root: str | None = None
+    tenants: int = 0
+    available_models: int = 0
+    resident_models: int = 0
+    resident_bytes: int = 0
+    max_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+    loads: int = 0
+    load_errors: int = 0
+    avg_load_ms: float = 0.0
+    evictions: int = 0
+    swaps: int = 0
+    resident: list[RegistryResident] = []
+    latency: list[RegistryTenantLatency] = []
+    events: list[RegistryEvent] = []
+
+
+class AlertRuleStats(BaseModel):
+    name: str
+    kind: str
+    condition: str
+    group_by: str | None
+    keys: int                    # keys currently tracked (LRU-bounded)
+    fired: int
+    evicted_keys: int
+
+
+class Alert(BaseModel):
+    rule: str
+    kind: str
+    condition: str
+    group_by: str | None
+    key: str
+    value: float
+    count: int
+    fired_at: float
+
+
+class AlertMetricsResponse(BaseModel):
+    enabled: bool
+    queue_depth: int = 0
+    queue_capacity: int = 0
+    observed: int = 0
+    fired: int = 0
+    dropped: int = 0
+    delivered: int = 0
+    sink_errors: int = 0
+    rules: list[AlertRuleStats] = []
+    recent: list[Alert] = []
+
+
+class EnginePoolStats(BaseModel):
+    name: str                    # primary | replica
+    url: str
+    pool_class: str
+    pool_size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class ReplicaStats(BaseModel):
+    state: str                   # unknown | ok | stale | down
+    lag_s: float | None
+    max_lag_s: float
+    checked_at: float | None
+    last_error: str | None
+    replica_reads: int
+    primary_reads: int           # read sessions served by the primary instead
+    fallbacks: int               # replica connection failures at checkout
+
+
+class DbMetricsResponse(BaseModel):
+    engines: list[EnginePoolStats]
+    replica: ReplicaStats | None         # None when no replica is configured
+
+
+class QueueConsumerStats(BaseModel):
+    consumer: str
+    pid: int
+    messages: int
+    scored: int
+    invalid: int
+    duplicates: int              # redelivered / repeated job_ids skipped
+    batches: int
+    failed_batches: int
+    rows_per_s: float            # since the consumer started
+    recent_rows_per_s: float
+    started_at: float
+    updated_at: float
+
+
+class QueueMetricsResponse(BaseModel):
+    backend: str | None          # redis | sqlite; None when QUEUE_URL is unset
+    backlog: int | None          # messages not yet acknowledged
+    oldest_age_s: float | None
+    rows_per_s: float            # recent throughput summed over live consumers
+    consumers: list[QueueConsumerStats]
+
+
+class SinkMetricsResponse(BaseModel):
+    sink: str                    # sql | segment
+    directory: str | None = None
+    written_rows: int = 0
+    unflushed_rows: int = 0      # accepted, not yet in the database
+    open_segments: int = 0
+    sealed_segments_pending: int = 0
+    segment_bytes: int = 0
+    sealed_segments: int = 0
+    compacted_segments: int = 0
+    compacted_rows: int = 0
+    skipped_segments: int = 0    # already loaded (e.g. by another process)
+    compaction_failures: int = 0
+    compaction_rows_per_s: float = 0.0
+    sql_fallback_rows: int = 0   # strings too long for the fixed record
+    last_error: str | None = None
 
 
 @router.get(
@@ -36,7 +248,7 @@ class MetricsResponse(BaseModel):
         "total call counts, average latencies, and average output scores."
     ),
 )
-def get_metrics(db: Session = Depends(get_db)) -> MetricsResponse:
+def get_metrics(db: Session = Depends(get_read_db)) -> MetricsResponse:
     # ── Fraud aggregates ──────────────────────────────────────
     fraud_row = db.query(
         func.count(FraudPrediction.id).label("count"),
@@ -51,16 +263,188 @@ def get_metrics(db: Session = Depends(get_db)) -> MetricsResponse:
         func.avg(AnomalyPrediction.anomaly_score).label("avg_score"),
     ).one()
 
-    fraud_count = int(fraud_row.count or 0)
-    anomaly_count = int(anomaly_row.count or 0)
+    # ── Not yet flushed by the prediction sink ────────────────
+    unflushed = get_prediction_sink().unflushed()
+
+    def merged(kind: str, row) -> tuple[int, float, float]:
+        """(count, avg latency, avg score) over the table plus unflushed rows."""
+        n, latency_sum, score_sum = unflushed.get(kind, (0, 0.0, 0.0))
+        count = int(row.count or 0)
+        total = count + n
+        if not total:
+            return 0, 0.0, 0.0
+        return (total, (float(row.avg_latency or 0.0) * count + latency_sum) / total,
+                (float(row.avg_score or 0.0) * count + score_sum) / total)
+
+    fraud_count, fraud_latency, fraud_score = merged("fraud", fraud_row)
+    anomaly_count, anomaly_latency, anomaly_score = merged("anomaly", anomaly_row)
     total = fraud_count + anomaly_count
 
     return MetricsResponse(
         total_predictions=total,
         fraud_predictions=fraud_count,
         anomaly_predictions=anomaly_count,
-        avg_fraud_latency_ms=round(float(fraud_row.avg_latency or 0.0), 3),
-        avg_anomaly_latency_ms=round(float(anomaly_row.avg_latency or 0.0), 3),
-        avg_fraud_probability=round(float(fraud_row.avg_score or 0.0), 4),
-        avg_anomaly_score=round(float(anomaly_row.avg_score or 0.0), 4),
+        avg_fraud_latency_ms=round(fraud_latency, 3),
+        avg_anomaly_latency_ms=round(anomaly_latency, 3),
+        avg_fraud_probability=round(fraud_score, 4),
+        avg_anomaly_score=round(anomaly_score, 4),
+        unflushed_predictions=sum(n for n, _, _ in unflushed.values()),
+    )
+
+
+@router.get(
+    "/metrics/admission",
+    response_model=list[AdmissionRouteStats],
+    summary="Admission control and load-shedding counters",
+    description=(
+        "Returns, per admission-controlled route, the current adaptive concurrency "
+        "limit, in-flight and queued requests, admitted/shed counts and queue wait."
+    ),
+)
+def get_admission_metrics() -> list[AdmissionRouteStats]:
+    return [AdmissionRouteStats(**s) for s in admission_stats()]
+
+
+@router.get(
+    "/metrics/shadow",
+    response_model=ShadowMetricsResponse,
+    summary="Shadow model comparison",
+    description=(
+        "Summarises persisted shadow predictions per (kind, shadow version, served "
+        "version): score deltas against the served model and average latencies, "
+        "plus this worker's shadow queue counters."
+    ),
+)
+def get_shadow_metrics(db: Session = Depends(get_read_db)) -> ShadowMetricsResponse:
+    delta = ShadowPrediction.score - ShadowPrediction.primary_score
+    rows = db.query(
+        ShadowPrediction.kind,
+        ShadowPrediction.model_version,
+        ShadowPrediction.primary_model_version,
+        func.count(ShadowPrediction.id).label("samples"),
+        func.avg(ShadowPrediction.score).label("avg_score"),
+        func.avg(ShadowPrediction.primary_score).label("avg_primary_score"),
+        func.avg(delta).label("mean_delta"),
+        func.avg(func.abs(delta)).label("mean_abs_delta"),
+        func.max(func.abs(delta)).label("max_abs_delta"),
+        func.avg(ShadowPrediction.latency_ms).label("avg_latency"),
+        func.avg(ShadowPrediction.primary_latency_ms).label("avg_primary_latency"),
+    ).group_by(
+        ShadowPrediction.kind, ShadowPrediction.model_version,
+        ShadowPrediction.primary_model_version,
+    ).order_by(ShadowPrediction.kind, ShadowPrediction.model_version).all()
+
+    scorer = get_shadow_scorer()
+    return ShadowMetricsResponse(
+        queue=ShadowQueueStats(**scorer.stats()) if scorer is not None else None,
+        models=[
+            ShadowModelStats(
+                kind=r.kind,
+                model_version=r.model_version,
+                primary_model_version=r.primary_model_version,
+                samples=int(r.samples),
+                avg_score=round(float(r.avg_score), 4),
+                avg_primary_score=round(float(r.avg_primary_score), 4),
+                mean_delta=round(float(r.mean_delta), 4),
+                mean_abs_delta=round(float(r.mean_abs_delta), 4),
+                max_abs_delta=round(float(r.max_abs_delta), 4),
+                avg_latency_ms=round(float(r.avg_latency), 3),
+                avg_primary_latency_ms=round(float(r.avg_primary_latency), 3),
+            )
+            for r in rows
+        ],
+    )
+
+
+@router.get(
+    "/metrics/registry",
+    response_model=RegistryMetricsResponse,
+    summary="Tenant model registry residency and latency",
+    description=(
+        "Returns the tenant model registry's resident models and byte budget, "
+        "cache hits / misses, loads, evictions and version swaps, recent events, "
+        "and per-tenant inference latency."
+    ),
+)
+def get_registry_metrics() -> RegistryMetricsResponse:
+    registry = get_model_registry()
+    if registry is None:
+        return RegistryMetricsResponse(enabled=False)
+    return RegistryMetricsResponse(enabled=True, **registry.stats())
+
+
+@router.get(
+    "/metrics/alerts",
+    response_model=AlertMetricsResponse,
+    summary="Alert rule engine state",
+    description=(
+        "Returns the configured alert rules with their tracked keys and fire counts, "
+        "this worker's delivery queue counters, and the most recent alerts."
+    ),
+)
+def get_alert_metrics() -> AlertMetricsResponse:
+    engine = get_alert_engine()
+    if engine is None:
+        return AlertMetricsResponse(enabled=False)
+    return AlertMetricsResponse(enabled=True, **engine.stats())
+
+
+@router.get(
+    "/metrics/db",
+    response_model=DbMetricsResponse,
+    summary="Database pool and read-replica status",
+    description=(
+        "Returns, per engine (primary and optional read replica), pool size and "
+        "current checkouts, checkout count, average / max pool wait and timeouts, "
+        "plus the replica's measured lag and how reads were routed."
+    ),
+)
+def get_db_metrics() -> DbMetricsResponse:
+    read_router = get_read_router()
+    return DbMetricsResponse(
+        engines=[EnginePoolStats(**s) for s in engine_stats()],
+        replica=ReplicaStats(**read_router.stats()) if read_router is not None else None,
     )
+
+
+@router.get(
+    "/metrics/queue",
+    response_model=QueueMetricsResponse,
+    summary="Asynchronous scoring queue lag and throughput",
+    description=(
+        "Returns the job queue's backlog (unacknowledged messages) and the age of "
+        "the oldest one, plus counters and throughput for every live "
+        "`python -m app.worker` consumer."
+    ),
+)
+def get_queue_metrics() -> QueueMetricsResponse:
+    backend, lag = None, {"backlog": None, "oldest_age_s": None}
+    if settings.QUEUE_URL:
+        try:
+            queue = get_lag_reader()
+            backend, lag = queue.name, queue.lag()
+        except Exception as exc:        # broker down / driver missing: report what we can
+            logger.error(f"[metrics] queue lag unavailable for {settings.QUEUE_URL}: {exc}")
+    consumers = [QueueConsumerStats(**s) for s in load_consumer_stats()]
+    return QueueMetricsResponse(
+        backend=backend,
+        **lag,
+        rows_per_s=round(sum(c.recent_rows_per_s for c in consumers), 1),
+        consumers=consumers,
+    )
+
+
+@router.get(
+    "/metrics/sink",
+    response_model=SinkMetricsResponse,
+    summary="Prediction sink backlog and compaction",
+    description=(
+        "Which sink persists predictions. For the segment log: open and sealed segments "
+        "on disk, rows not yet loaded into the database, and compactor throughput."
+    ),
+)
+def get_sink_metrics() -> SinkMetricsResponse:
+    sink = get_prediction_sink()
+    unflushed = sink.unflushed()
+    return SinkMetricsResponse(**sink.stats(),
+                               unflushed_rows=sum(n for n, _, _ in unflushed.values()))
@@ -0,0 +1,210 @@
+"""
+app/routers/stream.py
+──────────────────────
+POST /v1/{fraud|anomaly}/score-stream — Bounded-memory bulk scoring.
+
+The request body (NDJSON, or CSV with a header row; chunked transfer is
+fine) is parsed incrementally into blocks of SCORE_STREAM_BLOCK_SIZE rows.
+Each block is scored with one vectorised ModelLoader call and its results
+are streamed back as NDJSON while the upload continues, so server memory
+stays constant regardless of upload size.
+
+Reading the body and sending results are decoupled through a _ResultSpool
+(in memory up to SCORE_STREAM_SPOOL_BYTES, then a temp file). Full-duplex
+clients get results as they are produced; half-duplex clients (which send
+the whole body before reading) do not deadlock the upload.
+
+Response lines, in input order:
+    {"row": 1, "fraud_probability": 0.0312, "model_version": "fraud-v1.1.0"}
+    {"row": 2, "error": "transaction_amount: Input should be greater than 0"}
+    ...
+    {"summary": {"rows": 2, "scored": 1, "errors": 1, "persisted": false, ...}}
+"""
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from app.config import settings
+from app.db.session import get_db
+from app.models.loader import get_model_loader
+from app.scoring import (
+    SCORE_FIELDS, RecordError, RecordParser, persist_block, score_block, validate_record,
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/v1", tags=["Streaming"])
+
+
+class BodyDrivenStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose iterator is still reading the request body.
+    Starlette's default disconnect listener would consume body messages
+    from `receive`, so it is skipped; a client disconnect surfaces as
+    ClientDisconnect from `request.stream()` instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class _ResultSpool:
+    """Append-only byte buffer with an async reader; spills to disk past `max_memory`."""
+
+    def __init__(self, max_memory: int):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._written = 0
+        self._read = 0
+        self._done = False
+        self._event = asyncio.Event()
+
+    def write(self, data: bytes) -> None:
+        self._file.seek(self._written)
+        self._file.write(data)
+        self._written += len(data)
+        self._event.set()
+
+    def finish(self) -> None:
+        self._done = True
+        self._event.set()
+
+    async def chunks(self, size: int = 65_536):
+        try:
+            while True:
+                if self._read < self._written:
+                    self._file.seek(self._read)
+                    data = self._file.read(min(size, self._written - self._read))
+                    self._read += len(data)
+                    if self._read == self._written:
+                        # Reader caught up: reuse the buffer from the start.
+                        self._read = self._written = 0
+                        self._file.seek(0)
+                        self._file.truncate()
+                    yield data
+                elif self._done:
+                    return
+                else:
+                    self._event.clear()
+                    await self._event.wait()
+        finally:
+            self._file.close()
+
+
+def _detect_format(request: Request, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    content_type = request.headers.get("content-type", "")
+    return "csv" if "csv" in content_type else "ndjson"
+
+
+def _line(obj: dict) -> bytes:
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode()
+
+
+@router.post(
+    "/{kind}/score-stream",
+    summary="Stream-score an NDJSON / CSV upload",
+    description=(
+        "Scores an arbitrarily large NDJSON or CSV body in fixed-size blocks and "
+        "streams results back as NDJSON while the upload is still being read. "
+        "Invalid rows are reported inline; `persist=true` bulk-inserts each block."
+    ),
+    response_class=BodyDrivenStreamingResponse,
+)
+async def score_stream(
+    kind: Literal["fraud", "anomaly"],
+    request: Request,
+    fmt: Literal["ndjson", "csv"] | None = Query(
+        None, alias="format", description="Override Content-Type detection"),
+    persist: bool = Query(False, description="Persist scored rows to the prediction table"),
+    db: Session = Depends(get_db),
+) -> BodyDrivenStreamingResponse:
+    loader = get_model_loader()
+    parser = RecordParser(_detect_format(request, fmt))
+    block_size = settings.SCORE_STREAM_BLOCK_SIZE
+    score_field = SCORE_FIELDS[kind]
+
+    async def produce(spool: _ResultSpool) -> None:
+        totals = {"rows": 0, "scored": 0, "errors": 0}
+        t0 = time.perf_counter()
+        pending: list[tuple[int, object]] = []     # (row, validated model | RecordError)
+        n_valid = 0
+
+        async def flush() -> None:
+            nonlocal pending, n_valid
+            valid = [item for _, item in pending if not isinstance(item, RecordError)]
+            scores, model_version = [], None
+            if valid:
+                tb = time.perf_counter()
+                scores, model_version = await run_in_threadpool(score_block, loader, kind, valid)
+                latency_ms = (time.perf_counter() - tb) * 1000 / len(valid)
+                if persist:
+                    await run_in_threadpool(persist_block, db, kind, valid, scores,
+                                            model_version, latency_ms)
+            score_iter = iter(scores)
+            out = []
+            for row, item in pending:
+                if isinstance(item, RecordError):
+                    out.append(_line({"row": row, "error": str(item)}))
+                else:
+                    out.append(_line({"row": row, score_field: round(float(next(score_iter)), 4),
+                                      "model_version": model_version}))
+            totals["scored"] += len(valid)
+            pending, n_valid = [], 0
+            spool.write(b"".join(out))
+
+        def add(row: int, record) -> None:
+            nonlocal n_valid
+            totals["rows"] += 1
+            if not isinstance(record, RecordError):
+                try:
+                    record = validate_record(kind, record)
+                    n_valid += 1
+                except RecordError as exc:
+                    record = exc
+            if isinstance(record, RecordError):
+                totals["errors"] += 1
+            pending.append((row, record))
+
+        try:
+            async for chunk in request.stream():
+                for row, record in parser.feed(chunk):
+                    add(row, record)
+                    if n_valid >= block_size or len(pending) >= 4 * block_size:
+                        await flush()
+            for row, record in parser.close():
+                add(row, record)
+            if pending:
+                await flush()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            logger.info(f"[{kind}] score-stream rows={totals['rows']} errors={totals['errors']} "
+                        f"persist={persist} elapsed={elapsed_ms:.1f}ms")
+            spool.write(_line({"summary": {**totals, "persisted": persist,
+                                           "elapsed_ms": round(elapsed_ms, 3)}}))
+        except ClientDisconnect:
+            logger.info(f"[{kind}] score-stream client disconnected after {totals['rows']} rows")
+        finally:
+            spool.finish()
+
+    async def results():
+        spool = _ResultSpool(settings.SCORE_STREAM_SPOOL_BYTES)
+        producer = asyncio.create_task(produce(spool))
+        try:
+            async for data in spool.chunks():
+                yield data
+            await producer              # re-raise producer errors
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    return BodyDrivenStreamingResponse(results(), media_type="application/x-ndjson")
@@ -3,6 +3,8 @@ app/schemas/anomaly.py — Pydantic schemas for the anomaly detection endpoint.
 """
 from pydantic import BaseModel, Field
 
+from app.schemas.explanation import Explanation
+
 
 class AnomalyRequest(BaseModel):
     response_time: float = Field(..., gt=0, example=950.0,
@@ -13,6 +15,8 @@ class AnomalyRequest(BaseModel):
                              description="CPU utilisation percentage [0-100]")
     memory_usage: float = Field(..., ge=0.0, le=100.0, example=87.0,
                                 description="Memory utilisation percentage [0-100]")
+    host: str | None = Field(None, min_length=1, max_length=255, example="api-7",
+                             description="Reporting host; used to group alert rules")
 
     model_config = {
         "json_schema_extra": {
@@ -26,8 +30,28 @@ class AnomalyRequest(BaseModel):
     }
 
 
+class SimilarAnomaly(BaseModel):
+    id: int = Field(..., description="anomaly_predictions row id")
+    distance: float = Field(..., description="Euclidean distance in the scaled feature space")
+
+
 class AnomalyResponse(BaseModel):
     anomaly_score: float = Field(..., ge=0.0, le=1.0,
                                  description="Normalised anomaly score; higher = more anomalous")
     model_version: str = Field(..., description="Deployed model version")
     latency_ms: float = Field(..., description="Inference latency in milliseconds")
+    similar: list[SimilarAnomaly] | None = Field(
+        None, description="Nearest previously seen high-score anomalies (when ?similar=k)")
+    explanation: Explanation | None = Field(
+        None, description="Per-feature attributions (when ?explain=true)")
+
+
+class AnomalyBatchRequest(BaseModel):
+    items: list[AnomalyRequest] = Field(..., min_length=1, max_length=1000,
+                                        description="Metric samples to score (max 1000)")
+
+
+class AnomalyBatchResponse(BaseModel):
+    predictions: list[AnomalyResponse]
+    model_version: str = Field(..., description="Deployed model version")
+    latency_ms: float = Field(..., description="Inference latency for the whole batch")
@@ -0,0 +1,13 @@
+"""
+app/schemas/explanation.py — Pydantic schema for per-feature score explanations.
+"""
+from pydantic import BaseModel, Field
+
+
+class Explanation(BaseModel):
+    method: str = Field(..., description="linear_logit (fraud) | path_split (anomaly)")
+    base_value: float | None = Field(
+        None, description="Model output at the training mean (fraud: intercept logit)")
+    contributions: dict[str, float] = Field(
+        ..., description="Per-feature contribution. Fraud: additive logit terms; "
+                         "anomaly: share of isolation splits (sums to 1)")
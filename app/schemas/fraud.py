@@ -1,7 +1,9 @@
 """
 app/schemas/fraud.py — Pydantic schemas for the fraud detection endpoint.
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.explanation import Explanation
 
 
 class FraudRequest(BaseModel):
@@ -11,10 +13,19 @@ class FraudRequest(BaseModel):
                                description="Category of merchant")
     country: str = Field(..., example="US",
                          description="ISO 2-letter country code")
-    time_delta: float = Field(..., ge=0, example=5.2,
-                              description="Hours since last transaction")
+    time_delta: float | None = Field(None, ge=0, example=5.2,
+                                     description="Hours since last transaction. Optional when "
+                                                 "entity_id is given: derived from the feature store")
     device_type: str = Field(..., example="mobile",
                              description="Device used: mobile | desktop | tablet")
+    entity_id: str | None = Field(None, min_length=1, max_length=128, example="card_4821",
+                                  description="Card / account id used for velocity features")
+
+    @model_validator(mode="after")
+    def require_time_delta_or_entity(self):
+        if self.time_delta is None and self.entity_id is None:
+            raise ValueError("time_delta is required when entity_id is not provided")
+        return self
 
     model_config = {
         "json_schema_extra": {
@@ -29,8 +40,32 @@ class FraudRequest(BaseModel):
     }
 
 
+class VelocityFeatures(BaseModel):
+    time_delta: float = Field(
+        ..., description="Hours since the entity's previous transaction (as used for scoring)")
+    txn_count_1m: int = Field(..., description="Transactions for the entity in the last minute")
+    amount_sum_1m: float = Field(..., description="Amount summed over the last minute")
+    txn_count_1h: int = Field(..., description="Transactions for the entity in the last hour")
+    amount_sum_1h: float = Field(..., description="Amount summed over the last hour")
+    distinct_countries_1h: int = Field(..., description="Distinct countries in the last hour")
+
+
 class FraudResponse(BaseModel):
     fraud_probability: float = Field(..., ge=0.0, le=1.0,
                                      description="Probability that transaction is fraudulent")
     model_version: str = Field(..., description="Deployed model version")
     latency_ms: float = Field(..., description="Inference latency in milliseconds")
+    velocity: VelocityFeatures | None = Field(None, description="Velocity features for entity_id")
+    explanation: Explanation | None = Field(
+        None, description="Per-feature contributions (when ?explain=true)")
+
+
+class FraudBatchRequest(BaseModel):
+    items: list[FraudRequest] = Field(..., min_length=1, max_length=1000,
+                                      description="Transactions to score (max 1000)")
+
+
+class FraudBatchResponse(BaseModel):
+    predictions: list[FraudResponse]
+    model_version: str = Field(..., description="Deployed model version")
+    latency_ms: float = Field(..., description="Inference latency for the whole batch")
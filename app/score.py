@@ -0,0 +1,401 @@
+"""
+app/score.py
+─────────────
+Offline multi-core bulk scoring for nightly backfills.
+
+    python -m app.score fraud transactions.csv --output scores.ndjson
+    python -m app.score anomaly metrics.ndjson --db --workers 8
+    python -m app.score fraud part-0.parquet --output scores.csv --resume
+
+  - The input is split into chunks: newline-aligned byte ranges of
+    ~`--chunk-mb` for CSV / NDJSON, row groups for Parquet (optional
+    dependency: pyarrow). The parent process only hands out (start, end)
+    offsets; each worker memory-maps the file and parses its own range,
+    so row data never crosses the process boundary on the way in.
+  - Workers load the ModelLoader artifacts once (pool initializer) and
+    score each chunk with one vectorised call via app/scoring.py, using the
+    same validation and encoding as the API.
+  - Results are consumed in chunk order, so output rows keep input order:
+    NDJSON lines (or CSV, by output extension) in the score-stream format,
+    or one executemany INSERT per chunk into the prediction table.
+  - After each chunk is durable (fsync / commit) a checkpoint is written
+    atomically; `--resume` truncates the output to the last checkpoint and
+    carries on from the next chunk. In --db mode a crash between a chunk's
+    commit and its checkpoint can re-insert that single chunk.
+
+The run ends with a report of rows/sec and peak RSS (parent and workers).
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Iterator
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+from app.config import settings
+from app.scoring import (
+    KINDS, SCORE_FIELDS, RecordError, RecordParser, insert_rows, prediction_rows,
+    score_block, validate_record,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_MB = 1
+CHECKPOINT_VERSION = 1
+
+# Per-worker state, filled in by _init_worker
+_WORKER: dict = {}
+
+
+def _detect_input_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    return "ndjson"
+
+
+def _import_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet input requires pyarrow (pip install pyarrow)") from None
+    return pq
+
+
+# ── Chunking ──────────────────────────────────────────────────
+
+def _text_header(path: str, fmt: str) -> tuple[bytes, int]:
+    """Returns (CSV header line, offset of the first data byte)."""
+    if fmt != "csv":
+        return b"", 0
+    with open(path, "rb") as f:
+        header = f.readline()
+    return header, len(header)
+
+
+def text_chunks(path: str, data_start: int, chunk_bytes: int) -> Iterator[tuple[int, int]]:
+    """Yields newline-aligned (start, end) byte ranges of ~chunk_bytes."""
+    size = os.path.getsize(path)
+    if size <= data_start:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = data_start
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                nl = mm.find(b"\n", end - 1)
+                end = size if nl == -1 else nl + 1
+            yield start, end
+            start = end
+
+
+def _chunk_specs(path: str, fmt: str, chunk_bytes: int) -> Iterator[tuple]:
+    if fmt == "parquet":
+        n_groups = _import_parquet().ParquetFile(path).num_row_groups
+        return ((g,) for g in range(n_groups))
+    _, data_start = _text_header(path, fmt)
+    return text_chunks(path, data_start, chunk_bytes)
+
+
+# ── Worker side ───────────────────────────────────────────────
+
+def _init_worker(kind: str, path: str, fmt: str, with_rows: bool) -> None:
+    from app.models.loader import get_model_loader
+
+    _WORKER.update(kind=kind, fmt=fmt, with_rows=with_rows, loader=get_model_loader())
+    if fmt == "parquet":
+        _WORKER["parquet"] = _import_parquet().ParquetFile(path, memory_map=True)
+    else:
+        f = open(path, "rb")
+        _WORKER["file"] = f
+        _WORKER["mm"] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _WORKER["header"] = _text_header(path, fmt)[0]
+
+
+def _chunk_records(spec: tuple) -> Iterator[tuple[int, dict | RecordError]]:
+    if _WORKER["fmt"] == "parquet":
+        table = _WORKER["parquet"].read_row_group(spec[0])
+        for i, record in enumerate(table.to_pylist(), start=1):
+            yield i, {k: v for k, v in record.items() if v is not None}
+        return
+    start, end = spec
+    parser = RecordParser(_WORKER["fmt"])
+    for _ in parser.feed(_WORKER["header"]):
+        pass
+    yield from chain(parser.feed(_WORKER["mm"][start:end]), parser.close())
+
+
+def _score_chunk(task: tuple[int, tuple]) -> dict:
+    """
+    Scores one chunk. Returns per-row results in chunk order as
+    (local_row, score | error message), plus prediction-table rows
+    when writing to the DB.
+    """
+    index, spec = task
+    kind = _WORKER["kind"]
+    results: list[tuple[int, float | str]] = []
+    valid, valid_pos = [], []
+    for row, record in _chunk_records(spec):
+        if not isinstance(record, RecordError):
+            try:
+                record = validate_record(kind, record)
+            except RecordError as exc:
+                record = exc
+        if isinstance(record, RecordError):
+            results.append((row, str(record)))
+        else:
+            valid_pos.append(len(results))
+            valid.append(record)
+            results.append((row, 0.0))
+
+    model_version, values = None, None
+    if valid:
+        t0 = time.perf_counter()
+        scores, model_version = score_block(_WORKER["loader"], kind, valid)
+        latency_ms = (time.perf_counter() - t0) * 1000 / len(valid)
+        for pos, s in zip(valid_pos, scores):
+            results[pos] = (results[pos][0], float(s))
+        if _WORKER["with_rows"]:
+            values = prediction_rows(kind, valid, scores, model_version, latency_ms)
+    return {"index": index, "results": results, "scored": len(valid),
+            "model_version": model_version, "values": values}
+
+
+# ── Output ────────────────────────────────────────────────────
+
+class _FileSink:
+    """NDJSON / CSV result file that can be truncated back to a checkpoint."""
+
+    def __init__(self, path: str, kind: str, resume_bytes: int | None):
+        self.fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+        self.score_field = SCORE_FIELDS[kind]
+        if resume_bytes is None:
+            self._f = open(path, "wb")
+            if self.fmt == "csv":
+                self._f.write(f"row,{self.score_field},model_version,error\n".encode())
+        else:
+            self._f = open(path, "r+b")
+            self._f.truncate(resume_bytes)
+            self._f.seek(resume_bytes)
+
+    def write_chunk(self, chunk: dict, row_offset: int) -> None:
+        version = chunk["model_version"]
+        lines = []
+        for row, value in chunk["results"]:
+            row += row_offset
+            if isinstance(value, str):
+                if self.fmt == "csv":
+                    lines.append(f'{row},,,"{value.replace(chr(34), chr(34) * 2)}"\n')
+                else:
+                    lines.append(json.dumps({"row": row, "error": value},
+                                            separators=(",", ":")) + "\n")
+            elif self.fmt == "csv":
+                lines.append(f"{row},{value:.4f},{version},\n")
+            else:
+                lines.append(f'{{"row":{row},"{self.score_field}":{value:.4f},'
+                             f'"model_version":"{version}"}}\n')
+        self._f.write("".join(lines).encode())
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+# ── Checkpointing ─────────────────────────────────────────────
+
+def _input_identity(path: str) -> dict:
+    st = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": st.st_size,
+            "input_mtime_ns": st.st_mtime_ns}
+
+
+def _load_checkpoint(path: str) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, state: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _peak_rss_mb() -> tuple[float | None, float | None]:
+    """(parent, largest finished worker) peak RSS in MB, if available."""
+    if resource is None:
+        return None, None
+    unit = 1 if sys.platform == "darwin" else 1024      # ru_maxrss: bytes vs KiB
+
+    def to_mb(who: int) -> float:
+        return resource.getrusage(who).ru_maxrss * unit / 2**20
+
+    return to_mb(resource.RUSAGE_SELF), to_mb(resource.RUSAGE_CHILDREN)
+
+
+def _database_url(session_factory) -> str:
+    """Target database of a DB run (password masked), so resuming elsewhere is rejected."""
+    with session_factory() as db:
+        return db.get_bind().url.render_as_string(hide_password=True)
+
+
+# ── Driver ────────────────────────────────────────────────────
+
+def run(
+    kind: str,
+    input_path: str,
+    output_path: str | None = None,
+    to_db: bool = False,
+    fmt: str | None = None,
+    workers: int | None = None,
+    chunk_mb: float = DEFAULT_CHUNK_MB,
+    checkpoint_path: str | None = None,
+    resume: bool = False,
+    session_factory=None,
+) -> dict:
+    """
+    Scores `input_path` and writes to `output_path` or the prediction
+    table. Returns the run summary (rows, scored, errors, rows_per_s, ...).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind}")
+    if bool(output_path) == bool(to_db):
+        raise ValueError("Exactly one of output_path / to_db is required")
+    fmt = fmt or _detect_input_format(input_path)
+    if fmt == "parquet":
+        _import_parquet()
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or f"{output_path or input_path + '.' + kind + '.db'}.ckpt"
+
+    if to_db and session_factory is None:
+        from app.db.init_db import init_db
+        from app.db.session import SessionLocal
+        init_db()
+        session_factory = SessionLocal
+
+    identity = {**_input_identity(input_path), "kind": kind, "format": fmt,
+                "output": (os.path.abspath(output_path) if output_path
+                           else f"db:{_database_url(session_factory)}")}
+    state = {"version": CHECKPOINT_VERSION, **identity,
+             "chunk_bytes": int(chunk_mb * 2**20), "chunks_done": 0,
+             "rows": 0, "scored": 0, "errors": 0, "output_bytes": None, "complete": False}
+    if resume:
+        saved = _load_checkpoint(checkpoint_path)
+        if saved is not None:
+            if any(saved.get(k) != v for k, v in identity.items()):
+                raise ValueError(f"Checkpoint {checkpoint_path} does not match this input/output")
+            state = saved
+            logger.info(f"[score] resuming after chunk {state['chunks_done']} "
+                        f"({state['rows']} rows done)")
+
+    t0 = time.perf_counter()
+    rows_before = state["rows"]
+    if not state["complete"]:
+        specs = enumerate(_chunk_specs(input_path, fmt, state["chunk_bytes"]))
+        tasks = islice(specs, state["chunks_done"], None)
+        sink = _FileSink(output_path, kind, state["output_bytes"]) if output_path else None
+        db = session_factory() if to_db else None
+        if sink is not None and state["output_bytes"] is None:
+            state["output_bytes"] = sink.tell()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(kind, input_path, fmt, to_db)) as pool:
+                pending = deque(pool.submit(_score_chunk, t) for t in islice(tasks, 2 * workers))
+                while pending:
+                    chunk = pending.popleft().result()
+                    for task in islice(tasks, 1):
+                        pending.append(pool.submit(_score_chunk, task))
+
+                    if sink is not None:
+                        sink.write_chunk(chunk, state["rows"])
+                        state["output_bytes"] = sink.tell()
+                    else:
+                        insert_rows(db, kind, chunk["values"] or [])
+                    n = len(chunk["results"])
+                    state["rows"] += n
+                    state["scored"] += chunk["scored"]
+                    state["errors"] += n - chunk["scored"]
+                    state["chunks_done"] = chunk["index"] + 1
+                    _save_checkpoint(checkpoint_path, state)
+
+                    done = state["rows"] - rows_before
+                    logger.info(f"[score] chunk {chunk['index']}: rows={n} total={state['rows']} "
+                                f"rate={done / (time.perf_counter() - t0):.0f} rows/s")
+        finally:
+            if sink is not None:
+                sink.close()
+            if db is not None:
+                db.close()
+        state["complete"] = True
+        _save_checkpoint(checkpoint_path, state)
+
+    elapsed_s = time.perf_counter() - t0
+    rss_parent, rss_worker = _peak_rss_mb()
+    processed = state["rows"] - rows_before
+    return {
+        "kind": kind,
+        "rows": state["rows"],
+        "scored": state["scored"],
+        "errors": state["errors"],
+        "rows_this_run": processed,
+        "elapsed_s": round(elapsed_s, 3),
+        "rows_per_s": round(processed / elapsed_s, 1) if elapsed_s > 0 else None,
+        "peak_rss_mb": None if rss_parent is None else round(rss_parent, 1),
+        "peak_worker_rss_mb": None if rss_worker is None else round(rss_worker, 1),
+        "checkpoint": checkpoint_path,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.score", description=__doc__.split("\n\n")[0])
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("input", help="CSV, NDJSON or Parquet file")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="Result file (.csv → CSV, otherwise NDJSON)")
+    target.add_argument("--db", action="store_true",
+                        help="Bulk-insert into the prediction table (DATABASE_URL)")
+    parser.add_argument("--format", choices=("csv", "ndjson", "parquet"),
+                        help="Input format (default: from file extension)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_MB,
+                        help="Approximate text chunk size per task")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    try:
+        summary = run(args.kind, args.input, output_path=args.output, to_db=args.db,
+                      fmt=args.format, workers=args.workers, chunk_mb=args.chunk_mb,
+                      checkpoint_path=args.checkpoint, resume=args.resume)
+    except (ValueError, OSError) as exc:
+        parser.error(str(exc))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
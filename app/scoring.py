@@ -0,0 +1,200 @@
+"""
+app/scoring.py
+───────────────
+Block-oriented scoring shared by the streaming endpoint
+(POST /v1/{kind}/score-stream) and the offline CLI (python -m app.score).
+
+  - RecordParser turns an arbitrary sequence of byte chunks (NDJSON or CSV
+    with a header row) into records incrementally; memory is bounded by
+    SCORE_STREAM_MAX_LINE_BYTES, not the input size.
+  - validate_record applies the same Pydantic schema as the predict routes,
+    so per-row errors carry the usual validation messages.
+  - score_block / persist_block run vectorised ModelLoader inference and a
+    single executemany INSERT for a block of validated rows; insert_rows
+    does the INSERT for rows already converted with prediction_rows.
+
+Bulk scoring never touches the live velocity feature store: rows are
+encoded as their entity's first transaction, and a missing `time_delta`
+falls back to FEATURE_STORE_DEFAULT_TIME_DELTA_H.
+"""
+import csv
+import json
+from typing import Iterator
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models import AnomalyPrediction, FraudPrediction
+from app.models.loader import ModelLoader
+from app.schemas.anomaly import AnomalyRequest
+from app.schemas.fraud import FraudRequest
+
+KINDS = ("fraud", "anomaly")
+SCHEMAS: dict[str, type[BaseModel]] = {"fraud": FraudRequest, "anomaly": AnomalyRequest}
+TABLES = {"fraud": FraudPrediction, "anomaly": AnomalyPrediction}
+SCORE_FIELDS = {"fraud": "fraud_probability", "anomaly": "anomaly_score"}
+INPUT_FIELDS = {
+    "fraud": ["transaction_amount", "merchant_type", "country", "time_delta", "device_type"],
+    "anomaly": ["response_time", "error_rate", "cpu_usage", "memory_usage"],
+}
+
+
+class RecordError(ValueError):
+    """A single input row could not be parsed or validated."""
+
+
+# ── Incremental parsing ───────────────────────────────────────
+
+class RecordParser:
+    """
+    Incremental NDJSON / CSV parser. `feed()` bytes as they arrive and it
+    yields (row_number, record_or_error) for every complete line; call
+    `close()` at end of input to flush a trailing line without newline.
+    Row numbers are 1-based data rows (the CSV header is not counted).
+
+    A line longer than `max_line_bytes` is reported as a RecordError as
+    soon as the limit is crossed; the rest of it is discarded up to the
+    next newline without being buffered.
+    """
+
+    def __init__(self, fmt: str, max_line_bytes: int | None = None):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.max_line_bytes = max_line_bytes or settings.SCORE_STREAM_MAX_LINE_BYTES
+        self._buffer = b""
+        self._skipping = False           # inside an over-long line, reported already
+        self._header: list[str] | None = None
+        self._row = 0
+
+    def feed(self, chunk: bytes) -> Iterator[tuple[int, dict | RecordError]]:
+        if self._skipping:
+            end = chunk.find(b"\n")
+            if end < 0:
+                return
+            chunk, self._skipping = chunk[end + 1:], False
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            yield from self._parse_line(line)
+        if len(self._buffer) > self.max_line_bytes:
+            self._buffer, self._skipping = b"", True
+            yield self._too_long()
+
+    def close(self) -> Iterator[tuple[int, dict | RecordError]]:
+        line, self._buffer, self._skipping = self._buffer, b"", False
+        yield from self._parse_line(line)
+
+    def _too_long(self) -> tuple[int, RecordError]:
+        self._row += 1
+        return self._row, RecordError(f"line longer than {self.max_line_bytes} bytes")
+
+    def _parse_line(self, line: bytes) -> Iterator[tuple[int, dict | RecordError]]:
+        if len(line) > self.max_line_bytes:
+            yield self._too_long()
+            return
+        line = line.strip()
+        if not line:
+            return
+        if self.fmt == "csv" and self._header is None:
+            self._header = [h.strip() for h in next(csv.reader([line.decode("utf-8")]))]
+            return
+        self._row += 1
+        try:
+            yield self._row, self._decode(line)
+        except (ValueError, UnicodeDecodeError) as exc:
+            yield self._row, RecordError(f"unparseable {self.fmt} row: {exc}")
+
+    def _decode(self, line: bytes) -> dict:
+        if self.fmt == "ndjson":
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            return record
+        values = next(csv.reader([line.decode("utf-8")]))
+        if len(values) != len(self._header):
+            raise ValueError(f"expected {len(self._header)} columns, got {len(values)}")
+        # Empty CSV cells mean "not provided" (e.g. optional entity_id / time_delta)
+        return {k: v for k, v in zip(self._header, values) if v != ""}
+
+
+def validate_record(kind: str, record: dict) -> BaseModel:
+    """Validates one raw record against the predict-route schema."""
+    try:
+        return SCHEMAS[kind].model_validate(record)
+    except ValidationError as exc:
+        detail = "; ".join(
+            f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}"
+            for err in exc.errors()
+        )
+        raise RecordError(detail) from None
+
+
+# ── Vectorised scoring ────────────────────────────────────────
+
+def feature_matrix(loader: ModelLoader, kind: str, rows: list[BaseModel]) -> np.ndarray:
+    """Model input matrix for validated rows."""
+    if kind == "fraud":
+        default_td = settings.FEATURE_STORE_DEFAULT_TIME_DELTA_H
+        return np.array([
+            loader.encode_fraud(
+                r.transaction_amount, r.merchant_type, r.country,
+                r.time_delta if r.time_delta is not None else default_td, r.device_type,
+            )
+            for r in rows
+        ], dtype=float).reshape(len(rows), -1)
+    return np.array([
+        [r.response_time, r.error_rate, r.cpu_usage, r.memory_usage] for r in rows
+    ], dtype=float).reshape(len(rows), 4)
+
+
+def score_block(loader: ModelLoader, kind: str, rows: list[BaseModel]) -> tuple[np.ndarray, str]:
+    """Scores a block of validated rows. Returns (scores, model_version)."""
+    X = feature_matrix(loader, kind, rows)
+    if kind == "fraud":
+        return loader.score_fraud(X), loader.model_version("fraud")
+    return loader.score_anomaly(X), loader.model_version("anomaly")
+
+
+def prediction_rows(
+    kind: str,
+    rows: list[BaseModel],
+    scores: np.ndarray,
+    model_version: str,
+    latency_ms: float,
+) -> list[dict]:
+    """Column dicts for a bulk INSERT into the kind's prediction table."""
+    score_field = SCORE_FIELDS[kind]
+    fields = INPUT_FIELDS[kind]
+    out = []
+    for r, s in zip(rows, scores):
+        values = {f: getattr(r, f) for f in fields}
+        if kind == "fraud" and values["time_delta"] is None:
+            values["time_delta"] = settings.FEATURE_STORE_DEFAULT_TIME_DELTA_H
+        values.update({score_field: float(s), "model_version": model_version,
+                       "latency_ms": latency_ms})
+        out.append(values)
+    return out
+
+
+def insert_rows(db: Session, kind: str, values: list[dict]) -> None:
+    """Bulk-inserts prediction_rows() output (one executemany) and commits."""
+    if not values:
+        return
+    db.execute(insert(TABLES[kind]), values)
+    db.commit()
+
+
+def persist_block(
+    db: Session,
+    kind: str,
+    rows: list[BaseModel],
+    scores: np.ndarray,
+    model_version: str,
+    latency_ms: float,
+) -> None:
+    """Bulk-inserts a scored block (one executemany) and commits."""
+    insert_rows(db, kind, prediction_rows(kind, rows, scores, model_version, latency_ms))
@@ -0,0 +1,163 @@
+"""
+app/shadow.py
+──────────────
+Shadow scoring off the request path.
+
+Prediction routes hand each served request to `submit_shadow()`, which is
+a non-blocking put into a bounded queue: when the queue is full the item
+is dropped and counted, so a slow or overloaded shadow model never adds
+latency or memory to live traffic. A single background thread drains the
+queue in batches of SHADOW_BATCH_SIZE, scores each batch with the "shadow"
+variant in one vectorised call, and bulk-inserts the results into
+shadow_predictions alongside the served score and model version.
+
+Shadow `latency_ms` is the per-row share of the batched call.
+GET /v1/metrics/shadow summarises the stored deltas per model version.
+"""
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.config import settings
+from app.db.models import ShadowPrediction
+from app.models.loader import KINDS, ModelLoader, get_model_loader
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Bounded queue + background thread that scores requests with shadow models."""
+
+    def __init__(self, loader: ModelLoader, session_factory, queue_size: int, batch_size: int):
+        self._loader = loader
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "dropped": 0, "processed": 0, "failed": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the worker after draining what is already queued."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def submit(self, kind: str, inputs: tuple, primary_score: float,
+               primary_version: str, primary_latency_ms: float) -> bool:
+        """Queues one served request; returns False if it was not queued."""
+        if not self._loader.has_variant(kind, "shadow"):
+            return False
+        try:
+            self._queue.put_nowait((kind, inputs, primary_score, primary_version,
+                                    primary_latency_ms))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"queue_depth": self._queue.qsize(), "queue_capacity": self._queue.maxsize,
+                **counters}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.process(batch)
+
+    def process(self, batch: list[tuple]) -> None:
+        """Scores and persists one batch of queued items (any mix of kinds)."""
+        for kind in KINDS:
+            items = [item for item in batch if item[0] == kind]
+            if not items:
+                continue
+            try:
+                self._persist(kind, items)
+                self._count("processed", len(items))
+            except Exception as exc:      # keep the worker alive whatever the candidate does
+                self._count("failed", len(items))
+                logger.error(f"[shadow] {kind} batch of {len(items)} failed: {exc}")
+
+    def _persist(self, kind: str, items: list[tuple]) -> None:
+        loader = self._loader
+        t0 = time.perf_counter()
+        if kind == "fraud":
+            X = np.array([loader.encode_fraud(*inputs, variant="shadow")
+                          for _, inputs, *_ in items], dtype=float)
+            scores = loader.score_fraud(X, variant="shadow")
+        else:
+            X = np.array([inputs for _, inputs, *_ in items], dtype=float)
+            scores = loader.score_anomaly(X, variant="shadow")
+        latency_ms = (time.perf_counter() - t0) * 1000 / len(items)
+        model_version = loader.model_version(kind, "shadow")
+
+        rows = [
+            {"kind": kind, "model_version": model_version, "score": float(s),
+             "latency_ms": latency_ms, "primary_model_version": p_version,
+             "primary_score": p_score, "primary_latency_ms": p_latency}
+            for (_, _, p_score, p_version, p_latency), s in zip(items, scores)
+        ]
+        with self._session_factory() as db:
+            db.execute(insert(ShadowPrediction), rows)
+            db.commit()
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_shadow_scorer: ShadowScorer | None = None
+
+
+def get_shadow_scorer() -> ShadowScorer | None:
+    """The running ShadowScorer, or None when no shadow model is loaded."""
+    return _shadow_scorer
+
+
+def start_shadow_scorer(session_factory) -> None:
+    """Startup hook: starts the worker if any kind has a shadow model."""
+    global _shadow_scorer
+    loader = get_model_loader()
+    if not any(loader.has_variant(kind, "shadow") for kind in KINDS):
+        return
+    _shadow_scorer = ShadowScorer(loader, session_factory, settings.SHADOW_QUEUE_SIZE,
+                                  settings.SHADOW_BATCH_SIZE)
+    _shadow_scorer.start()
+    logger.info("Shadow scorer started for "
+                + ", ".join(f"{k}={loader.model_version(k, 'shadow')}"
+                            for k in KINDS if loader.has_variant(k, "shadow")))
+
+
+def stop_shadow_scorer() -> None:
+    global _shadow_scorer
+    if _shadow_scorer is not None:
+        _shadow_scorer.stop()
+        _shadow_scorer = None
+
+
+def submit_shadow(kind: str, inputs: tuple, primary_score: float,
+                  primary_version: str, primary_latency_ms: float) -> None:
+    """Route hook: queues a served request for shadow scoring, if enabled."""
+    scorer = _shadow_scorer
+    if scorer is not None:
+        scorer.submit(kind, inputs, primary_score, primary_version, primary_latency_ms)
@@ -0,0 +1,252 @@
+"""
+app/similarity.py
+──────────────────
+Nearest-neighbour index over past high-score anomalies ("similar incidents").
+
+Points live in the anomaly model's *scaled* 4-feature space (the pipeline's
+StandardScaler), so distances are comparable across features:
+
+  - a KDTree holds the bulk of the points (the "base");
+  - newly persisted predictions go to a small brute-force "delta" buffer,
+    so inserts are O(1) and visible immediately;
+  - when the delta grows past SIMILARITY_REBUILD_RATIO × base, a background
+    thread rebuilds the tree from base + delta and swaps it in atomically.
+
+Queries never take the writers' lock: they read the current published
+state (tree, base, delta arrays and delta length) in one reference and
+use the delta prefix as a view, which later appends never overwrite.
+
+The index is saved to SIMILARITY_INDEX_PATH (tagged with the model version)
+so restarts skip the rebuild from `anomaly_predictions`.
+"""
+import logging
+import os
+import threading
+
+import joblib
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from app.config import settings
+from app.db.models import AnomalyPrediction
+from app.models.loader import get_model_loader
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 4
+INDEX_VERSION = 1
+
+
+class _View:
+    """
+    One published state of the index. Everything in it is read-only once
+    published: `add()` only writes delta slots at or past `n_delta` and then
+    publishes a new view, and rebuilds / reloads allocate fresh arrays.
+    """
+
+    __slots__ = ("tree", "base_points", "base_ids", "delta_points", "delta_ids", "n_delta")
+
+    def __init__(self, tree, base_points, base_ids, delta_points, delta_ids, n_delta):
+        self.tree = tree
+        self.base_points = base_points
+        self.base_ids = base_ids
+        self.delta_points = delta_points
+        self.delta_ids = delta_ids
+        self.n_delta = n_delta
+
+
+def _delta_buffers(points: np.ndarray, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Fresh delta arrays holding (points, ids), with room to append."""
+    capacity = max(64, 2 * len(ids))
+    delta_points = np.empty((capacity, N_FEATURES))
+    delta_ids = np.empty(capacity, dtype=np.int64)
+    delta_points[:len(ids)] = points
+    delta_ids[:len(ids)] = ids
+    return delta_points, delta_ids
+
+
+class AnomalyIndex:
+    """KDTree + brute-force delta buffer, rebuilt in the background when degraded."""
+
+    def __init__(self, model_version: str, max_points: int, rebuild_ratio: float,
+                 min_rebuild_delta: int = 256):
+        self.model_version = model_version
+        self._max_points = max_points
+        self._rebuild_ratio = rebuild_ratio
+        self._min_rebuild_delta = min_rebuild_delta
+
+        self._lock = threading.Lock()         # writers only; readers take self._view
+        empty = np.empty((0, N_FEATURES)), np.empty(0, dtype=np.int64)
+        self._view = _View(None, *empty, *_delta_buffers(*empty), 0)
+        self._rebuilding = False
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        view = self._view
+        return len(view.base_ids) + view.n_delta
+
+    # ── Writes ─────────────────────────────────────────────────
+
+    def add(self, prediction_id: int, point: np.ndarray) -> None:
+        """Adds one scaled point. Schedules a background rebuild if the delta is too large."""
+        with self._lock:
+            view = self._view
+            n = view.n_delta
+            delta_points, delta_ids = view.delta_points, view.delta_ids
+            if n == len(delta_ids):
+                delta_points, delta_ids = _delta_buffers(delta_points, delta_ids)
+            delta_points[n] = point                 # past every published prefix
+            delta_ids[n] = prediction_id
+            self._view = _View(view.tree, view.base_points, view.base_ids,
+                               delta_points, delta_ids, n + 1)
+            degraded = n + 1 >= max(self._min_rebuild_delta,
+                                    self._rebuild_ratio * len(view.base_ids))
+            if not degraded or self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_safely, name="anomaly-index-rebuild",
+                         daemon=True).start()
+
+    def bulk_load(self, ids: np.ndarray, points: np.ndarray) -> None:
+        """Replaces the contents with (ids, scaled points) and builds the tree synchronously."""
+        ids = np.asarray(ids, dtype=np.int64)[-self._max_points:]
+        points = np.asarray(points, dtype=float).reshape(-1, N_FEATURES)[-self._max_points:]
+        tree = KDTree(points) if len(ids) else None
+        empty = np.empty((0, N_FEATURES)), np.empty(0, dtype=np.int64)
+        with self._lock:
+            self._view = _View(tree, points, ids, *_delta_buffers(*empty), 0)
+
+    def rebuild(self) -> None:
+        """Folds the delta into a new tree (built outside the lock) and swaps it in."""
+        view = self._view
+        n_taken = view.n_delta
+        points = np.vstack([view.base_points, view.delta_points[:n_taken]])
+        ids = np.concatenate([view.base_ids, view.delta_ids[:n_taken]])
+        points, ids = points[-self._max_points:], ids[-self._max_points:]
+        tree = KDTree(points) if len(ids) else None
+        with self._lock:
+            # Keep anything added while the tree was being built.
+            current = self._view
+            remaining = (current.delta_points[n_taken:current.n_delta],
+                         current.delta_ids[n_taken:current.n_delta])
+            self._view = _View(tree, points, ids, *_delta_buffers(*remaining),
+                               len(remaining[1]))
+            self.rebuilds += 1
+
+    def _rebuild_safely(self) -> None:
+        try:
+            self.rebuild()
+            if settings.SIMILARITY_INDEX_PATH:
+                self.save(settings.SIMILARITY_INDEX_PATH)
+        except Exception:
+            logger.exception("Anomaly index rebuild failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    # ── Reads ──────────────────────────────────────────────────
+
+    def query(self, point: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Returns up to k (prediction_id, distance) pairs, nearest first. Lock-free."""
+        if k <= 0:
+            return []
+        point = np.asarray(point, dtype=float).reshape(1, N_FEATURES)
+        view = self._view
+        delta_points = view.delta_points[:view.n_delta]
+        delta_ids = view.delta_ids[:view.n_delta]
+
+        dists, ids = np.empty(0), np.empty(0, dtype=np.int64)
+        if view.tree is not None:
+            d, i = view.tree.query(point, k=min(k, len(view.base_ids)))
+            dists, ids = d[0], view.base_ids[i[0]]
+        if len(delta_ids):
+            d = np.sqrt(((delta_points - point) ** 2).sum(axis=1))
+            dists = np.concatenate([dists, d])
+            ids = np.concatenate([ids, delta_ids])
+        order = np.argsort(dists, kind="stable")[:k]
+        return [(int(ids[j]), float(dists[j])) for j in order]
+
+    def stats(self) -> dict:
+        view = self._view
+        return {
+            "model_version": self.model_version,
+            "points": len(view.base_ids) + view.n_delta,
+            "delta": view.n_delta,
+            "rebuilds": self.rebuilds,
+        }
+
+    # ── Persistence ────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        view = self._view
+        ids = np.concatenate([view.base_ids, view.delta_ids[:view.n_delta]])
+        points = np.vstack([view.base_points, view.delta_points[:view.n_delta]])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({"version": INDEX_VERSION, "model_version": self.model_version,
+                     "ids": ids, "points": points}, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Loads a saved index. Returns False if it was built for another model version."""
+        data = joblib.load(path)
+        if data.get("version") != INDEX_VERSION or data.get("model_version") != self.model_version:
+            return False
+        self.bulk_load(data["ids"], data["points"])
+        return True
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_anomaly_index: AnomalyIndex | None = None
+
+
+def get_anomaly_index() -> AnomalyIndex:
+    """Returns the singleton AnomalyIndex for the loaded anomaly model."""
+    global _anomaly_index
+    if _anomaly_index is None:
+        _anomaly_index = AnomalyIndex(
+            model_version=get_model_loader().model_version("anomaly"),
+            max_points=settings.SIMILARITY_MAX_POINTS,
+            rebuild_ratio=settings.SIMILARITY_REBUILD_RATIO,
+        )
+    return _anomaly_index
+
+
+def init_anomaly_index(session_factory) -> None:
+    """Startup hook: load the saved index, or rebuild it from anomaly_predictions."""
+    index = get_anomaly_index()
+    path = settings.SIMILARITY_INDEX_PATH
+    if path and os.path.exists(path):
+        try:
+            if index.load(path):
+                logger.info(f"Anomaly index loaded — {len(index)} points from {path}")
+                return
+            logger.info("Anomaly index on disk is for another model version; rebuilding.")
+        except Exception as exc:
+            logger.warning(f"Anomaly index {path} ignored: {exc}")
+
+    db = session_factory()
+    try:
+        rows = (
+            db.query(AnomalyPrediction.id, AnomalyPrediction.response_time,
+                     AnomalyPrediction.error_rate, AnomalyPrediction.cpu_usage,
+                     AnomalyPrediction.memory_usage)
+            .filter(AnomalyPrediction.anomaly_score >= settings.SIMILARITY_MIN_SCORE)
+            .order_by(AnomalyPrediction.id.desc())
+            .limit(settings.SIMILARITY_MAX_POINTS)
+            .all()
+        )
+    finally:
+        db.close()
+    rows.reverse()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    raw = np.array([r[1:] for r in rows], dtype=float).reshape(-1, N_FEATURES)
+    points = get_model_loader().scale_anomaly(raw) if len(rows) else raw
+    index.bulk_load(ids, points)
+    logger.info(f"Anomaly index built — {len(index)} points from anomaly_predictions")
+
+
+def save_anomaly_index() -> None:
+    """Shutdown hook: persist the index to SIMILARITY_INDEX_PATH."""
+    if _anomaly_index is not None and settings.SIMILARITY_INDEX_PATH:
+        _anomaly_index.save(settings.SIMILARITY_INDEX_PATH)
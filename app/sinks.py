@@ -0,0 +1,525 @@
+"""
+app/sinks.py
+─────────────
+Where the predict routes persist their predictions.
+
+  - SqlSink (PREDICTION_SINK=sql, the default): one INSERT … RETURNING and
+    commit per request, straight into fraud_predictions /
+    anomaly_predictions.
+  - SegmentLogSink (PREDICTION_SINK=segment): appends fixed-size binary
+    records to a local segment log and returns without touching the
+    database. A background compactor bulk-loads sealed segments.
+
+Segment log layout (PREDICTION_SEGMENT_DIR):
+
+    fraud-1760842582000-4121-000001.open     ← being appended by pid 4121
+    fraud-1760842577000-4121-000000.seg      ← sealed, waiting for the compactor
+
+  - A segment is a 64-byte header (magic, version, kind, record size)
+    followed by packed numpy records (RECORD_DTYPES). Records never span
+    a write boundary; a torn tail left by a crash is truncated on recovery.
+  - The active segment is sealed (renamed .open → .seg) once it reaches
+    PREDICTION_SEGMENT_MAX_BYTES or is PREDICTION_SEGMENT_MAX_AGE_S old,
+    so rows reach the database within seconds even at low traffic.
+  - The compactor memory-maps each sealed segment and inserts it with
+    executemany in PREDICTION_COMPACT_BATCH_ROWS chunks, in ONE transaction
+    together with a segment_loads row keyed by the segment name; the file
+    is deleted after the commit. A segment whose name is already in
+    segment_loads (crash between commit and delete, or another process's
+    compactor got there first) is deleted without loading again.
+  - `.open` segments left by a dead process are sealed at startup.
+
+GET /v1/metrics adds the rows still sitting in segments (`unflushed()`),
+so counts and averages stay exact. The writer keeps running totals for its
+active segments; other segments are summed once and then only over the
+records appended since the last call. Segments already recorded in
+segment_loads on the primary are skipped, so a segment that is committed
+but not yet deleted is not counted twice. High-score anomalies reach the
+similar-anomaly index when their segment is loaded, because that is when
+they get their database id.
+
+Rows whose strings do not fit the fixed-width fields (SEGMENT_STRING_BYTES)
+are written through the SQL path instead. Bulk writers (score-stream
+`persist=true`, the queue worker, python -m app.score) already batch their
+INSERTs and keep writing directly.
+"""
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models import SegmentLoad
+from app.scoring import INPUT_FIELDS, SCORE_FIELDS, TABLES
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"RAPSEG01"
+SEGMENT_VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sHI16s")            # magic, version, record size, kind
+
+SEGMENT_STRING_BYTES = {"merchant_type": 32, "country": 8, "device_type": 16,
+                        "model_version": 48}
+_COMMON = [("created_at", "<f8"), ("score", "<f8"), ("latency_ms", "<f8"),
+           ("model_version", f"S{SEGMENT_STRING_BYTES['model_version']}")]
+RECORD_DTYPES = {
+    "fraud": np.dtype(_COMMON + [
+        ("transaction_amount", "<f8"), ("time_delta", "<f8"),
+        ("merchant_type", f"S{SEGMENT_STRING_BYTES['merchant_type']}"),
+        ("country", f"S{SEGMENT_STRING_BYTES['country']}"),
+        ("device_type", f"S{SEGMENT_STRING_BYTES['device_type']}"),
+    ]),
+    "anomaly": np.dtype(_COMMON + [
+        ("response_time", "<f8"), ("error_rate", "<f8"), ("cpu_usage", "<f8"),
+        ("memory_usage", "<f8"),
+        ("similar", "u1"),                     # add to the similar-anomaly index once loaded
+    ]),
+}
+
+
+class PredictionSink(ABC):
+    """Persists scored predictions (column dicts for the kind's table)."""
+
+    name = "base"
+
+    @abstractmethod
+    def write(self, db: Session, kind: str, rows: list[dict],
+              similar: list[bool] | None = None) -> list[int] | None:
+        """
+        Persists `rows`. Returns their database ids, or None when they are
+        only written later (the sink then indexes the `similar` rows itself).
+        """
+
+    def unflushed(self) -> dict[str, tuple[int, float, float]]:
+        """kind → (rows, latency_ms sum, score sum) accepted but not yet in the database."""
+        return {}
+
+    def stats(self) -> dict:
+        return {"sink": self.name}
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class SqlSink(PredictionSink):
+    """Writes each call straight to the prediction table in the request's session."""
+
+    name = "sql"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written_rows = 0
+
+    def write(self, db: Session, kind: str, rows: list[dict],
+              similar: list[bool] | None = None) -> list[int] | None:
+        table = TABLES[kind]
+        ids = list(db.scalars(insert(table).returning(table.id, sort_by_parameter_order=True),
+                              rows))
+        db.commit()
+        with self._lock:
+            self.written_rows += len(rows)
+        return ids
+
+    def stats(self) -> dict:
+        return {"sink": self.name, "written_rows": self.written_rows}
+
+
+# ── Segment files ─────────────────────────────────────────────
+
+def segment_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _segment_kind(path: str) -> str:
+    return segment_name(path).split("-", 1)[0]
+
+
+def _segment_pid(path: str) -> int:
+    return int(segment_name(path).split("-")[2])
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_segment(path: str) -> np.ndarray:
+    """Memory-maps the complete records of a segment (a torn tail is ignored)."""
+    with open(path, "rb") as f:
+        magic, version, record_size, kind = _HEADER.unpack(f.read(_HEADER.size))
+    kind = kind.rstrip(b"\0").decode()
+    if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION or kind not in RECORD_DTYPES:
+        raise ValueError(f"{path} is not a v{SEGMENT_VERSION} prediction segment")
+    dtype = RECORD_DTYPES[kind]
+    if record_size != dtype.itemsize:
+        raise ValueError(f"{path}: record size {record_size} != {dtype.itemsize}")
+    n = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if n <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(n,))
+
+
+def _to_rows(kind: str, records: np.ndarray) -> list[dict]:
+    """Segment records → column dicts for the kind's prediction table."""
+    columns = {field: records[field].tolist() for field in INPUT_FIELDS[kind]}
+    for field in SEGMENT_STRING_BYTES:
+        if field in columns:
+            columns[field] = [v.decode() for v in columns[field]]
+    columns[SCORE_FIELDS[kind]] = records["score"].tolist()
+    columns["latency_ms"] = records["latency_ms"].tolist()
+    columns["model_version"] = [v.decode() for v in records["model_version"].tolist()]
+    columns["created_at"] = [datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+                             for ts in records["created_at"].tolist()]
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+class _ActiveSegment:
+    def __init__(self, path: str, kind: str):
+        self.path = path
+        self.opened_at = time.monotonic()
+        self.rows = 0
+        self.latency_sum = 0.0
+        self.score_sum = 0.0
+        self.file = open(path, "ab")
+        self.file.write(_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, RECORD_DTYPES[kind].itemsize,
+                                     kind.encode()).ljust(HEADER_SIZE, b"\0"))
+        self.file.flush()
+        self.size = HEADER_SIZE
+
+
+class SegmentLogSink(PredictionSink):
+    """Append-only local segment log + background compactor into the database."""
+
+    name = "segment"
+
+    def __init__(self, directory: str, session_factory, max_bytes: int, max_age_s: float,
+                 compact_interval_s: float, batch_rows: int, fsync: bool = False):
+        self.directory = directory
+        self._session_factory = session_factory
+        self._max_bytes = max_bytes
+        self._max_age_s = max_age_s
+        self._interval_s = compact_interval_s
+        self._batch_rows = batch_rows
+        self._fsync = fsync
+        self._sql = SqlSink()                  # rows that do not fit the fixed record
+        self._lock = threading.Lock()          # appends / rotation
+        self._compact_lock = threading.Lock()
+        self._active: dict[str, _ActiveSegment] = {}
+        self._seq = 0
+        # segment name → (rows, latency sum, score sum, sealed) for unflushed(); under _lock
+        self._segment_totals: dict[str, tuple[int, float, float, bool]] = {}
+        self._counters = {"written_rows": 0, "sealed_segments": 0, "compacted_segments": 0,
+                          "compacted_rows": 0, "skipped_segments": 0, "compaction_failures": 0}
+        self._compact_s = 0.0
+        self.last_error: str | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # ── Writes ─────────────────────────────────────────────────
+
+    def write(self, db: Session, kind: str, rows: list[dict],
+              similar: list[bool] | None = None) -> list[int] | None:
+        records = self._encode(kind, rows, similar)
+        if records is None:
+            return self._sql.write(db, kind, rows, similar)
+        data = records.tobytes()
+        with self._lock:
+            segment = self._active.get(kind) or self._open(kind)
+            segment.file.write(data)
+            segment.file.flush()
+            if self._fsync:
+                os.fsync(segment.file.fileno())
+            segment.size += len(data)
+            segment.rows += len(records)
+            segment.latency_sum += float(records["latency_ms"].sum())
+            segment.score_sum += float(records["score"].sum())
+            self._counters["written_rows"] += len(records)
+            if segment.size >= self._max_bytes:
+                self._seal(kind)
+        return None
+
+    def _encode(self, kind: str, rows: list[dict], similar: list[bool] | None) -> np.ndarray | None:
+        """Packs rows into records; None if a string does not fit its fixed-width field."""
+        records = np.zeros(len(rows), dtype=RECORD_DTYPES[kind])
+        for field in INPUT_FIELDS[kind] + ["model_version"]:
+            values = [row[field] for row in rows]
+            if field in SEGMENT_STRING_BYTES:
+                values = [v.encode() for v in values]
+                if max(map(len, values)) > SEGMENT_STRING_BYTES[field]:
+                    return None
+            records[field] = values
+        records["score"] = [row[SCORE_FIELDS[kind]] for row in rows]
+        records["latency_ms"] = [row["latency_ms"] for row in rows]
+        records["created_at"] = time.time()
+        if kind == "anomaly" and similar is not None:
+            records["similar"] = similar
+        return records
+
+    def _open(self, kind: str) -> _ActiveSegment:
+        name = f"{kind}-{int(time.time() * 1000):013d}-{os.getpid()}-{self._seq:06d}"
+        self._seq += 1
+        segment = _ActiveSegment(os.path.join(self.directory, name + ".open"), kind)
+        self._active[kind] = segment
+        return segment
+
+    def _seal(self, kind: str) -> None:
+        """Closes the active segment and hands it to the compactor. Caller holds _lock."""
+        segment = self._active.pop(kind)
+        segment.file.close()
+        if segment.rows == 0:
+            os.unlink(segment.path)
+            return
+        os.replace(segment.path, segment.path[:-len(".open")] + ".seg")
+        self._segment_totals[segment_name(segment.path)] = (
+            segment.rows, segment.latency_sum, segment.score_sum, True)
+        self._counters["sealed_segments"] += 1
+
+    def seal(self, max_age_s: float = 0.0) -> None:
+        """Seals active segments at least `max_age_s` old (all of them by default)."""
+        with self._lock:
+            for kind, segment in list(self._active.items()):
+                if time.monotonic() - segment.opened_at >= max_age_s:
+                    self._seal(kind)
+
+    def _recover(self) -> None:
+        """Seals `.open` segments whose writer is gone, dropping any torn tail record."""
+        for path in glob.glob(os.path.join(self.directory, "*.open")):
+            try:
+                pid = _segment_pid(path)
+            except (IndexError, ValueError):
+                continue
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            dtype = RECORD_DTYPES.get(_segment_kind(path))
+            size = os.path.getsize(path)
+            if dtype is None or size < HEADER_SIZE:
+                logger.warning(f"[segments] ignoring unreadable segment {path}")
+                continue
+            whole = HEADER_SIZE + (size - HEADER_SIZE) // dtype.itemsize * dtype.itemsize
+            if whole != size:
+                os.truncate(path, whole)
+            os.replace(path, path[:-len(".open")] + ".seg")
+            logger.info(f"[segments] recovered {segment_name(path)} "
+                        f"({(whole - HEADER_SIZE) // dtype.itemsize} rows)")
+
+    # ── Compaction ─────────────────────────────────────────────
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the compactor, then seals and loads everything still on disk."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=30)
+        self.seal()
+        self.compact()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            self.seal(self._max_age_s)
+            self.compact()
+
+    def compact(self) -> int:
+        """Loads every sealed segment into the database; returns rows loaded."""
+        loaded = 0
+        with self._compact_lock:
+            for path in sorted(glob.glob(os.path.join(self.directory, "*.seg"))):
+                try:
+                    loaded += self._load(path)
+                except Exception as exc:      # keep the segment; retried next tick
+                    with self._lock:
+                        self._counters["compaction_failures"] += 1
+                    self.last_error = f"{segment_name(path)}: {exc}"
+                    logger.error(f"[segments] loading {segment_name(path)} failed: {exc}")
+                    break
+        return loaded
+
+    def _load(self, path: str) -> int:
+        name, kind = segment_name(path), _segment_kind(path)
+        table = TABLES[kind]
+        t0 = time.perf_counter()
+        records = np.array(read_segment(path))             # copy: the file is deleted below
+        ids: list[int] = []
+        with self._session_factory() as db:
+            try:
+                db.add(SegmentLoad(segment=name, kind=kind, rows=len(records)))
+                db.flush()
+            except IntegrityError:
+                db.rollback()
+                os.unlink(path)
+                with self._lock:
+                    self._counters["skipped_segments"] += 1
+                logger.info(f"[segments] {name} was already loaded; removed")
+                return 0
+            for start in range(0, len(records), self._batch_rows):
+                rows = _to_rows(kind, records[start:start + self._batch_rows])
+                if kind == "anomaly":
+                    ids += db.scalars(insert(table).returning(
+                        table.id, sort_by_parameter_order=True), rows).all()
+                else:
+                    db.execute(insert(table), rows)
+            db.commit()
+        os.unlink(path)
+        with self._lock:
+            self._segment_totals.pop(name, None)
+        if kind == "anomaly" and len(records):
+            self._index_similar(records, ids)
+
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self._counters["compacted_segments"] += 1
+            self._counters["compacted_rows"] += len(records)
+            self._compact_s += elapsed
+        logger.info(f"[segments] loaded {name}: {len(records)} rows in {elapsed * 1000:.0f}ms")
+        return len(records)
+
+    @staticmethod
+    def _index_similar(records: np.ndarray, ids: list[int]) -> None:
+        from app.models.loader import get_model_loader
+        from app.similarity import get_anomaly_index
+
+        flagged = np.flatnonzero(records["similar"])
+        if not len(flagged):
+            return
+        raw = np.column_stack([records[f][flagged] for f in INPUT_FIELDS["anomaly"]])
+        index = get_anomaly_index()
+        for i, point in zip(flagged, get_model_loader().scale_anomaly(raw)):
+            index.add(ids[i], point)
+
+    # ── Reads ──────────────────────────────────────────────────
+
+    def _segment_paths(self) -> list[str]:
+        return (glob.glob(os.path.join(self.directory, "*.open"))
+                + glob.glob(os.path.join(self.directory, "*.seg")))
+
+    def _totals(self, path: str) -> tuple[int, float, float]:
+        """
+        (rows, latency sum, score sum) of a segment this process is not
+        appending to. Only records past the cached count are read: a segment
+        only grows until it is sealed, and sealing keeps every whole record.
+        """
+        name = segment_name(path)
+        with self._lock:
+            rows, latency, score, sealed = self._segment_totals.get(name, (0, 0.0, 0.0, False))
+        if sealed:
+            return rows, latency, score
+        records = read_segment(path)[rows:]
+        rows += len(records)
+        latency += float(records["latency_ms"].sum())
+        score += float(records["score"].sum())
+        with self._lock:
+            self._segment_totals[name] = (rows, latency, score, path.endswith(".seg"))
+        return rows, latency, score
+
+    def unflushed(self) -> dict[str, tuple[int, float, float]]:
+        paths = {segment_name(p): p for p in self._segment_paths()}
+        with self._lock:
+            active = {segment_name(s.path): (s.rows, s.latency_sum, s.score_sum)
+                      for s in self._active.values()}
+            # Segments loaded (and deleted) by another process are never popped in _load()
+            for name in [n for n in self._segment_totals if n not in paths]:
+                del self._segment_totals[name]
+        if not paths:
+            return {}
+        # Committed but not yet deleted: already counted by the table aggregates. Asked of
+        # the primary: a lagging replica would not know the segment was loaded yet.
+        with self._session_factory() as db:
+            loaded = set(db.scalars(select(SegmentLoad.segment).where(
+                SegmentLoad.segment.in_(list(paths)))))
+        out: dict[str, list] = {}
+        for name, path in paths.items():
+            if name in loaded:
+                continue
+            try:
+                rows, latency, score = active.get(name) or self._totals(path)
+            except (OSError, ValueError):
+                continue                       # sealed / loaded / removed meanwhile
+            acc = out.setdefault(_segment_kind(path), [0, 0.0, 0.0])
+            acc[0] += rows
+            acc[1] += latency
+            acc[2] += score
+        return {kind: tuple(acc) for kind, acc in out.items()}
+
+    def stats(self) -> dict:
+        paths = self._segment_paths()
+        with self._lock:
+            counters = dict(self._counters)
+            compact_s = self._compact_s
+        return {
+            "sink": self.name,
+            "directory": self.directory,
+            "open_segments": sum(p.endswith(".open") for p in paths),
+            "sealed_segments_pending": sum(p.endswith(".seg") for p in paths),
+            "segment_bytes": sum(os.path.getsize(p) for p in paths if os.path.exists(p)),
+            **counters,
+            "sql_fallback_rows": self._sql.written_rows,
+            "compaction_rows_per_s": (round(counters["compacted_rows"] / compact_s, 1)
+                                      if compact_s else 0.0),
+            "last_error": self.last_error,
+        }
+
+
+# ── Module-level singleton ─────────────────────────────────────
+_default_sink = SqlSink()
+_prediction_sink: PredictionSink | None = None
+
+
+def get_prediction_sink() -> PredictionSink:
+    """The configured sink; the SQL sink until start_prediction_sink() has run."""
+    return _prediction_sink or _default_sink
+
+
+def start_prediction_sink(session_factory) -> None:
+    """Startup hook: builds the PREDICTION_SINK sink and starts its compactor."""
+    global _prediction_sink
+    if settings.PREDICTION_SINK == "segment":
+        _prediction_sink = SegmentLogSink(
+            settings.PREDICTION_SEGMENT_DIR, session_factory,
+            max_bytes=settings.PREDICTION_SEGMENT_MAX_BYTES,
+            max_age_s=settings.PREDICTION_SEGMENT_MAX_AGE_S,
+            compact_interval_s=settings.PREDICTION_COMPACT_INTERVAL_S,
+            batch_rows=settings.PREDICTION_COMPACT_BATCH_ROWS,
+            fsync=settings.PREDICTION_SEGMENT_FSYNC,
+        )
+        logger.info(f"Prediction sink: segment log in {settings.PREDICTION_SEGMENT_DIR}")
+    elif settings.PREDICTION_SINK == "sql":
+        _prediction_sink = _default_sink
+    else:
+        raise ValueError(f"Unknown PREDICTION_SINK: {settings.PREDICTION_SINK}")
+    _prediction_sink.start()
+
+
+def stop_prediction_sink() -> None:
+    """Shutdown hook: flushes a segment log into the database."""
+    global _prediction_sink
+    if _prediction_sink is not None:
+        _prediction_sink.stop()
+        _prediction_sink = None
+
+
+def write_predictions(db: Session, kind: str, rows: list[dict],
+                      similar: list[bool] | None = None) -> list[int] | None:
+    """Route hook: persists scored rows through the configured sink."""
+    return get_prediction_sink().write(db, kind, rows, similar)
@@ -0,0 +1,285 @@
+"""
+app/worker.py
+──────────────
+Queue consumer for asynchronous scoring: producers enqueue jobs (see
+app/queues.py) instead of waiting on POST /v1/{kind}/predict.
+
+    python -m app.worker --queue redis://localhost:6379/0 --concurrency 4
+    python -m app.worker --queue sqlite:///app/db/queue.db --drain
+
+Each consumer (one process per `--concurrency`) loops:
+
+  1. fetch up to `--prefetch` messages from the backend;
+  2. for every `--batch-size` slice: validate the payloads with the
+     predict-route schemas, drop jobs whose job_id is already recorded in
+     scoring_jobs, score the rest per kind with one vectorised ModelLoader
+     call (app/scoring.py), and in ONE transaction bulk-insert the
+     predictions and their scoring_jobs rows;
+  3. acknowledge the whole slice with one call after the commit.
+
+Delivery is at-least-once: a crash between commit and ack redelivers the
+slice, and the job_id primary key turns the replay into a no-op. Invalid
+payloads are recorded with status "invalid" and acknowledged, so they are
+never retried. A slice that fails to persist is left unacknowledged and
+comes back after QUEUE_VISIBILITY_TIMEOUT_S.
+
+Every consumer writes its counters and throughput to WORKER_STATS_DIR;
+GET /v1/metrics/queue merges them with the backend's consumer lag.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.db.models import ScoringJob
+from app.models.loader import ModelLoader, get_model_loader
+from app.queues import QueueBackend, open_queue, write_consumer_stats
+from app.scoring import (
+    KINDS, TABLES, RecordError, prediction_rows, score_block, validate_record,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringWorker:
+    """One consumer: fetch → score → persist → ack, in batches."""
+
+    def __init__(self, backend: QueueBackend, session_factory, loader: ModelLoader,
+                 batch_size: int, prefetch: int, consumer: str, stats_dir: str = ""):
+        self.backend = backend
+        self.session_factory = session_factory
+        self.loader = loader
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.consumer = consumer
+        self.stats_dir = stats_dir
+        self.counters = {"messages": 0, "scored": 0, "invalid": 0, "duplicates": 0,
+                         "batches": 0, "failed_batches": 0}
+        self.started_at = time.time()
+        self._rate_mark = (time.monotonic(), 0)
+        self.recent_rows_per_s = 0.0
+
+    # ── Loop ──────────────────────────────────────────────────
+
+    def run(self, stop: threading.Event, drain: bool = False) -> dict:
+        """Consumes until `stop` is set (or, with `drain`, the queue is empty)."""
+        last_stats = 0.0
+        while not stop.is_set():
+            messages = self.backend.fetch(self.prefetch, block_ms=1000)
+            for i in range(0, len(messages), self.batch_size):
+                self.process(messages[i:i + self.batch_size])
+            if time.monotonic() - last_stats >= settings.WORKER_STATS_INTERVAL_S:
+                self.write_stats()
+                last_stats = time.monotonic()
+            if drain and not messages:
+                break
+        self.write_stats()
+        return self.stats()
+
+    def process(self, messages: list[tuple[str, dict]]) -> bool:
+        """Persists and acks one batch; returns False if it was left for redelivery."""
+        if not messages:
+            return True
+        jobs = [self._parse(msg_id, job) for msg_id, job in messages]
+        outcome = error = None
+        for _ in range(2):
+            try:
+                outcome = self._persist(jobs)
+                break
+            except IntegrityError as exc:
+                # A concurrent redelivery committed some of these job_ids first:
+                # the retry sees them as duplicates.
+                error = exc
+            except Exception as exc:
+                error = exc
+                break
+        if outcome is None:
+            self.counters["failed_batches"] += 1
+            logger.error(f"[worker] batch of {len(messages)} not persisted, "
+                         f"left for redelivery: {error}")
+            return False
+        self.backend.ack([msg_id for msg_id, _ in messages])
+        self.counters["messages"] += len(messages)
+        self.counters["batches"] += 1
+        for name, n in outcome.items():
+            self.counters[name] += n
+        return True
+
+    # ── Batch ─────────────────────────────────────────────────
+
+    def _parse(self, msg_id: str, job) -> dict:
+        """{job_id, kind, row | error} for one message."""
+        job = job if isinstance(job, dict) else {}
+        job_id = str(job.get("job_id") or f"{self.backend.name}:{msg_id}")[:128]
+        kind = job.get("kind")
+        if kind not in KINDS:
+            return {"job_id": job_id, "kind": str(kind)[:20], "error": f"unknown kind {kind!r}"}
+        try:
+            row = validate_record(kind, job.get("payload") or {})
+        except RecordError as exc:
+            return {"job_id": job_id, "kind": kind, "error": str(exc)}
+        return {"job_id": job_id, "kind": kind, "row": row}
+
+    def _persist(self, jobs: list[dict]) -> dict:
+        outcome = {"scored": 0, "invalid": 0, "duplicates": 0}
+        with self.session_factory() as db:
+            known = set(db.scalars(select(ScoringJob.job_id).where(
+                ScoringJob.job_id.in_({j["job_id"] for j in jobs}))))
+            fresh = []
+            for job in jobs:
+                if job["job_id"] in known:
+                    outcome["duplicates"] += 1
+                else:
+                    known.add(job["job_id"])        # repeated within the batch, too
+                    fresh.append(job)
+
+            job_rows = [{"job_id": j["job_id"], "kind": j["kind"], "status": "invalid",
+                         "error": j["error"]} for j in fresh if "error" in j]
+            for kind in KINDS:
+                batch = [j for j in fresh if j["kind"] == kind and "row" in j]
+                if not batch:
+                    continue
+                t0 = time.perf_counter()
+                scores, model_version = score_block(self.loader, kind, [j["row"] for j in batch])
+                latency_ms = (time.perf_counter() - t0) * 1000 / len(batch)
+                table = TABLES[kind]
+                ids = db.scalars(
+                    insert(table).returning(table.id, sort_by_parameter_order=True),
+                    prediction_rows(kind, [j["row"] for j in batch], scores, model_version,
+                                    latency_ms),
+                ).all()
+                job_rows.extend(
+                    {"job_id": j["job_id"], "kind": kind, "status": "scored",
+                     "prediction_id": pid, "score": float(s), "model_version": model_version}
+                    for j, pid, s in zip(batch, ids, scores)
+                )
+            if job_rows:
+                db.execute(insert(ScoringJob), _uniform(job_rows))
+            db.commit()
+        outcome["scored"] = sum(1 for r in job_rows if r["status"] == "scored")
+        outcome["invalid"] = len(job_rows) - outcome["scored"]
+        return outcome
+
+    # ── Stats ─────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        mark_t, mark_n = self._rate_mark
+        if now - mark_t >= 1.0:
+            self.recent_rows_per_s = (self.counters["messages"] - mark_n) / (now - mark_t)
+            self._rate_mark = (now, self.counters["messages"])
+        elapsed = time.time() - self.started_at
+        return {
+            "consumer": self.consumer,
+            "pid": os.getpid(),
+            **self.counters,
+            "rows_per_s": round(self.counters["messages"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "recent_rows_per_s": round(self.recent_rows_per_s, 1),
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+        }
+
+    def write_stats(self) -> None:
+        """Persists this consumer's stats for GET /v1/metrics/queue."""
+        if self.stats_dir:
+            write_consumer_stats(self.stats_dir, self.consumer, self.stats())
+
+
+def _uniform(rows: list[dict]) -> list[dict]:
+    """Gives every row the same keys so the INSERT stays a single executemany."""
+    keys = ("job_id", "kind", "status", "prediction_id", "score", "model_version", "error")
+    return [{k: r.get(k) for k in keys} for r in rows]
+
+
+# ── Processes ─────────────────────────────────────────────────
+
+def _consumer_main(queue_url: str, consumer: str, batch_size: int, prefetch: int,
+                   drain: bool, stop) -> None:
+    """Entry point of one consumer process."""
+    from app.db.session import SessionLocal, engine
+    engine.dispose(close=False)             # never share the parent's pooled connections
+    signal.signal(signal.SIGINT, signal.SIG_IGN)       # the parent decides when to stop
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    backend = open_queue(queue_url, consumer)
+    worker = ScoringWorker(backend, SessionLocal, get_model_loader(), batch_size, prefetch,
+                           consumer, settings.WORKER_STATS_DIR)
+    try:
+        summary = worker.run(stop, drain=drain)
+    finally:
+        backend.close()
+    logger.info(f"[worker] {consumer} stopped: {summary['messages']} messages, "
+                f"{summary['scored']} scored, {summary['duplicates']} duplicates, "
+                f"{summary['invalid']} invalid")
+
+
+def run(queue_url: str, concurrency: int = 1, batch_size: int = 256, prefetch: int = 512,
+        drain: bool = False) -> None:
+    """Starts `concurrency` consumer processes and waits for them."""
+    from app.db.init_db import init_db
+    init_db()
+    base = f"{socket.gethostname()}-{os.getpid()}"
+    stop = multiprocessing.Event()
+    consumers = [
+        multiprocessing.Process(
+            target=_consumer_main, name=f"scoring-worker-{i}",
+            args=(queue_url, f"{base}-{i}", batch_size, prefetch, drain, stop))
+        for i in range(concurrency)
+    ]
+    previous = {sig: signal.signal(sig, lambda *_: stop.set())
+                for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        for proc in consumers:
+            proc.start()
+        logger.info(f"[worker] {concurrency} consumer(s) on {queue_url.split('@')[-1]} "
+                    f"batch={batch_size} prefetch={prefetch}")
+        for proc in consumers:
+            proc.join()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    failed = [p.name for p in consumers if p.exitcode]
+    if failed:
+        raise RuntimeError(f"Consumer(s) exited with an error: {', '.join(failed)}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.worker",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queue", default=settings.QUEUE_URL,
+                        help="redis://… or sqlite:///… (default: QUEUE_URL)")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY,
+                        help="Consumer processes")
+    parser.add_argument("--batch-size", type=int, default=settings.WORKER_BATCH_SIZE,
+                        help="Messages scored, persisted and acked together")
+    parser.add_argument("--prefetch", type=int, default=settings.WORKER_PREFETCH,
+                        help="Messages fetched from the queue per read")
+    parser.add_argument("--drain", action="store_true",
+                        help="Exit once the queue is empty instead of waiting for more")
+    args = parser.parse_args(argv)
+    if not args.queue:
+        parser.error("no queue given: pass --queue or set QUEUE_URL")
+    if min(args.concurrency, args.batch_size, args.prefetch) < 1:
+        parser.error("--concurrency, --batch-size and --prefetch must be >= 1")
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    try:
+        open_queue(args.queue).close()           # fail fast on a bad URL / missing driver
+        run(args.queue, args.concurrency, args.batch_size, args.prefetch, args.drain)
+    except (ValueError, RuntimeError) as exc:
+        parser.error(str(exc))
+
+
+if __name__ == "__main__":
+    main()
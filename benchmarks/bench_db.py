@@ -0,0 +1,155 @@
+"""
+benchmarks/bench_db.py
+───────────────────────
+How persistence and the /v1/metrics aggregates scale with table size, on
+a file-backed SQLite database seeded with synthetic predictions.
+
+The tables are grown step by step to each size in `--sizes` (both fraud
+and anomaly get that many rows); at every step it measures:
+
+  - seed:            bulk executemany INSERT throughput while growing
+  - insert:          one prediction per session + commit through the SQL
+                     sink, as the single-item routes write (p50 / p95 / p99)
+  - insert_batch:    100 predictions per commit, as the batch routes write
+  - segment_write:   the same single-row write through the segment-log sink
+  - segment_compact: bulk-loading those segment rows into the table
+  - metrics:         the GET /v1/metrics handler (two full-table
+                     aggregates) against a fresh session
+
+    python -m benchmarks.bench_db
+    python -m benchmarks.bench_db --sizes 10000,1000000,5000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_inference import COUNTRIES, DEVICES, MERCHANTS
+from benchmarks.common import latency_results, print_results, result, time_calls
+
+SUITE = "db"
+SIZES = [10_000, 100_000, 1_000_000]
+QUICK_SIZES = [1_000, 10_000]
+SEED_CHUNK = 20_000
+BATCH_ROWS = 100
+
+
+def _fraud_chunk(rng, n: int) -> list[dict]:
+    return [{"transaction_amount": float(a), "merchant_type": MERCHANTS[m], "country": COUNTRIES[c],
+             "time_delta": float(t), "device_type": DEVICES[d], "fraud_probability": float(p),
+             "model_version": "fraud-v1.0.0", "latency_ms": float(ms)}
+            for a, m, c, t, d, p, ms in zip(
+                rng.exponential(500, n), rng.integers(0, 5, n), rng.integers(0, 7, n),
+                rng.exponential(24, n), rng.integers(0, 3, n), rng.uniform(0, 1, n),
+                rng.exponential(2, n))]
+
+
+def _anomaly_chunk(rng, n: int) -> list[dict]:
+    return [{"response_time": float(r), "error_rate": float(e), "cpu_usage": float(c),
+             "memory_usage": float(m), "anomaly_score": float(s),
+             "model_version": "anomaly-v1.0.0", "latency_ms": float(ms)}
+            for r, e, c, m, s, ms in zip(
+                rng.exponential(150, n), rng.uniform(0, 1, n), rng.uniform(0, 100, n),
+                rng.uniform(0, 100, n), rng.uniform(0, 1, n), rng.exponential(2, n))]
+
+
+def _seed(engine, rng, n: int) -> float:
+    """Inserts n rows into each prediction table; returns rows/s over both."""
+    from sqlalchemy import insert
+
+    from app.db.models import AnomalyPrediction, FraudPrediction
+
+    t0 = time.perf_counter()
+    done = 0
+    while done < n:
+        step = min(SEED_CHUNK, n - done)
+        with engine.begin() as conn:
+            conn.execute(insert(FraudPrediction), _fraud_chunk(rng, step))
+            conn.execute(insert(AnomalyPrediction), _anomaly_chunk(rng, step))
+        done += step
+    return 2 * n / (time.perf_counter() - t0)
+
+
+def run(quick: bool = False, sizes: list[int] | None = None) -> list[dict]:
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.models import AnomalyPrediction, Base
+    from app.db.session import make_engine
+    from app.routers.metrics import get_metrics
+    from app.sinks import SegmentLogSink, SqlSink
+
+    sizes = sorted(sizes or (QUICK_SIZES if quick else SIZES))
+    repeats = 50 if quick else 200
+    rng = np.random.default_rng(42)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-db-") as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'scaling.db')}"
+        engine, _ = make_engine("bench", url, pool_size=5, max_overflow=0, pool_timeout_s=30)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        sql_sink = SqlSink()
+        segment_sink = SegmentLogSink(os.path.join(workdir, "segments"), Session,
+                                      max_bytes=64 * 1024 * 1024, max_age_s=3600,
+                                      compact_interval_s=3600, batch_rows=SEED_CHUNK)
+        rows = 0
+        try:
+            for size in sizes:
+                if size > rows:
+                    rate = _seed(engine, rng, size - rows)
+                    results.append(result(SUITE, f"seed.rows_{size}", "rows_per_s", rate,
+                                          "rows/s", True, rows=size))
+                    rows = size
+                params = {"rows": size}
+                one = _fraud_chunk(rng, 1)[0]
+                batch = _anomaly_chunk(rng, BATCH_ROWS)
+
+                def insert_one():
+                    with Session() as db:
+                        sql_sink.write(db, "fraud", [one])
+
+                def segment_write():
+                    segment_sink.write(None, "fraud", [one])
+
+                def insert_batch():
+                    with Session() as db:
+                        db.add_all([AnomalyPrediction(**r) for r in batch])
+                        db.commit()
+
+                def metrics():
+                    with Session() as db:
+                        get_metrics(db)
+
+                results += latency_results(SUITE, f"insert.rows_{size}",
+                                           time_calls(insert_one, repeats), **params)
+                batch_ms = float(np.median(time_calls(insert_batch, max(5, repeats // 10))))
+                results.append(result(SUITE, f"insert_batch.rows_{size}", "rows_per_s",
+                                      BATCH_ROWS / batch_ms * 1000, "rows/s", True, **params))
+                results += latency_results(SUITE, f"segment_write.rows_{size}",
+                                           time_calls(segment_write, 10 * repeats), **params)
+                t0 = time.perf_counter()
+                segment_sink.seal()
+                loaded = segment_sink.compact()
+                results.append(result(SUITE, f"segment_compact.rows_{size}", "rows_per_s",
+                                      loaded / (time.perf_counter() - t0), "rows/s", True,
+                                      **params))
+                metrics_ms = time_calls(metrics, 5 if size >= 1_000_000 else 20)
+                results.append(result(SUITE, f"metrics.rows_{size}", "p50_ms",
+                                      float(np.median(metrics_ms)), "ms", False, **params))
+        finally:
+            engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_db",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="Comma-separated rows per table")
+    args = parser.parse_args(argv)
+    print_results(run(sizes=[int(s) for s in args.sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+benchmarks/bench_explain.py
+────────────────────────────
+Overhead of explain mode over plain scoring, per model and batch size.
+
+    python -m benchmarks.bench_explain
+"""
+import time
+
+import numpy as np
+
+from app.models.loader import get_model_loader
+from benchmarks.common import result
+
+SUITE = "explain"
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+REPEATS = 20
+
+
+def _time(fn, repeats: int = REPEATS) -> float:
+    fn()                                             # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats * 1000
+
+
+def measure(batch_sizes: list[int] = BATCH_SIZES, repeats: int = REPEATS):
+    """Yields (model, batch, score ms, score + explain ms)."""
+    loader = get_model_loader()
+    rng = np.random.default_rng(42)
+    for n in batch_sizes:
+        Xf = np.array([
+            loader.encode_fraud(float(amount), "electronics", "US", float(td), "mobile")
+            for amount, td in zip(rng.exponential(500, n), rng.exponential(24, n))
+        ], dtype=float)
+        plain = _time(lambda: loader.score_fraud(Xf), repeats)
+        both = _time(lambda: (loader.score_fraud(Xf), loader.explain_fraud(Xf)), repeats)
+        yield "fraud", n, plain, both
+
+        Xa = np.column_stack([rng.normal(120, 200, n), rng.uniform(0, 1, n),
+                              rng.uniform(0, 100, n), rng.uniform(0, 100, n)])
+        plain = _time(lambda: loader.score_anomaly(Xa), repeats)
+        both = _time(lambda: loader.explain_anomaly(Xa), repeats)      # score + attributions
+        yield "anomaly", n, plain, both
+
+
+def run(quick: bool = False) -> list[dict]:
+    results = []
+    for model, n, plain, both in measure(BATCH_SIZES, 5 if quick else REPEATS):
+        results.append(result(SUITE, f"{model}.batch_{n}", "explain_ms", both, "ms", False,
+                              batch=n, score_ms=round(plain, 4)))
+    return results
+
+
+def main() -> None:
+    print(f"{'model':>8} | {'batch':>6} | {'score ms':>9} | {'+explain ms':>11} | {'overhead':>8}")
+    print("-" * 56)
+    for model, n, plain, both in measure():
+        print(f"{model:>8} | {n:>6} | {plain:>9.3f} | {both:>11.3f} | "
+              f"{(both - plain) / plain:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+benchmarks/bench_feature_store.py
+──────────────────────────────────
+Per-request cost of VelocityFeatureStore.observe as the number of tracked
+entities grows. The cost should stay flat (amortised O(1)).
+
+    python -m benchmarks.bench_feature_store
+"""
+import random
+import time
+
+from app.feature_store import VelocityFeatureStore
+from benchmarks.common import result
+
+SUITE = "feature_store"
+ENTITY_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+OPS = 200_000
+COUNTRIES = ["US", "UK", "DE", "FR", "CN", "NG", "RU"]
+
+
+def bench(n_entities: int, ops: int = OPS) -> float:
+    """Returns mean nanoseconds per observe() with `n_entities` live entities."""
+    rng = random.Random(42)
+    store = VelocityFeatureStore(max_entities=n_entities, max_events_per_entity=256,
+                                 ttl_s=86_400.0)
+    ts = 1_000_000.0
+    for i in range(n_entities):                      # pre-populate
+        store.observe(f"e{i}", 10.0, "US", ts=ts)
+
+    ids = [f"e{rng.randrange(n_entities)}" for _ in range(ops)]
+    amounts = [rng.expovariate(1 / 500) for _ in range(ops)]
+    countries = [rng.choice(COUNTRIES) for _ in range(ops)]
+
+    t0 = time.perf_counter()
+    for i in range(ops):
+        ts += 0.01
+        store.observe(ids[i], amounts[i], countries[i], ts=ts)
+    return (time.perf_counter() - t0) / ops * 1e9
+
+
+def run(quick: bool = False) -> list[dict]:
+    counts, ops = (ENTITY_COUNTS[:2], OPS // 10) if quick else (ENTITY_COUNTS, OPS)
+    return [result(SUITE, f"observe.entities_{n}", "ns_per_op", bench(n, ops), "ns", False,
+                   entities=n, ops=ops) for n in counts]
+
+
+def main() -> None:
+    print(f"{'entities':>10} | {'ns / observe':>12}")
+    print("-" * 26)
+    for n in ENTITY_COUNTS:
+        print(f"{n:>10} | {bench(n):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+benchmarks/bench_inference.py
+──────────────────────────────
+ModelLoader inference cost per model:
+
+  - predict:    single-row predict_fraud / predict_anomaly latency
+                (p50 / p95 / p99) — the path the single-item routes take.
+  - vectorised: encode + score_fraud / score_anomaly over an (n, k) matrix
+                for n = 1 … 10,000 — the path the batch routes, the worker
+                and the backfill take.
+
+    python -m benchmarks.bench_inference
+"""
+import itertools
+import time
+
+import numpy as np
+
+from benchmarks.common import latency_results, print_results, result, time_calls
+
+SUITE = "inference"
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+SINGLE_ROWS = 256            # distinct inputs cycled through by the single-row benchmark
+MERCHANTS = ["retail", "electronics", "travel", "grocery", "gambling"]
+COUNTRIES = ["US", "UK", "DE", "FR", "CN", "NG", "RU"]
+DEVICES = ["mobile", "desktop", "tablet"]
+
+
+def fraud_rows(n: int, seed: int = 42) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    return [{"transaction_amount": float(a), "merchant_type": MERCHANTS[m], "country": COUNTRIES[c],
+             "time_delta": float(t), "device_type": DEVICES[d]}
+            for a, m, c, t, d in zip(rng.exponential(500, n) + 1, rng.integers(0, 5, n),
+                                     rng.integers(0, 7, n), rng.exponential(24, n),
+                                     rng.integers(0, 3, n))]
+
+
+def anomaly_rows(n: int, seed: int = 42) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    return [{"response_time": float(r), "error_rate": float(e), "cpu_usage": float(c),
+             "memory_usage": float(m)}
+            for r, e, c, m in zip(np.abs(rng.normal(120, 200, n)) + 1, rng.uniform(0, 1, n),
+                                  rng.uniform(0, 100, n), rng.uniform(0, 100, n))]
+
+
+def _repeats(fn, budget_s: float) -> int:
+    """Repeats that fit in ~budget_s, from one calibration call (clamped to 5..200)."""
+    t0 = time.perf_counter()
+    fn()
+    return int(min(200, max(5, budget_s / max(time.perf_counter() - t0, 1e-6))))
+
+
+def run(quick: bool = False) -> list[dict]:
+    from app.models.loader import get_model_loader
+
+    loader = get_model_loader()
+    budget_s = 0.5 if quick else 3.0
+    results = []
+
+    for name, rows, predict in (
+        ("fraud.predict", fraud_rows(SINGLE_ROWS), loader.predict_fraud),
+        ("anomaly.predict", anomaly_rows(SINGLE_ROWS), loader.predict_anomaly),
+    ):
+        inputs = itertools.cycle(rows)
+
+        def call():
+            predict(**next(inputs))
+
+        samples = time_calls(call, _repeats(call, budget_s))
+        results += latency_results(SUITE, name, samples, batch=1)
+        results.append(result(SUITE, name, "rows_per_s", 1000 / float(np.median(samples)),
+                              "rows/s", True, batch=1))
+
+    for n in BATCH_SIZES:
+        fraud, anomaly = fraud_rows(n), anomaly_rows(n)
+        X = np.array([[r["response_time"], r["error_rate"], r["cpu_usage"], r["memory_usage"]]
+                      for r in anomaly])
+        for name, fn in (
+            ("fraud.vectorised",
+             lambda: loader.score_fraud(np.array([loader.encode_fraud(**r) for r in fraud]))),
+            ("anomaly.vectorised", lambda: loader.score_anomaly(X)),
+        ):
+            ms = float(np.median(time_calls(fn, _repeats(fn, budget_s), warmup=0)))
+            results.append(result(SUITE, f"{name}.batch_{n}", "ms", ms, "ms", False, batch=n))
+            results.append(result(SUITE, f"{name}.batch_{n}", "rows_per_s", n / ms * 1000,
+                                  "rows/s", True, batch=n))
+    return results
+
+
+def main() -> None:
+    print_results(run())
+
+
+if __name__ == "__main__":
+    main()
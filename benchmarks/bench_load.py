@@ -0,0 +1,121 @@
+"""
+benchmarks/bench_load.py
+─────────────────────────
+In-process load generator: drives the full ASGI app (middleware, admission
+control, validation, routers, DB writes) through httpx's ASGI transport, so
+the numbers include everything but the network and the server loop.
+
+For each route, `concurrency` client tasks send `requests` requests in
+total; reported per route are throughput, p50 / p95 / p99 latency and the
+share of non-2xx responses (e.g. requests shed by admission control).
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --concurrency 32 --requests 2000 --routes fraud,metrics
+
+Writes go to a throwaway SQLite database (see common.isolate_app_state).
+"""
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_inference import anomaly_rows, fraud_rows
+from benchmarks.common import isolate_app_state, latency_results, print_results, result
+
+SUITE = "load"
+BATCH_ITEMS = 100
+ROUTES = ["fraud", "fraud_batch", "anomaly", "anomaly_batch", "metrics", "health"]
+
+
+def _routes() -> dict[str, tuple[str, str, list]]:
+    """name → (method, path, request bodies cycled through)."""
+    fraud = fraud_rows(512)
+    anomaly = anomaly_rows(512)
+    return {
+        "fraud": ("POST", "/v1/fraud/predict", fraud),
+        "fraud_batch": ("POST", "/v1/fraud/predict-batch",
+                        [{"items": fraud[i:i + BATCH_ITEMS]} for i in range(0, 512, BATCH_ITEMS)]),
+        "anomaly": ("POST", "/v1/anomaly/predict", anomaly),
+        "anomaly_batch": ("POST", "/v1/anomaly/predict-batch",
+                          [{"items": anomaly[i:i + BATCH_ITEMS]}
+                           for i in range(0, 512, BATCH_ITEMS)]),
+        "metrics": ("GET", "/v1/metrics", [None]),
+        "health": ("GET", "/health", [None]),
+    }
+
+
+async def _drive(client, method: str, path: str, bodies: list, requests: int,
+                 concurrency: int) -> tuple[np.ndarray, int, float]:
+    """Returns (per-request latency ms, non-2xx count, wall seconds)."""
+    latencies = np.empty(requests)
+    errors = 0
+    slots = iter(range(requests))
+    payloads = itertools.cycle(bodies)
+
+    async def worker():
+        nonlocal errors
+        for i in slots:
+            body = next(payloads)
+            t0 = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies[i] = (time.perf_counter() - t0) * 1000
+            if not 200 <= response.status_code < 300:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - t0
+
+
+async def _run(routes: list[str], requests: int, concurrency: int) -> list[dict]:
+    import httpx
+    from app.main import app
+
+    specs = _routes()
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in routes:
+                method, path, bodies = specs[name]
+                await _drive(client, method, path, bodies, min(requests, 20), 1)    # warm-up
+                latencies, errors, wall_s = await _drive(client, method, path, bodies,
+                                                         requests, concurrency)
+                params = {"route": f"{method} {path}", "concurrency": concurrency,
+                          "requests": requests}
+                results.append(result(SUITE, name, "req_per_s", requests / wall_s, "req/s",
+                                      True, **params))
+                results += latency_results(SUITE, name, latencies, **params)
+                results.append(result(SUITE, name, "error_rate", errors / requests, "ratio",
+                                      False, **params))
+    return results
+
+
+def run(quick: bool = False, routes: list[str] | None = None, requests: int | None = None,
+        concurrency: int = 8) -> list[dict]:
+    routes = routes or ROUTES
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        raise ValueError(f"Unknown routes: {sorted(unknown)} (choose from {ROUTES})")
+    requests = requests or (100 if quick else 1_000)
+    return asyncio.run(_run(routes, requests, concurrency))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_load",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client tasks")
+    parser.add_argument("--requests", type=int, default=1_000, help="Requests per route")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated routes")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as workdir:
+        isolate_app_state(workdir)
+        print_results(run(routes=args.routes.split(","), requests=args.requests,
+                          concurrency=args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
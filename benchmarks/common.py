@@ -0,0 +1,130 @@
+"""
+benchmarks/common.py
+─────────────────────
+Shared helpers for the benchmark suite: timing, percentiles, result
+records and the machine metadata written next to every result file.
+
+A result is one number:
+
+    {"suite": "inference", "name": "fraud.score.batch_1000", "metric": "rows_per_s",
+     "value": 812345.6, "unit": "rows/s", "higher_is_better": true, "params": {...}}
+
+`suite.name.metric` is the key benchmarks.compare matches on.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+import numpy as np
+
+RESULTS_VERSION = 1
+
+
+def result(suite: str, name: str, metric: str, value: float, unit: str,
+           higher_is_better: bool, **params) -> dict:
+    return {"suite": suite, "name": name, "metric": metric, "value": round(float(value), 4),
+            "unit": unit, "higher_is_better": higher_is_better, "params": params}
+
+
+def time_calls(fn, repeats: int, warmup: int = 1) -> np.ndarray:
+    """Per-call wall time in ms for `repeats` calls of fn() after `warmup` calls."""
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeats)
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = (time.perf_counter() - t0) * 1000
+    return samples
+
+
+def latency_results(suite: str, name: str, samples_ms, **params) -> list[dict]:
+    """p50 / p95 / p99 latency records for a set of samples in ms."""
+    p50, p95, p99 = np.percentile(np.asarray(samples_ms, dtype=float), [50, 95, 99])
+    return [result(suite, name, f"p{q}_ms", v, "ms", False, **params)
+            for q, v in (("50", p50), ("95", p95), ("99", p99))]
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5, check=True).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_metadata() -> dict:
+    versions = {}
+    for package in ("numpy", "scikit-learn", "sqlalchemy", "fastapi", "pydantic"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def write_results(path: str, results: list[dict], options: dict) -> dict:
+    doc = {"version": RESULTS_VERSION, "metadata": machine_metadata(), "options": options,
+           "results": results}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+    return doc
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        doc = json.load(f)
+    if not isinstance(doc, dict) or "results" not in doc:
+        raise ValueError(f"{path} is not a benchmark result file")
+    return doc
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'suite':>10} | {'benchmark':<40} | {'metric':>12} | {'value':>14} {'unit'}")
+    print("-" * 96)
+    for r in results:
+        print(f"{r['suite']:>10} | {r['name']:<40} | {r['metric']:>12} | "
+              f"{r['value']:>14,.3f} {r['unit']}")
+
+
+def isolate_app_state(workdir: str) -> None:
+    """
+    Points the app's database and on-disk state at `workdir` (or disables
+    it), so a benchmark run never touches app/db. Settings are read once at
+    import, so this must run before anything under `app` is imported.
+    """
+    if "app.config" in sys.modules:
+        raise RuntimeError("isolate_app_state() must run before the app is imported")
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    for key in ("FEATURE_STORE_SNAPSHOT_PATH", "DRIFT_STATE_DIR", "SIMILARITY_INDEX_PATH",
+                "MODEL_REGISTRY_USAGE_PATH", "WORKER_STATS_DIR", "QUEUE_URL",
+                "DATABASE_REPLICA_URL"):
+        os.environ[key] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")        # no per-request log lines
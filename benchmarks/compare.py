@@ -0,0 +1,99 @@
+"""
+benchmarks/compare.py
+──────────────────────
+Compares a benchmark result file against a stored baseline and exits
+non-zero when any metric regressed by more than the tolerance.
+
+    python -m benchmarks.compare benchmarks/baseline.json benchmarks/results/latest.json
+    python -m benchmarks.compare baseline.json latest.json --tolerance 0.25 --only inference,db
+
+A metric regresses when it moves the wrong way (down for throughput, up
+for latency) by more than `--tolerance` relative to the baseline. Metrics
+present on only one side are listed but never fail the comparison, and a
+warning is printed when the two runs come from different machines.
+"""
+import argparse
+import sys
+
+from benchmarks.common import load_results
+
+DEFAULT_TOLERANCE = 0.10
+MACHINE_KEYS = ("cpu", "cpu_count", "python", "platform")
+
+
+def _key(r: dict) -> str:
+    return f"{r['suite']}.{r['name']}.{r['metric']}"
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE,
+            suites: list[str] | None = None) -> dict:
+    """
+    Matches results by suite.name.metric. Returns {"rows": [...],
+    "regressions": [...], "improvements": [...], "missing": [...], "new": [...]}
+    where each row carries the relative change (positive = better).
+    """
+    def index(doc):
+        return {_key(r): r for r in doc["results"] if not suites or r["suite"] in suites}
+
+    base, cur = index(baseline), index(current)
+    rows, regressions, improvements = [], [], []
+    for key in sorted(base.keys() & cur.keys()):
+        b, c = base[key], cur[key]
+        if b["value"] == 0:                            # e.g. error_rate: 0 → anything
+            change = 0.0 if c["value"] == 0 else (1.0 if c["higher_is_better"] else -1.0)
+        else:
+            change = (c["value"] - b["value"]) / abs(b["value"])
+            if not c["higher_is_better"]:
+                change = -change
+        row = {"key": key, "baseline": b["value"], "current": c["value"], "unit": c["unit"],
+               "change": round(change, 4)}
+        rows.append(row)
+        if change < -tolerance:
+            regressions.append(row)
+        elif change > tolerance:
+            improvements.append(row)
+    return {"rows": rows, "regressions": regressions, "improvements": improvements,
+            "missing": sorted(base.keys() - cur.keys()), "new": sorted(cur.keys() - base.keys())}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline", help="Stored baseline result JSON")
+    parser.add_argument("current", help="Result JSON to check")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown per metric (0.10 = 10%%)")
+    parser.add_argument("--only", default=None, help="Comma-separated suites to compare")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline, current = load_results(args.baseline), load_results(args.current)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+
+    differs = [k for k in MACHINE_KEYS
+               if baseline["metadata"].get(k) != current["metadata"].get(k)]
+    if differs:
+        print(f"warning: runs differ in {', '.join(differs)}; numbers may not be comparable\n")
+
+    report = compare(baseline, current, args.tolerance,
+                     args.only.split(",") if args.only else None)
+    print(f"{'benchmark':<58} | {'baseline':>12} | {'current':>12} | {'change':>8}")
+    print("-" * 100)
+    flagged = {r["key"] for r in report["regressions"]}
+    for r in report["rows"]:
+        mark = "  REGRESSION" if r["key"] in flagged else ""
+        print(f"{r['key']:<58} | {r['baseline']:>12,.3f} | {r['current']:>12,.3f} | "
+              f"{r['change']:>+8.1%}{mark}")
+    for key in report["missing"]:
+        print(f"{key:<58} | missing from current run")
+    for key in report["new"]:
+        print(f"{key:<58} | new (no baseline)")
+
+    print(f"\n{len(report['rows'])} compared, {len(report['regressions'])} regressed, "
+          f"{len(report['improvements'])} improved (tolerance {args.tolerance:.0%})")
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
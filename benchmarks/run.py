@@ -0,0 +1,83 @@
+"""
+benchmarks/run.py
+──────────────────
+Runs the benchmark suites and writes one JSON result file with machine
+metadata, ready for benchmarks.compare.
+
+    python -m benchmarks.run                                  # all suites
+    python -m benchmarks.run --quick --output bench.json      # smaller sizes, ~1 min
+    python -m benchmarks.run --suites inference,load --concurrency 32
+    python -m benchmarks.run --suites db --db-sizes 100000,1000000,5000000
+
+Suites: inference, load, db, explain, feature_store. The app's database
+and on-disk state are redirected to a temporary directory for the run.
+"""
+import argparse
+import importlib
+import logging
+import tempfile
+import time
+
+from benchmarks.common import isolate_app_state, print_results, write_results
+
+SUITES = {
+    "inference": "benchmarks.bench_inference",
+    "load": "benchmarks.bench_load",
+    "db": "benchmarks.bench_db",
+    "explain": "benchmarks.bench_explain",
+    "feature_store": "benchmarks.bench_feature_store",
+}
+DEFAULT_OUTPUT = "benchmarks/results/latest.json"
+
+logger = logging.getLogger("benchmarks")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"Comma-separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true",
+                        help="Smaller sizes and fewer repeats (CI smoke run)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Result JSON path")
+    parser.add_argument("--concurrency", type=int, default=8, help="load: concurrent clients")
+    parser.add_argument("--requests", type=int, default=None, help="load: requests per route")
+    parser.add_argument("--routes", default=None, help="load: comma-separated routes")
+    parser.add_argument("--db-sizes", default=None, help="db: comma-separated rows per table")
+    args = parser.parse_args(argv)
+
+    suites = args.suites.split(",")
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    # Progress lines only: per-request app / httpx logging would skew the numbers
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(name)s | %(message)s")
+    logger.setLevel(logging.INFO)
+
+    options = {"suites": suites, "quick": args.quick, "concurrency": args.concurrency,
+               "requests": args.requests, "routes": args.routes, "db_sizes": args.db_sizes}
+    kwargs = {
+        "load": {"concurrency": args.concurrency, "requests": args.requests,
+                 "routes": args.routes.split(",") if args.routes else None},
+        "db": {"sizes": [int(s) for s in args.db_sizes.split(",")] if args.db_sizes else None},
+    }
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        isolate_app_state(workdir)
+        for suite in suites:
+            t0 = time.perf_counter()
+            logger.info(f"running {suite} …")
+            module = importlib.import_module(SUITES[suite])
+            try:
+                results += module.run(quick=args.quick, **kwargs.get(suite, {}))
+            except ValueError as exc:
+                parser.error(str(exc))
+            logger.info(f"{suite} done in {time.perf_counter() - t0:.1f}s")
+
+    write_results(args.output, results, options)
+    print_results(results)
+    print(f"\n{len(results)} results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,18 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.config import settings
 from app.db.models import Base
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.main import app
 
+# ── Keep on-disk state out of the test run ────────────────────
+settings.FEATURE_STORE_SNAPSHOT_PATH = ""
+settings.DRIFT_STATE_DIR = ""
+settings.SIMILARITY_INDEX_PATH = ""
+settings.MODEL_REGISTRY_USAGE_PATH = ""
+settings.WORKER_STATS_DIR = ""
+
 # ── In-memory SQLite for tests ────────────────────────────────
 TEST_DATABASE_URL = "sqlite://"   # pure in-memory; destroyed after process
 
@@ -33,6 +41,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 @pytest.fixture(scope="module")
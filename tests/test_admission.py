@@ -0,0 +1,102 @@
+"""
+tests/test_admission.py — Tests for admission control / load shedding.
+"""
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected, request_deadline_ms
+from app.config import settings
+
+VALID_PAYLOAD = {
+    "transaction_amount": 120.0,
+    "merchant_type": "grocery",
+    "country": "US",
+    "time_delta": 12.0,
+    "device_type": "desktop",
+}
+
+
+def _controller(**overrides) -> AdmissionController:
+    kwargs = dict(route="/test", initial_limit=1, min_limit=1, max_limit=4,
+                  max_queue=2, target_latency_ms=10.0)
+    kwargs.update(overrides)
+    return AdmissionController(**kwargs)
+
+
+def test_admits_up_to_limit_then_queues_and_hands_over_slot():
+    async def scenario():
+        ctl = _controller()
+        await ctl.acquire(deadline_ms=1000)
+        waiter = asyncio.create_task(ctl.acquire(deadline_ms=1000))
+        await asyncio.sleep(0)
+        assert ctl.queue_depth == 1
+        ctl.release(latency_ms=1.0)
+        waited = await waiter
+        assert waited >= 0.0
+        assert ctl.in_flight == 1 and ctl.queue_depth == 0
+        assert ctl.admitted == 2
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_queue_full():
+    async def scenario():
+        ctl = _controller(max_queue=1)
+        await ctl.acquire(deadline_ms=1000)
+        queued = asyncio.create_task(ctl.acquire(deadline_ms=1000))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await ctl.acquire(deadline_ms=1000)
+        assert exc.value.reason == "queue full"
+        assert exc.value.retry_after_s >= 1
+        ctl.release(latency_ms=1.0)
+        await queued
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_expected_wait_exceeds_deadline():
+    async def scenario():
+        ctl = _controller(target_latency_ms=500.0)
+        await ctl.acquire(deadline_ms=1000)
+        with pytest.raises(AdmissionRejected) as exc:
+            await ctl.acquire(deadline_ms=50)
+        assert exc.value.reason == "deadline"
+        assert ctl.shed_deadline == 1 and ctl.queue_depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_limit_adapts_to_latency():
+    async def scenario():
+        ctl = _controller(initial_limit=2)
+        for _ in range(20):
+            await ctl.acquire(deadline_ms=1000)
+            ctl.release(latency_ms=1.0)
+        grown = ctl.limit
+        assert grown > 2
+        for _ in range(20):
+            await ctl.acquire(deadline_ms=1000)
+            ctl.release(latency_ms=100.0)
+        assert ctl.limit < grown
+
+    asyncio.run(scenario())
+
+
+def test_request_deadline_header_parsing():
+    assert request_deadline_ms("250") == 250.0
+    assert request_deadline_ms("garbage") == settings.ADMISSION_DEFAULT_DEADLINE_MS
+    assert request_deadline_ms(None) == settings.ADMISSION_DEFAULT_DEADLINE_MS
+
+
+def test_admission_metrics_report_admitted_requests(client):
+    response = client.post("/v1/fraud/predict", json=VALID_PAYLOAD,
+                           headers={"X-Request-Deadline-ms": "500"})
+    assert response.status_code == 200
+    assert "X-Queue-Time-ms" in response.headers
+
+    stats = client.get("/v1/metrics/admission").json()
+    fraud = next(s for s in stats if s["route"] == "/v1/fraud/predict")
+    assert fraud["admitted"] >= 1
+    assert fraud["in_flight"] == 0
@@ -0,0 +1,142 @@
+"""
+tests/test_alerts.py — Tests for the alert rule engine and GET /v1/metrics/alerts.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import app.alerts as alerts_module
+from app.alerts import (
+    AlertEngine, WebhookSink, build_sinks, file_sink, load_rules, log_sink,
+)
+
+HOT_HOST = {"name": "hot-host", "kind": "anomaly", "field": "anomaly_score", "op": ">",
+            "threshold": 0.8, "group_by": "host", "consecutive": 3}
+FRAUD_BURST = {"name": "fraud-burst", "kind": "fraud", "field": "fraud_probability",
+               "op": ">", "threshold": 0.9, "group_by": "merchant_type",
+               "count": 4, "window_s": 60}
+HOT_SAMPLE = {"response_time": 4800.0, "error_rate": 0.9, "cpu_usage": 99.0,
+              "memory_usage": 99.0}
+
+
+def _anomaly(engine, scores, hosts, ts=1000.0):
+    return engine.observe("anomaly", {"anomaly_score": np.array(scores)},
+                          {"host": hosts}, ts=ts)
+
+
+def _fraud(engine, probs, merchants, ts):
+    return engine.observe("fraud", {"fraud_probability": np.array(probs)},
+                          {"merchant_type": merchants}, ts=ts)
+
+
+def test_consecutive_rule_fires_per_host_and_rearms():
+    engine = AlertEngine([HOT_HOST], sinks=[])
+    assert _anomaly(engine, [0.9, 0.9], ["a", "a"]) == []
+    assert _anomaly(engine, [0.9, 0.2], ["b", "b"]) == []
+    fired = _anomaly(engine, [0.95, 0.9, 0.9], ["a", "b", "a"])   # a: 3rd in a row
+    assert [(f["key"], f["value"]) for f in fired] == [("a", 0.95)]
+
+    assert _anomaly(engine, [0.9], ["a"]) == []          # still the same streak
+    _anomaly(engine, [0.1], ["a"])                        # breaks it: re-armed
+    fired = _anomaly(engine, [0.9, 0.9, 0.9, 0.9], ["a"] * 4)
+    assert len(fired) == 1 and fired[0]["count"] == 3
+    assert _anomaly(engine, [0.9], [None]) == []          # no host: not grouped
+
+
+def test_streak_carries_across_batches():
+    rule = AlertEngine([HOT_HOST], sinks=[]).rules[0]
+    assert rule._streak(2, np.array([True, False, True, True, True])) == (3, 0)
+    assert rule._streak(0, np.array([True, False, True, True, True])) == (3, 4)
+    assert rule._streak(5, np.array([True, True])) == (7, None)
+    assert rule._streak(1, np.array([False])) == (0, None)
+
+
+def test_count_window_rule_expires_and_clears():
+    engine = AlertEngine([FRAUD_BURST], sinks=[], n_buckets=6)
+    assert _fraud(engine, [0.95, 0.95, 0.5], ["electronics"] * 3, ts=0.0) == []
+    assert _fraud(engine, [0.95], ["travel"], ts=10.0) == []
+    # the first two matches have left the 60 s window by t=70
+    assert _fraud(engine, [0.95, 0.95], ["electronics"] * 2, ts=70.0) == []
+    fired = _fraud(engine, [0.99, 0.97], ["electronics"] * 2, ts=75.0)
+    assert [(f["key"], f["count"]) for f in fired] == [("electronics", 4)]
+    assert _fraud(engine, [0.95], ["electronics"], ts=76.0) == []     # window cleared
+
+
+def test_keys_are_lru_bounded():
+    engine = AlertEngine([HOT_HOST], sinks=[], max_keys=10)
+    _anomaly(engine, [0.9] * 50, [f"host-{i}" for i in range(50)])
+    stats = engine.stats()["rules"][0]
+    assert stats["keys"] == 10 and stats["evicted_keys"] == 40
+
+
+@pytest.mark.parametrize("spec", [
+    {**HOT_HOST, "field": "fraud_probability"},
+    {**HOT_HOST, "op": "=="},
+    {**HOT_HOST, "group_by": "merchant_type"},
+    {**HOT_HOST, "count": 3, "window_s": 60},
+    {**FRAUD_BURST, "window_s": 0},
+    {k: v for k, v in HOT_HOST.items() if k != "threshold"},
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(ValueError):
+        AlertEngine([spec], sinks=[])
+
+
+def test_file_sink_and_dispatcher(tmp_path):
+    path = tmp_path / "alerts.ndjson"
+    broken = []
+
+    def failing_sink(alert):
+        broken.append(alert)
+        raise RuntimeError("webhook down")
+
+    engine = AlertEngine([HOT_HOST], sinks=[failing_sink, file_sink(str(path))])
+    engine.start()
+    _anomaly(engine, [0.9] * 3, ["api-1"] * 3)
+    engine.stop()                          # drains the queue before returning
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [a["rule"] for a in lines] == ["hot-host"] and len(broken) == 1
+    stats = engine.stats()
+    assert (stats["fired"], stats["delivered"], stats["sink_errors"]) == (1, 1, 1)
+
+
+def test_stop_closes_webhook_client():
+    webhook = WebhookSink("http://127.0.0.1:9/alerts", timeout_s=0.1)
+    engine = AlertEngine([HOT_HOST], sinks=[log_sink, webhook])
+    engine.start()
+    engine.stop()
+    assert webhook._client.is_closed
+
+
+def test_load_rules_and_build_sinks(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps([HOT_HOST, FRAUD_BURST]))
+    assert [r["name"] for r in load_rules(str(rules_path))] == ["hot-host", "fraud-burst"]
+    with pytest.raises(ValueError):
+        build_sinks(["pager"])
+
+
+def test_predict_routes_feed_alert_engine(client, monkeypatch):
+    engine = AlertEngine([HOT_HOST, {**FRAUD_BURST, "threshold": 0.0, "count": 2}], sinks=[])
+    monkeypatch.setattr(alerts_module, "_alert_engine", engine)
+
+    for _ in range(2):
+        client.post("/v1/anomaly/predict", json={**HOT_SAMPLE, "host": "api-7"})
+    client.post("/v1/anomaly/predict-batch", json={"items": [
+        {**HOT_SAMPLE, "host": "api-7"}, {**HOT_SAMPLE, "host": "api-8"}]})
+    client.post("/v1/fraud/predict", json={
+        "transaction_amount": 2500.0, "merchant_type": "electronics", "country": "US",
+        "time_delta": 5.2, "device_type": "mobile"})
+    client.post("/v1/fraud/predict", json={
+        "transaction_amount": 99.0, "merchant_type": "electronics", "country": "US",
+        "time_delta": 1.0, "device_type": "desktop"})
+
+    data = client.get("/v1/metrics/alerts").json()
+    assert data["enabled"] is True and data["observed"] == 6
+    assert {(a["rule"], a["key"]) for a in data["recent"]} == {
+        ("hot-host", "api-7"), ("fraud-burst", "electronics")}
+
+
+def test_alert_metrics_when_disabled(client):
+    assert client.get("/v1/metrics/alerts").json()["enabled"] is False
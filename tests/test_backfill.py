@@ -0,0 +1,100 @@
+"""
+tests/test_backfill.py — Tests for historical re-scoring (python -m app.backfill).
+"""
+import joblib
+import pytest
+from sqlalchemy import delete, func, insert, select
+
+import app.backfill as backfill
+from app.config import settings
+from app.db.models import AnomalyPrediction, AnomalyRescore, Base, FraudPrediction, FraudRescore
+from app.models.loader import get_model_loader
+
+from tests.conftest import TestingSessionLocal, engine
+
+
+@pytest.fixture(scope="module")
+def histories():
+    """Stored predictions scored by the primary models, as the API would have written them."""
+    Base.metadata.create_all(bind=engine)
+    loader = get_model_loader()
+    fraud = [{"transaction_amount": 10.0 + 37 * i, "merchant_type": ("retail", "electronics")[i % 2],
+              "country": "US", "time_delta": float(i % 48), "device_type": "mobile"}
+             for i in range(250)]
+    anomaly = [{"response_time": 100.0 + 20 * i, "error_rate": (i % 10) / 10,
+                "cpu_usage": float(i % 100), "memory_usage": 50.0} for i in range(250)]
+    with TestingSessionLocal() as db:
+        db.execute(delete(FraudPrediction))
+        db.execute(delete(AnomalyPrediction))
+        db.execute(insert(FraudPrediction), [
+            {**r, "fraud_probability": loader.predict_fraud(**r)[0],
+             "model_version": "fraud-v1.0.0", "latency_ms": 1.0} for r in fraud])
+        db.execute(insert(AnomalyPrediction), [
+            {**r, "anomaly_score": loader.predict_anomaly(**r)[0],
+             "model_version": "anomaly-v1.0.0", "latency_ms": 1.0} for r in anomaly])
+        db.commit()
+
+
+@pytest.fixture(scope="module")
+def candidates(tmp_path_factory):
+    """A fraud artifact identical to the primary and an anomaly one with a shifted range."""
+    out = tmp_path_factory.mktemp("backfill")
+    fraud = joblib.load(settings.FRAUD_MODEL_PATH)
+    fraud["metadata"] = {**fraud["metadata"], "model_version": "fraud-v2.0.0"}
+    joblib.dump(fraud, out / "fraud.pkl")
+    anomaly = joblib.load(settings.ANOMALY_MODEL_PATH)
+    score_range = anomaly["metadata"]["score_range"]
+    anomaly["metadata"] = {**anomaly["metadata"], "model_version": "anomaly-v2.0.0",
+                           "score_range": {**score_range, "min": score_range["min"] - 0.05}}
+    joblib.dump(anomaly, out / "anomaly.pkl")
+    return {"fraud": str(out / "fraud.pkl"), "anomaly": str(out / "anomaly.pkl")}
+
+
+def _run(kind, candidates, **kwargs):
+    return backfill.run(kind, candidates[kind], session_factory=TestingSessionLocal,
+                        **{"workers": 2, "chunk_rows": 40, **kwargs})
+
+
+def test_rescores_every_row_in_keyset_chunks(histories, candidates):
+    summary = _run("fraud", candidates)
+    assert summary["model_version"] == "fraud-v2.0.0"
+    assert summary["rows_this_run"] == 250 and summary["shift"]["rows"] == 250
+    # same weights, new tag: scores are reproduced exactly
+    assert summary["shift"]["max_abs_shift"] == pytest.approx(0.0, abs=1e-9)
+    assert summary["shift"]["decision_flips"] == 0
+
+    with TestingSessionLocal() as db:
+        ids = db.scalars(select(FraudRescore.prediction_id).order_by(
+            FraudRescore.prediction_id)).all()
+        served = db.scalars(select(FraudPrediction.id).order_by(FraudPrediction.id)).all()
+    assert ids == served
+
+
+def test_resume_continues_after_the_last_rescored_id(histories, candidates):
+    with TestingSessionLocal() as db:
+        ids = db.scalars(select(AnomalyPrediction.id).order_by(AnomalyPrediction.id)).all()
+        db.execute(delete(AnomalyRescore))
+        db.commit()
+    first = _run("anomaly", candidates, end_id=ids[99])          # interrupted after 100 rows
+    assert first["rows_this_run"] == 100
+
+    with pytest.raises(ValueError, match="--resume"):
+        _run("anomaly", candidates)
+    second = _run("anomaly", candidates, resume=True)
+    assert second["rows_this_run"] == 150
+    shift = second["shift"]
+    assert shift["rows"] == 250
+    assert shift["mean_shift"] < 0 < shift["mean_abs_shift"]      # widened range → lower scores
+    assert shift["shifted_more_than"]["0.01"] > 0
+
+    with TestingSessionLocal() as db:
+        assert db.scalar(select(func.count(func.distinct(AnomalyRescore.prediction_id)))) == 250
+
+
+def test_throttle_limits_rows_per_second(histories, candidates):
+    with TestingSessionLocal() as db:
+        db.execute(delete(FraudRescore))
+        db.commit()
+    summary = _run("fraud", candidates, max_rows_per_s=500)
+    assert summary["elapsed_s"] >= 250 / 500 * 0.9
+    assert summary["rows_per_s"] <= 550
@@ -0,0 +1,66 @@
+"""
+tests/test_benchmarks.py — Tests for the benchmark result format and the regression gate.
+"""
+import json
+
+import pytest
+
+from benchmarks import bench_inference, compare
+from benchmarks.common import load_results, result, write_results
+
+
+def _doc(*results) -> dict:
+    return {"version": 1, "metadata": {"cpu": "x"}, "options": {}, "results": list(results)}
+
+
+def test_compare_flags_only_moves_in_the_wrong_direction():
+    baseline = _doc(result("inference", "fraud", "rows_per_s", 1000, "rows/s", True),
+                    result("load", "fraud", "p99_ms", 10, "ms", False),
+                    result("load", "health", "p99_ms", 2, "ms", False),
+                    result("db", "metrics", "p50_ms", 5, "ms", False))
+    current = _doc(result("inference", "fraud", "rows_per_s", 850, "rows/s", True),   # -15%
+                   result("load", "fraud", "p99_ms", 10.5, "ms", False),              # +5%
+                   result("load", "health", "p99_ms", 1, "ms", False),                # faster
+                   result("db", "seed", "rows_per_s", 1, "rows/s", True))
+    report = compare.compare(baseline, current, tolerance=0.10)
+    assert [r["key"] for r in report["regressions"]] == ["inference.fraud.rows_per_s"]
+    assert [r["key"] for r in report["improvements"]] == ["load.health.p99_ms"]
+    assert report["missing"] == ["db.metrics.p50_ms"] and report["new"] == ["db.seed.rows_per_s"]
+
+    assert compare.compare(baseline, current, tolerance=0.2)["regressions"] == []
+    assert compare.compare(baseline, current, suites=["load"])["regressions"] == []
+
+
+def test_errors_appearing_from_a_zero_baseline_regress():
+    baseline = _doc(result("load", "fraud", "error_rate", 0, "ratio", False))
+    current = _doc(result("load", "fraud", "error_rate", 0.01, "ratio", False))
+    assert len(compare.compare(baseline, current)["regressions"]) == 1
+    assert compare.compare(baseline, baseline)["regressions"] == []
+
+
+def test_compare_cli_exit_code(tmp_path, capsys):
+    write_results(str(tmp_path / "base.json"),
+                  [result("db", "insert", "p50_ms", 1.0, "ms", False)], {})
+    write_results(str(tmp_path / "slow.json"),
+                  [result("db", "insert", "p50_ms", 2.0, "ms", False)], {})
+    assert load_results(str(tmp_path / "base.json"))["metadata"]["cpu_count"] >= 1
+
+    with pytest.raises(SystemExit) as exc:
+        compare.main([str(tmp_path / "base.json"), str(tmp_path / "base.json")])
+    assert exc.value.code == 0
+    with pytest.raises(SystemExit) as exc:
+        compare.main([str(tmp_path / "base.json"), str(tmp_path / "slow.json")])
+    assert exc.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_load_results_rejects_other_json(tmp_path):
+    (tmp_path / "other.json").write_text(json.dumps({"foo": 1}))
+    with pytest.raises(ValueError):
+        load_results(str(tmp_path / "other.json"))
+
+
+def test_inference_rows_are_valid_requests(client):
+    assert client.post("/v1/fraud/predict", json=bench_inference.fraud_rows(1)[0]).status_code == 200
+    assert client.post("/v1/anomaly/predict",
+                       json=bench_inference.anomaly_rows(1)[0]).status_code == 200
@@ -0,0 +1,80 @@
+"""
+tests/test_drift.py — Tests for drift monitoring and GET /v1/drift.
+"""
+import numpy as np
+
+from app.drift import DriftMonitor, reference_histogram, psi
+
+FEATURES = ["a", "b"]
+
+
+def _monitor() -> DriftMonitor:
+    rng = np.random.default_rng(0)
+    ref = {
+        "features": {
+            "a": reference_histogram(rng.normal(0, 1, 5000)),
+            "b": reference_histogram(rng.integers(0, 3, 5000), edges=[0.5, 1.5]),
+        },
+        "score": reference_histogram(rng.uniform(0, 1, 5000)),
+    }
+    return DriftMonitor("test-v1", FEATURES, ref)
+
+
+def test_reference_histogram_bins_are_open_ended():
+    hist = reference_histogram(np.arange(100), n_bins=4)
+    assert len(hist["counts"]) == len(hist["edges"]) + 1
+    assert sum(hist["counts"]) == 100
+
+
+def test_psi_zero_for_identical_and_large_for_shifted():
+    counts = np.array([10, 20, 30, 40], dtype=float)
+    assert psi(counts, counts) < 1e-9
+    assert psi(counts, counts[::-1]) > 0.2
+
+
+def test_observe_and_batch_agree():
+    rng = np.random.default_rng(1)
+    X = np.column_stack([rng.normal(0, 1, 200), rng.integers(0, 3, 200)])
+    scores = rng.uniform(0, 1, 200)
+    single, batch = _monitor(), _monitor()
+    for row, s in zip(X, scores):
+        single.observe(row, s)
+    batch.observe_batch(X, scores)
+    assert single.state() == batch.state()
+
+
+def test_drift_detected_on_shifted_inputs():
+    rng = np.random.default_rng(2)
+    stable, shifted = _monitor(), _monitor()
+    stable.observe_batch(np.column_stack([rng.normal(0, 1, 2000), rng.integers(0, 3, 2000)]),
+                         rng.uniform(0, 1, 2000))
+    shifted.observe_batch(np.column_stack([rng.normal(3, 1, 2000), rng.integers(0, 3, 2000)]),
+                          rng.uniform(0, 1, 2000))
+    assert not stable.report()["features"][0]["drifted"]
+    assert shifted.report()["features"][0]["drifted"]
+    assert not shifted.report()["features"][1]["drifted"]
+
+
+def test_states_merge_across_workers():
+    rng = np.random.default_rng(3)
+    worker_a, worker_b = _monitor(), _monitor()
+    worker_a.observe_batch(np.column_stack([rng.normal(0, 1, 50), np.zeros(50)]), np.zeros(50))
+    worker_b.observe_batch(np.column_stack([rng.normal(0, 1, 70), np.ones(70)]), np.ones(70))
+    assert worker_a.report([worker_b.state()])["samples"] == 120
+    other_version = {**worker_b.state(), "model_version": "test-v2"}
+    assert worker_a.report([other_version])["samples"] == 50
+
+
+def test_drift_endpoint(client):
+    client.post("/v1/anomaly/predict", json={
+        "response_time": 150, "error_rate": 0.02, "cpu_usage": 35, "memory_usage": 50,
+    })
+    response = client.get("/v1/drift")
+    assert response.status_code == 200
+    data = response.json()
+    anomaly = data["anomaly"]
+    assert anomaly["samples"] >= 1
+    assert {f["name"] for f in anomaly["features"]} == {
+        "response_time", "error_rate", "cpu_usage", "memory_usage",
+    }
+    assert data["fraud"]["model_version"] != ""
@@ -0,0 +1,77 @@
+"""
+tests/test_explain.py — Tests for ?explain=true and the batch predict endpoints.
+"""
+import numpy as np
+
+from app.models.loader import get_model_loader
+
+FRAUD = {
+    "transaction_amount": 9999.99,
+    "merchant_type": "gaming",
+    "country": "NG",
+    "time_delta": 0.1,
+    "device_type": "mobile",
+}
+ANOMALY = {
+    "response_time": 2000.0,
+    "error_rate": 0.80,
+    "cpu_usage": 98.0,
+    "memory_usage": 97.0,
+}
+
+
+def test_fraud_contributions_sum_to_logit():
+    loader = get_model_loader()
+    X = np.array([loader.encode_fraud(**FRAUD)], dtype=float)
+    base, contributions = loader.explain_fraud(X)
+    prob = loader.score_fraud(X)[0]
+    assert abs(base + contributions.sum() - np.log(prob / (1 - prob))) < 1e-6
+
+
+def test_isolation_forest_single_traversal_matches_sklearn():
+    loader = get_model_loader()
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(50, 2500, 200), rng.uniform(0, 1, 200),
+                         rng.uniform(0, 100, 200), rng.uniform(0, 100, 200)])
+    scores, shares = loader.explain_anomaly(X)
+    np.testing.assert_allclose(scores, loader.score_anomaly(X), atol=1e-6)
+    np.testing.assert_allclose(shares.sum(axis=1), 1.0)
+
+
+def test_fraud_predict_explain(client):
+    data = client.post("/v1/fraud/predict?explain=true", json=FRAUD).json()
+    explanation = data["explanation"]
+    assert explanation["method"] == "linear_logit"
+    assert set(explanation["contributions"]) == set(get_model_loader().fraud_features)
+
+    plain = client.post("/v1/fraud/predict", json=FRAUD).json()
+    assert plain["explanation"] is None
+
+
+def test_anomaly_predict_explain(client):
+    data = client.post("/v1/anomaly/predict?explain=true", json=ANOMALY).json()
+    contributions = data["explanation"]["contributions"]
+    assert set(contributions) == {"response_time", "error_rate", "cpu_usage", "memory_usage"}
+    assert abs(sum(contributions.values()) - 1.0) < 1e-3
+
+
+def test_fraud_batch_matches_single(client):
+    low = {**FRAUD, "transaction_amount": 20.0, "country": "US", "time_delta": 48.0}
+    batch = client.post("/v1/fraud/predict-batch?explain=true",
+                        json={"items": [FRAUD, low]}).json()
+    assert len(batch["predictions"]) == 2
+    single = client.post("/v1/fraud/predict", json=FRAUD).json()
+    assert batch["predictions"][0]["fraud_probability"] == single["fraud_probability"]
+    assert batch["predictions"][1]["explanation"] is not None
+
+
+def test_anomaly_batch(client):
+    normal = {"response_time": 100.0, "error_rate": 0.01, "cpu_usage": 30.0, "memory_usage": 40.0}
+    batch = client.post("/v1/anomaly/predict-batch",
+                        json={"items": [normal, ANOMALY]}).json()
+    scores = [p["anomaly_score"] for p in batch["predictions"]]
+    assert scores[1] > scores[0]
+
+
+def test_batch_empty_returns_422(client):
+    assert client.post("/v1/anomaly/predict-batch", json={"items": []}).status_code == 422
@@ -0,0 +1,126 @@
+"""
+tests/test_feature_store.py — Tests for the velocity feature store and its use in fraud scoring.
+"""
+import time
+
+import app.feature_store as feature_store
+from app.config import settings
+from app.feature_store import VelocityFeatureStore
+
+BASE_PAYLOAD = {
+    "transaction_amount": 300.0,
+    "merchant_type": "electronics",
+    "country": "US",
+    "device_type": "mobile",
+}
+
+
+def _store(**overrides) -> VelocityFeatureStore:
+    kwargs = dict(max_entities=100, max_events_per_entity=50, ttl_s=86_400.0)
+    kwargs.update(overrides)
+    return VelocityFeatureStore(**kwargs)
+
+
+def test_sliding_windows_count_and_expire():
+    store = _store()
+    store.observe("card", 10.0, "US", ts=1000.0)
+    store.observe("card", 20.0, "DE", ts=1030.0)
+    f = store.observe("card", 30.0, "US", ts=1070.0)   # first event leaves the 1m window
+    assert f["txn_count_1m"] == 2
+    assert f["amount_sum_1m"] == 50.0
+    assert f["txn_count_1h"] == 3
+    assert f["amount_sum_1h"] == 60.0
+    assert f["distinct_countries_1h"] == 2
+    assert abs(f["time_delta"] - 40.0 / 3600) < 1e-9
+
+    f = store.observe("card", 5.0, "FR", ts=1000.0 + 3600 + 31)   # only the last event remains
+    assert f["txn_count_1h"] == 2
+    assert f["distinct_countries_1h"] == 2
+
+
+def test_first_observation_has_no_time_delta():
+    assert _store().observe("new", 1.0, "US", ts=0.0)["time_delta"] is None
+
+
+def test_events_per_entity_are_bounded():
+    store = _store(max_events_per_entity=5)
+    for i in range(20):
+        f = store.observe("card", 1.0, f"C{i}", ts=1000.0 + i)
+    assert f["txn_count_1h"] == 5
+    assert f["amount_sum_1h"] == 5.0
+    assert f["distinct_countries_1h"] == 5
+
+
+def test_idle_entities_evicted_by_ttl_and_capacity():
+    store = _store(max_entities=2, ttl_s=100.0)
+    store.observe("a", 1.0, "US", ts=0.0)
+    store.observe("b", 1.0, "US", ts=50.0)
+    store.observe("c", 1.0, "US", ts=60.0)              # capacity evicts "a"
+    assert len(store) == 2 and store.evicted_capacity == 1
+    store.observe("d", 1.0, "US", ts=155.0)             # TTL evicts "b"
+    assert store.evicted_ttl == 1
+    assert len(store) == 2
+
+
+def test_snapshot_restore_round_trip(tmp_path):
+    store = _store()
+    store.observe("card", 10.0, "US", ts=1000.0)
+    store.observe("card", 15.0, "NG", ts=1010.0)
+    path = str(tmp_path / "fs.pkl")
+    assert store.snapshot(path) == 1
+
+    restored = _store()
+    assert restored.restore(path, now=1020.0) == 1
+    f = restored.observe("card", 5.0, "US", ts=1020.0)
+    assert f["txn_count_1h"] == 3
+    assert f["distinct_countries_1h"] == 2
+    assert abs(f["time_delta"] - 10.0 / 3600) < 1e-9
+
+
+def test_store_is_snapshotted_periodically_and_at_shutdown(tmp_path, monkeypatch):
+    path = tmp_path / "fs.pkl"
+    monkeypatch.setattr(settings, "FEATURE_STORE_SNAPSHOT_PATH", str(path))
+    monkeypatch.setattr(settings, "FEATURE_STORE_SNAPSHOT_INTERVAL_S", 0.05)
+    store = _store()
+    monkeypatch.setattr(feature_store, "_feature_store", store)
+    store.observe("card", 10.0, "US")
+
+    feature_store.start_feature_store()
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:     # no shutdown needed
+        time.sleep(0.01)
+    assert _store().restore(str(path)) == 1
+
+    store.observe("other", 10.0, "US")
+    feature_store.stop_feature_store()
+    assert _store().restore(str(path)) == 2
+    assert not (tmp_path / "fs.pkl.tmp").exists()
+
+
+def test_fraud_predict_with_entity_returns_velocity(client):
+    payload = {**BASE_PAYLOAD, "entity_id": "card_test_velocity"}
+    first = client.post("/v1/fraud/predict", json=payload)
+    assert first.status_code == 200
+    second = client.post("/v1/fraud/predict", json=payload).json()
+    assert second["velocity"]["txn_count_1m"] == 2
+    assert second["velocity"]["amount_sum_1h"] == 600.0
+    assert second["velocity"]["time_delta"] >= 0.0
+
+
+def test_entity_velocity_changes_the_fraud_score(client):
+    payload = {**BASE_PAYLOAD, "time_delta": 2.0, "entity_id": "card_test_burst"}
+    probs = []
+    for country in ("US", "DE", "NG", "RU"):
+        response = client.post("/v1/fraud/predict", json={**payload, "country": "US"})
+        probs.append(response.json()["fraud_probability"])
+        client.post("/v1/fraud/predict", json={**payload, "country": country})
+    # same request each time; only the card's 1-minute count and countries grow
+    assert probs == sorted(probs) and probs[-1] > probs[0] + 0.1
+
+    quiet = client.post("/v1/fraud/predict", json={**payload, "entity_id": None}).json()
+    assert quiet["fraud_probability"] < probs[-1] and quiet["velocity"] is None
+
+
+def test_fraud_predict_without_time_delta_or_entity_returns_422(client):
+    response = client.post("/v1/fraud/predict", json=BASE_PAYLOAD)
+    assert response.status_code == 422
@@ -0,0 +1,161 @@
+"""
+tests/test_registry.py — Tests for the multi-tenant model registry and GET /v1/metrics/registry.
+"""
+import json
+import os
+
+import joblib
+import pytest
+
+import app.models.registry as registry_module
+from app.config import settings
+from app.models.loader import get_model_loader
+from app.models.registry import ModelRegistry
+
+FRAUD_REQUEST = {
+    "transaction_amount": 2500.0,
+    "merchant_type": "electronics",
+    "country": "US",
+    "time_delta": 5.2,
+    "device_type": "mobile",
+}
+ANOMALY_REQUEST = {"response_time": 950.0, "error_rate": 0.12, "cpu_usage": 91.0,
+                   "memory_usage": 87.0}
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return {"fraud": joblib.load(settings.FRAUD_MODEL_PATH),
+            "anomaly": joblib.load(settings.ANOMALY_MODEL_PATH)}
+
+
+@pytest.fixture
+def publish(tmp_path, artifacts):
+    """publish(tenant, kind, version) writes a tenant artifact tagged `version`."""
+    def _publish(tenant: str, kind: str, version: str) -> str:
+        artifact = dict(artifacts[kind])
+        artifact["metadata"] = {**artifact["metadata"], "model_version": version}
+        kind_dir = tmp_path / "registry" / tenant / kind
+        kind_dir.mkdir(parents=True, exist_ok=True)
+        path = str(kind_dir / f"{version}.pkl")
+        joblib.dump(artifact, path)
+        return path
+    return _publish
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "registry")
+
+
+def test_models_load_lazily_and_hits_are_counted(root, publish):
+    publish("acme", "fraud", "acme-fraud-v1")
+    registry = ModelRegistry(root, max_bytes=10**9)
+    registry.scan()
+    assert registry.stats()["available_models"] == 1
+    assert registry.stats()["resident_models"] == 0
+
+    assert registry.get("acme", "fraud").model_version == "acme-fraud-v1"
+    registry.get("acme", "fraud")
+    assert registry.get("acme", "anomaly") is None
+    assert registry.get("nobody", "fraud") is None
+
+    stats = registry.stats()
+    assert (stats["loads"], stats["misses"], stats["hits"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert [e["event"] for e in stats["events"]] == ["load"]
+
+
+def test_lru_evicts_to_stay_within_byte_budget(root, publish):
+    size = os.path.getsize(publish("a", "fraud", "a-v1"))
+    publish("b", "fraud", "b-v1")
+    publish("c", "fraud", "c-v1")
+    registry = ModelRegistry(root, max_bytes=2 * size)
+    registry.scan()
+
+    registry.get("a", "fraud")
+    registry.get("b", "fraud")
+    registry.get("a", "fraud")                 # a is now most recently used
+    registry.get("c", "fraud")                 # evicts b
+    stats = registry.stats()
+    assert stats["resident_bytes"] <= 2 * size
+    assert {r["tenant"] for r in stats["resident"]} == {"a", "c"}
+    assert stats["evictions"] == 1
+
+
+def test_scan_swaps_versions_and_current_pins(root, publish):
+    publish("acme", "fraud", "acme-fraud-v1.9.0")
+    registry = ModelRegistry(root, max_bytes=10**9)
+    registry.scan()
+    held = registry.get("acme", "fraud")
+
+    publish("acme", "fraud", "acme-fraud-v1.10.0")          # natural sort: newer
+    registry.scan()
+    assert registry.get("acme", "fraud").model_version == "acme-fraud-v1.10.0"
+    assert held.model_version == "acme-fraud-v1.9.0"        # in-flight holder unaffected
+
+    with open(os.path.join(root, "acme", "fraud", "CURRENT"), "w") as f:
+        f.write("acme-fraud-v1.9.0\n")
+    registry.scan()
+    assert registry.get("acme", "fraud").model_version == "acme-fraud-v1.9.0"
+    assert registry.stats()["swaps"] == 2
+
+
+def test_warm_loads_most_used_models_from_usage_file(root, publish, tmp_path):
+    for tenant in ("a", "b", "c"):
+        publish(tenant, "fraud", f"{tenant}-v1")
+    usage_path = tmp_path / "usage.json"
+    usage_path.write_text(json.dumps({"a/fraud": 3, "b/fraud": 50, "c/fraud": 10}))
+
+    registry = ModelRegistry(root, max_bytes=10**9, usage_path=str(usage_path))
+    registry.scan()
+    assert registry.warm(2) == 2
+    assert {r["tenant"] for r in registry.stats()["resident"]} == {"b", "c"}
+
+    registry.get("a", "fraud")
+    registry.save_usage()
+    assert json.loads(usage_path.read_text())["a/fraud"] == 4
+
+
+def test_tenant_header_selects_tenant_model(client, root, publish, monkeypatch):
+    publish("acme", "fraud", "acme-fraud-v2")
+    publish("acme", "anomaly", "acme-anomaly-v1")
+    registry = ModelRegistry(root, max_bytes=10**9)
+    registry.scan()
+    monkeypatch.setattr(registry_module, "_registry", registry)
+
+    tenant = client.post("/v1/fraud/predict", json=FRAUD_REQUEST,
+                         headers={"X-Tenant-ID": "acme"}).json()
+    assert tenant["model_version"] == "acme-fraud-v2"
+    shared = client.post("/v1/fraud/predict", json=FRAUD_REQUEST,
+                         headers={"X-Tenant-ID": "unknown"}).json()
+    assert shared["model_version"] == get_model_loader().model_version("fraud")
+
+    batch = client.post("/v1/anomaly/predict-batch", json={"items": [ANOMALY_REQUEST] * 3},
+                        headers={"X-Tenant-ID": "acme"}).json()
+    assert batch["model_version"] == "acme-anomaly-v1"
+
+    data = client.get("/v1/metrics/registry").json()
+    assert data["enabled"] is True and data["resident_models"] == 2
+    latency = {(row["tenant"], row["kind"]): row for row in data["latency"]}
+    assert latency[("acme", "fraud")]["requests"] == 1
+    assert latency[("acme", "anomaly")]["requests"] == 1
+
+
+def test_broken_tenant_artifact_returns_503(client, root, monkeypatch):
+    kind_dir = os.path.join(root, "acme", "fraud")
+    os.makedirs(kind_dir)
+    with open(os.path.join(kind_dir, "acme-fraud-v1.pkl"), "wb") as f:
+        f.write(b"not a pickle")
+    registry = ModelRegistry(root, max_bytes=10**9)
+    registry.scan()
+    monkeypatch.setattr(registry_module, "_registry", registry)
+
+    response = client.post("/v1/fraud/predict", json=FRAUD_REQUEST,
+                           headers={"X-Tenant-ID": "acme"})
+    assert response.status_code == 503
+    assert registry.stats()["load_errors"] == 1
+
+
+def test_registry_metrics_when_disabled(client):
+    assert client.get("/v1/metrics/registry").json()["enabled"] is False
@@ -0,0 +1,203 @@
+"""
+tests/test_replay.py — Tests for traffic capture in the latency middleware and python -m app.replay.
+"""
+import asyncio
+import glob
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.capture as capture
+from app.capture import TrafficCapture, read_capture
+from app.db.models import Base
+from app.db.session import get_db, get_read_db
+from app.main import app
+from app.replay import parse_speed, replay, run
+
+FRAUD = {"transaction_amount": 2500.0, "merchant_type": "electronics", "country": "US",
+         "time_delta": 5.2, "device_type": "mobile"}
+ANOMALY = {"response_time": 950.0, "error_rate": 0.12, "cpu_usage": 91.0, "memory_usage": 87.0}
+
+
+def _capture(tmp_path, sample_rate=1.0, **kwargs) -> TrafficCapture:
+    return TrafficCapture(str(tmp_path / "capture"), sample_rate, ["/v1/fraud", "/v1/anomaly"],
+                          max_body_bytes=kwargs.get("max_body_bytes", 4096),
+                          file_max_bytes=kwargs.get("file_max_bytes", 1 << 20),
+                          file_max_age_s=60, queue_size=100)
+
+
+def _record(ts: float, path: str, body: dict, status: int = 200, **extra) -> dict:
+    return {"ts": ts, "method": "POST", "path": path,
+            "headers": {"content-type": "application/json"}, "body": json.dumps(body),
+            "status": status, "latency_ms": 1.0, **extra}
+
+
+def _write_capture(path, records: list[dict]) -> None:
+    with gzip.open(path, "wb") as f:
+        for record in records:
+            f.write((json.dumps(record) + "\n").encode())
+
+
+def test_middleware_captures_sampled_prediction_requests(client, tmp_path, monkeypatch):
+    traffic = _capture(tmp_path)
+    traffic.start()
+    monkeypatch.setattr(capture, "_traffic_capture", traffic)
+
+    t0 = time.time()
+    assert client.post("/v1/fraud/predict", json=FRAUD,
+                       headers={"X-Tenant-ID": "nobody", "Cookie": "secret=1"}).status_code == 200
+    assert client.post("/v1/anomaly/predict?similar=2", json=ANOMALY).status_code == 200
+    assert client.post("/v1/anomaly/predict", json={"cpu_usage": 1}).status_code == 422
+    assert client.get("/v1/metrics").status_code == 200          # not under CAPTURE_PATHS
+    traffic.stop()
+
+    assert glob.glob(str(tmp_path / "capture" / "*.open")) == []
+    records = read_capture([str(tmp_path / "capture")])
+    assert [(r["path"], r["status"]) for r in records] == [
+        ("/v1/fraud/predict", 200), ("/v1/anomaly/predict?similar=2", 200),
+        ("/v1/anomaly/predict", 422)]
+    assert json.loads(records[0]["body"]) == FRAUD
+    assert records[0]["headers"] == {"content-type": "application/json", "x-tenant-id": "nobody"}
+    assert t0 <= records[0]["ts"] <= records[1]["ts"] and records[0]["latency_ms"] > 0
+    assert traffic.stats()["written"] == 3
+
+
+def test_sampling_and_body_limits(tmp_path):
+    assert not _capture(tmp_path, sample_rate=0.0).sample("POST", "/v1/fraud/predict", "10")
+    traffic = _capture(tmp_path, max_body_bytes=100)
+    assert traffic.sample("POST", "/v1/fraud/predict", "100")
+    assert not traffic.sample("POST", "/v1/fraud/predict", "101")
+    assert not traffic.sample("POST", "/v1/fraud/predict", None)       # chunked upload
+    assert not traffic.sample("POST", "/v1/score/stream", "10")
+    assert traffic.stats()["skipped"] == 2
+
+    half = _capture(tmp_path, sample_rate=0.5)
+    assert 300 < sum(half.sample("GET", "/v1/fraud/x", None) for _ in range(1000)) < 700
+
+
+def test_files_rotate_and_truncated_tail_is_ignored(tmp_path):
+    traffic = _capture(tmp_path, file_max_bytes=500)
+    traffic.start()
+    for i in range(10):
+        traffic.record(100.0 + i, "POST", "/v1/fraud/predict", {}, json.dumps(FRAUD).encode(),
+                       200, 1.0)
+    traffic.stop()
+    files = sorted(glob.glob(str(tmp_path / "capture" / "*.ndjson.gz")))
+    assert len(files) >= 2
+    assert [r["ts"] for r in read_capture(files)] == [100.0 + i for i in range(10)]
+
+    path = tmp_path / "cut.ndjson.gz.open"
+    _write_capture(path, [_record(float(i), "/v1/fraud/predict", FRAUD) for i in range(50)])
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) - 40])
+    assert 0 < len(read_capture([str(path)])) < 50
+
+
+def test_stop_leaves_the_file_to_a_writer_that_has_not_finished(tmp_path, monkeypatch):
+    monkeypatch.setattr(capture, "STOP_TIMEOUT_S", 0.1)
+    traffic = _capture(tmp_path)
+    release = threading.Event()
+    write = traffic._write
+
+    def slow_write(item):
+        write(item)
+        release.wait(5)
+
+    monkeypatch.setattr(traffic, "_write", slow_write)
+    traffic.start()
+    traffic.record(100.0, "POST", "/v1/fraud/predict", {}, json.dumps(FRAUD).encode(), 200, 1.0)
+    while traffic.stats()["written"] == 0:
+        time.sleep(0.01)
+
+    traffic.stop()                                   # join times out: the file stays open
+    assert len(glob.glob(str(tmp_path / "capture" / "*.open"))) == 1
+    release.set()
+    traffic._thread.join(timeout=5)
+    assert glob.glob(str(tmp_path / "capture" / "*.open")) == []
+    assert len(read_capture([str(tmp_path / "capture")])) == 1
+
+
+@pytest.fixture
+def file_db(tmp_path, monkeypatch):
+    """Concurrent replayed requests run on several threads: give them one file database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replay.db'}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_file_db():
+        with Session() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, get_file_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, get_file_db)
+    yield
+    engine.dispose()
+
+
+def test_replay_preserves_inter_arrival_timing(client, file_db):
+    records = [_record(0.0, "/v1/fraud/predict", FRAUD),
+               _record(0.2, "/v1/anomaly/predict", ANOMALY),
+               _record(0.4, "/v1/anomaly/predict", {"cpu_usage": 1}, status=422)]
+
+    async def go(speed):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as http:
+            return await replay(records, http, speed=speed, concurrency=4)
+
+    real_time = asyncio.run(go(1.0))
+    assert real_time["wall_s"] >= 0.4 and real_time["send_lag_ms"]["max_ms"] < 100
+    assert asyncio.run(go(4.0))["wall_s"] < 0.35
+    assert real_time["overall"]["requests"] == 3
+    assert real_time["overall"]["error_rate"] == pytest.approx(1 / 3, abs=1e-3)
+    assert real_time["routes"]["POST /v1/anomaly/predict"]["captured_error_rate"] == 0.5
+    assert real_time["routes"]["POST /v1/fraud/predict"]["error_rate"] == 0
+
+    flat_out = asyncio.run(go(None))
+    assert flat_out["speed"] == "max" and "send_lag_ms" not in flat_out
+
+
+class _Recorder(BaseHTTPRequestHandler):
+    received: list = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received.append((self.path, self.headers.get("X-Tenant-ID"), json.loads(body)))
+        self.send_response(500 if "fail" in self.path else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_replay_against_a_running_server(tmp_path):
+    _write_capture(tmp_path / "capture-1-1.ndjson.gz", [
+        _record(10.0, "/v1/fraud/predict", FRAUD, headers={"x-tenant-id": "acme"}),
+        _record(10.1, "/v1/fraud/fail", FRAUD),
+    ])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Recorder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        report = run([str(tmp_path)], target=f"http://127.0.0.1:{server.server_port}",
+                     speed=parse_speed("10x"))
+    finally:
+        server.shutdown()
+    assert _Recorder.received == [("/v1/fraud/predict", "acme", FRAUD),
+                                  ("/v1/fraud/fail", None, FRAUD)]
+    assert report["overall"]["error_rate"] == 0.5 and report["transport_errors"] == 0
+
+
+def test_replay_rejects_empty_capture(tmp_path):
+    with pytest.raises(ValueError):
+        run([str(tmp_path)])
+    with pytest.raises(ValueError):
+        parse_speed("0")
+    assert parse_speed("max") is None
@@ -0,0 +1,114 @@
+"""
+tests/test_replica.py — Tests for read-replica routing, pool wait stats and GET /v1/metrics/db.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+import app.db.session as session_module
+from app.db.models import Base, FraudPrediction
+from app.db.session import ReadRouter, get_read_db, make_engine
+from app.main import app
+
+
+def _fraud_row(age_s: float = 0.0) -> dict:
+    return {"transaction_amount": 10.0, "merchant_type": "grocery", "country": "US",
+            "time_delta": 1.0, "device_type": "mobile", "fraud_probability": 0.1,
+            "model_version": "fraud-v1.0.0", "latency_ms": 1.0,
+            "created_at": datetime.now(timezone.utc) - timedelta(seconds=age_s)}
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Two file-backed SQLite databases standing in for primary and replica."""
+    factories = {}
+    for name in ("primary", "replica"):
+        engine, stats = make_engine(name, f"sqlite:///{tmp_path / name}.db", 2, 0, 0.2)
+        Base.metadata.create_all(bind=engine)
+        factories[name] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        factories[name].stats = stats
+    return factories
+
+
+def _insert(factory, *rows):
+    with factory() as db:
+        db.execute(insert(FraudPrediction), list(rows))
+        db.commit()
+
+
+def _bound_db(db) -> str:
+    return os.path.basename(db.get_bind().url.database)
+
+
+def test_router_uses_fresh_replica_and_falls_back_when_stale(databases):
+    router = ReadRouter(databases["primary"], databases["replica"], max_lag_s=30)
+    _insert(databases["primary"], _fraud_row())
+    _insert(databases["replica"], _fraud_row())
+    router.check()
+    assert (router.state, router.lag_s) == ("ok", 0.0)
+    with router.session() as db:
+        assert _bound_db(db) == "replica.db"
+
+    _insert(databases["primary"], _fraud_row(age_s=5))             # not replicated, 5 s old
+    router.check()
+    assert router.state == "ok" and 4 < router.lag_s < 30
+
+    router.max_lag_s = 2                                            # tighter tolerance
+    router.check()
+    assert router.state == "stale"
+    with router.session() as db:
+        assert _bound_db(db) == "primary.db"
+    stats = router.stats()
+    assert (stats["replica_reads"], stats["primary_reads"]) == (1, 1)
+
+
+def test_router_falls_back_when_replica_is_down(databases, tmp_path):
+    missing_engine, _ = make_engine("replica", f"sqlite:///{tmp_path}/no/such/dir.db", 1, 0, 1)
+    broken = sessionmaker(bind=missing_engine)
+    router = ReadRouter(databases["primary"], broken, max_lag_s=30)
+    router.check()
+    assert router.state == "down" and router.last_error
+
+    router.state = "ok"                        # e.g. replica died since the last check
+    with router.session() as db:
+        assert _bound_db(db) == "primary.db"
+    stats = router.stats()
+    assert stats["state"] == "down" and stats["fallbacks"] == 1
+
+
+def test_pool_checkout_wait_and_timeouts_are_recorded(databases):
+    factory = databases["primary"]
+    engine = factory.kw["bind"]
+    held = [engine.connect(), engine.connect()]            # pool_size=2, no overflow
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    for conn in held:
+        conn.close()
+
+    status = session_module.pool_status(engine, factory.stats)
+    assert status["pool_class"] == "QueuePool" and status["pool_size"] == 2
+    assert status["checkouts"] >= 2 and status["timeouts"] == 1
+    assert status["max_wait_ms"] >= 150                  # waited out the 0.2 s pool_timeout
+
+
+def test_read_routes_use_the_read_router(client, databases, monkeypatch):
+    router = ReadRouter(databases["primary"], databases["replica"], max_lag_s=30)
+    _insert(databases["replica"], _fraud_row(), _fraud_row())
+    router.check()                                 # primary is empty: nothing missing
+    monkeypatch.setattr(session_module, "_read_router", router)
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+
+    assert client.get("/v1/metrics").json()["fraud_predictions"] == 2
+    data = client.get("/v1/metrics/db").json()
+    assert data["replica"]["state"] == "ok" and data["replica"]["replica_reads"] == 1
+    assert data["engines"][0]["name"] == "primary"
+
+
+def test_db_metrics_without_replica(client):
+    data = client.get("/v1/metrics/db").json()
+    assert data["replica"] is None
+    assert [e["name"] for e in data["engines"]] == ["primary"]
@@ -0,0 +1,118 @@
+"""
+tests/test_score.py — Tests for the offline bulk scoring CLI (python -m app.score).
+"""
+import json
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.score as score
+from app.db.models import AnomalyPrediction
+
+from tests.conftest import TestingSessionLocal, engine
+
+FRAUD_HEADER = "transaction_amount,merchant_type,country,time_delta,device_type\n"
+
+
+def _write_fraud_csv(path, n: int, bad_every: int = 0) -> None:
+    with open(path, "w") as f:
+        f.write(FRAUD_HEADER)
+        for i in range(1, n + 1):
+            amount = -1 if bad_every and i % bad_every == 0 else 10 + i
+            f.write(f"{amount},retail,US,{i % 48},mobile\n")
+
+
+def _read_ndjson(path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_text_chunks_are_newline_aligned(tmp_path):
+    path = tmp_path / "in.ndjson"
+    path.write_bytes(b"".join(b'{"x": %d}\n' % i for i in range(1000)))
+    chunks = list(score.text_chunks(str(path), 0, 256))
+    assert len(chunks) > 10
+    data = path.read_bytes()
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start and data[end - 1:end] == b"\n"
+
+
+def test_csv_to_ndjson_keeps_order_and_reports_errors(tmp_path):
+    src, out = tmp_path / "tx.csv", tmp_path / "scores.ndjson"
+    _write_fraud_csv(src, 300, bad_every=50)
+    summary = score.run("fraud", str(src), output_path=str(out), workers=2, chunk_mb=0.001)
+
+    assert summary["rows"] == 300 and summary["errors"] == 6 and summary["scored"] == 294
+    assert summary["rows_per_s"] > 0
+    lines = _read_ndjson(out)
+    assert [line["row"] for line in lines] == list(range(1, 301))
+    assert "error" in lines[49] and "greater than 0" in lines[49]["error"]
+    assert 0.0 <= lines[0]["fraud_probability"] <= 1.0
+    assert lines[0]["model_version"].startswith("fraud-")
+
+
+def test_resume_after_interruption_matches_full_run(tmp_path, monkeypatch):
+    src = tmp_path / "tx.csv"
+    _write_fraud_csv(src, 400, bad_every=70)
+    full, partial = tmp_path / "full.csv", tmp_path / "partial.csv"
+    score.run("fraud", str(src), output_path=str(full), workers=1, chunk_mb=0.001)
+
+    save = score._save_checkpoint
+    calls = {"n": 0}
+
+    def crash_after_three(path, state):
+        save(path, state)
+        calls["n"] += 1
+        if calls["n"] == 3:
+            with open(partial, "ab") as f:     # a half-written chunk past the checkpoint
+                f.write(b"999,0.5,garbage")
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(score, "_save_checkpoint", crash_after_three)
+    with pytest.raises(KeyboardInterrupt):
+        score.run("fraud", str(src), output_path=str(partial), workers=1, chunk_mb=0.001)
+    monkeypatch.setattr(score, "_save_checkpoint", save)
+
+    summary = score.run("fraud", str(src), output_path=str(partial), workers=1,
+                        chunk_mb=0.001, resume=True)
+    assert summary["rows"] == 400 and summary["rows_this_run"] < 400
+    assert partial.read_bytes() == full.read_bytes()
+
+
+def test_resume_rejects_checkpoint_for_other_input(tmp_path):
+    src, out = tmp_path / "tx.csv", tmp_path / "scores.ndjson"
+    _write_fraud_csv(src, 10)
+    score.run("fraud", str(src), output_path=str(out), workers=1)
+    _write_fraud_csv(src, 20)
+    with pytest.raises(ValueError, match="does not match"):
+        score.run("fraud", str(src), output_path=str(out), workers=1, resume=True)
+
+
+def test_ndjson_bulk_insert_into_db(tmp_path):
+    from app.db.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    src = tmp_path / "metrics.ndjson"
+    with open(src, "w") as f:
+        for i in range(120):
+            f.write(json.dumps({"response_time": 100 + i, "error_rate": 0.01,
+                                "cpu_usage": 40.0, "memory_usage": 50.0}) + "\n")
+
+    with TestingSessionLocal() as db:
+        before = db.scalar(select(func.count()).select_from(AnomalyPrediction))
+    summary = score.run("anomaly", str(src), to_db=True, workers=2, chunk_mb=0.001,
+                        checkpoint_path=str(tmp_path / "db.ckpt"),
+                        session_factory=TestingSessionLocal)
+    with TestingSessionLocal() as db:
+        after = db.scalar(select(func.count()).select_from(AnomalyPrediction))
+    assert summary["scored"] == 120
+    assert after - before == 120
+
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    with pytest.raises(ValueError, match="does not match"):
+        score.run("anomaly", str(src), to_db=True, workers=1, resume=True,
+                  checkpoint_path=str(tmp_path / "db.ckpt"),
+                  session_factory=sessionmaker(bind=other))
+    other.dispose()
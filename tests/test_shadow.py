@@ -0,0 +1,123 @@
+"""
+tests/test_shadow.py — Tests for canary routing, shadow scoring and GET /v1/metrics/shadow.
+"""
+import joblib
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.shadow as shadow
+from app.config import settings
+from app.db.models import Base
+from app.db.session import get_db, get_read_db
+from app.main import app
+from app.models.loader import ModelLoader, get_model_loader
+from app.shadow import ShadowScorer
+
+from tests.conftest import TestingSessionLocal
+
+FRAUD_INPUTS = (2500.0, "electronics", "US", 5.2, "mobile", None)
+ANOMALY_INPUTS = (950.0, 0.12, 91.0, 87.0)
+
+
+@pytest.fixture(scope="module")
+def candidate_paths(tmp_path_factory):
+    """Copies of the primary artifacts re-tagged as candidate versions."""
+    out = {}
+    for kind, path in (("fraud", settings.FRAUD_MODEL_PATH),
+                       ("anomaly", settings.ANOMALY_MODEL_PATH)):
+        artifact = joblib.load(path)
+        artifact["metadata"] = {**artifact["metadata"], "model_version": f"{kind}-v9.9.9-rc"}
+        out[kind] = str(tmp_path_factory.mktemp("candidates") / f"{kind}.pkl")
+        joblib.dump(artifact, out[kind])
+    return out
+
+
+@pytest.fixture
+def loader(candidate_paths):
+    loader = ModelLoader()
+    for kind, path in candidate_paths.items():
+        loader.load_variant(kind, "canary", path)
+        loader.load_variant(kind, "shadow", path)
+    return loader
+
+
+def test_route_respects_canary_percent(loader, monkeypatch):
+    monkeypatch.setattr(settings, "FRAUD_CANARY_PERCENT", 0.0)
+    assert {loader.route("fraud") for _ in range(50)} == {"primary"}
+    monkeypatch.setattr(settings, "FRAUD_CANARY_PERCENT", 100.0)
+    assert {loader.route("fraud") for _ in range(50)} == {"canary"}
+
+    monkeypatch.setattr(settings, "FRAUD_CANARY_PERCENT", 30.0)
+    routed = [loader.route("fraud", f"card-{i}") for i in range(2000)]
+    assert routed == [loader.route("fraud", f"card-{i}") for i in range(2000)]   # sticky
+    assert 0.25 < routed.count("canary") / len(routed) < 0.35
+
+
+def test_route_without_canary_is_primary(monkeypatch):
+    monkeypatch.setattr(settings, "ANOMALY_CANARY_PERCENT", 100.0)
+    assert not get_model_loader().has_variant("anomaly", "canary")
+    assert get_model_loader().route("anomaly") == "primary"
+
+
+def test_canary_scores_with_its_own_version(loader):
+    prob, version = loader.predict_fraud(*FRAUD_INPUTS[:5], variant="canary")
+    primary_prob, primary_version = loader.predict_fraud(*FRAUD_INPUTS[:5])
+    assert version == "fraud-v9.9.9-rc" and primary_version != version
+    assert prob == pytest.approx(primary_prob)
+
+
+def test_shadow_queue_drops_when_full(loader):
+    scorer = ShadowScorer(loader, TestingSessionLocal, queue_size=2, batch_size=8)
+    results = [scorer.submit("anomaly", ANOMALY_INPUTS, 0.5, "anomaly-v1.0.0", 1.0)
+               for _ in range(3)]
+    assert results == [True, True, False]
+    stats = scorer.stats()
+    assert stats["submitted"] == 2 and stats["dropped"] == 1 and stats["queue_depth"] == 2
+
+
+def test_shadow_scorer_persists_and_metrics_summarise(client, loader, tmp_path, monkeypatch):
+    # File-backed DB: the scorer thread and the request thread must see the same data
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'shadow.db'}",
+                                connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=file_engine)
+    FileSession = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+
+    def file_db():
+        with FileSession() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, file_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, file_db)
+    scorer = ShadowScorer(loader, FileSession, queue_size=100, batch_size=16)
+    for _ in range(5):
+        scorer.submit("fraud", FRAUD_INPUTS, 0.25, "fraud-v1.0.0", 2.0)
+        scorer.submit("anomaly", ANOMALY_INPUTS, 0.5, "anomaly-v1.0.0", 3.0)
+    scorer.start()
+    scorer.stop()                       # drains the queue before returning
+    assert scorer.stats()["processed"] == 10
+
+    monkeypatch.setattr(shadow, "_shadow_scorer", scorer)
+    data = client.get("/v1/metrics/shadow").json()
+    assert data["queue"]["processed"] == 10
+    by_kind = {m["kind"]: m for m in data["models"]}
+    assert by_kind["fraud"]["samples"] == 5
+    assert by_kind["fraud"]["primary_model_version"] == "fraud-v1.0.0"
+    assert by_kind["fraud"]["mean_delta"] == pytest.approx(
+        by_kind["fraud"]["avg_score"] - 0.25, abs=1e-3)
+    assert by_kind["anomaly"]["avg_primary_latency_ms"] == 3.0
+
+
+def test_predict_route_submits_to_shadow(client, loader, monkeypatch):
+    scorer = ShadowScorer(loader, TestingSessionLocal, queue_size=100, batch_size=16)
+    monkeypatch.setattr(shadow, "_shadow_scorer", scorer)
+    response = client.post("/v1/anomaly/predict", json=dict(zip(
+        ["response_time", "error_rate", "cpu_usage", "memory_usage"], ANOMALY_INPUTS)))
+    assert response.status_code == 200
+    assert scorer.stats()["submitted"] == 1
+
+
+def test_metrics_shadow_without_scorer(client):
+    data = client.get("/v1/metrics/shadow").json()
+    assert data["queue"] is None
+    assert isinstance(data["models"], list)
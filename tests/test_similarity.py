@@ -0,0 +1,100 @@
+"""
+tests/test_similarity.py — Tests for the similar-anomaly index and ?similar=k.
+"""
+import numpy as np
+
+from app.similarity import AnomalyIndex
+
+ANOMALOUS = {
+    "response_time": 2000.0,
+    "error_rate": 0.80,
+    "cpu_usage": 98.0,
+    "memory_usage": 97.0,
+}
+
+
+def _index(**overrides) -> AnomalyIndex:
+    kwargs = dict(model_version="anomaly-test", max_points=1000, rebuild_ratio=0.5,
+                  min_rebuild_delta=8)
+    kwargs.update(overrides)
+    return AnomalyIndex(**kwargs)
+
+
+def _brute_force(points, ids, query, k):
+    d = np.sqrt(((points - query) ** 2).sum(axis=1))
+    order = np.argsort(d, kind="stable")[:k]
+    return [(int(ids[j]), float(d[j])) for j in order]
+
+
+def test_query_matches_brute_force_across_base_and_delta():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(300, 4))
+    ids = np.arange(300)
+    index = _index(min_rebuild_delta=10_000)
+    index.bulk_load(ids[:250], points[:250])
+    for i in range(250, 300):
+        index.add(int(ids[i]), points[i])
+    q = rng.normal(size=4)
+    assert index.query(q, 5) == _brute_force(points, ids, q, 5)
+
+
+def test_rebuild_folds_delta_into_tree():
+    rng = np.random.default_rng(1)
+    points = rng.normal(size=(40, 4))
+    index = _index(min_rebuild_delta=10_000)
+    for i, p in enumerate(points):
+        index.add(i, p)
+    index.rebuild()
+    assert index.stats()["delta"] == 0 and len(index) == 40
+    assert index.query(points[7], 1)[0][0] == 7
+
+
+def test_queries_do_not_wait_for_writers():
+    rng = np.random.default_rng(3)
+    points = rng.normal(size=(60, 4))
+    index = _index(min_rebuild_delta=10_000)
+    index.bulk_load(np.arange(30), points[:30])
+    for i in range(30, 50):
+        index.add(i, points[i])
+    with index._lock:                               # a writer holds the lock
+        assert index.query(points[40], 1) == [(40, 0.0)]
+    view = index._view
+    for i in range(50, 60):                         # appends and a rebuild after the read
+        index.add(i, points[i])
+    index.rebuild()
+    assert list(view.delta_ids[:view.n_delta]) == list(range(30, 50))
+    assert index.query(points[55], 1) == [(55, 0.0)]
+
+
+def test_max_points_keeps_most_recent():
+    index = _index(max_points=10)
+    index.bulk_load(np.arange(20), np.arange(80, dtype=float).reshape(20, 4))
+    assert len(index) == 10
+    assert index.query(np.zeros(4), 1)[0][0] == 10
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(2)
+    points = rng.normal(size=(20, 4))
+    index = _index()
+    index.bulk_load(np.arange(20), points)
+    path = str(tmp_path / "index.pkl")
+    index.save(path)
+
+    assert _index().load(path)
+    assert not _index(model_version="anomaly-other").load(path)
+
+
+def test_predict_similar_returns_indexed_neighbours(client):
+    first = client.post("/v1/anomaly/predict", json=ANOMALOUS).json()
+    assert first["similar"] is None
+
+    data = client.post("/v1/anomaly/predict?similar=3", json=ANOMALOUS).json()
+    assert 1 <= len(data["similar"]) <= 3
+    assert data["similar"][0]["distance"] == 0.0
+    assert data["similar"][0]["id"] > 0
+
+
+def test_predict_similar_out_of_range_returns_422(client):
+    response = client.post("/v1/anomaly/predict?similar=-1", json=ANOMALOUS)
+    assert response.status_code == 422
@@ -0,0 +1,207 @@
+"""
+tests/test_sinks.py — Tests for the prediction sinks, segment compaction and unflushed metrics.
+"""
+import glob
+import os
+import shutil
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.similarity as similarity
+import app.sinks as sinks
+from app.db.models import AnomalyPrediction, Base, FraudPrediction, SegmentLoad
+from app.db.session import get_db, get_read_db
+from app.main import app
+from app.models.loader import get_model_loader
+from app.similarity import AnomalyIndex
+from app.sinks import SegmentLogSink, read_segment
+
+FRAUD = {"transaction_amount": 2500.0, "merchant_type": "electronics", "country": "US",
+         "time_delta": 5.2, "device_type": "mobile"}
+ANOMALY = {"response_time": 950.0, "error_rate": 0.12, "cpu_usage": 91.0, "memory_usage": 87.0}
+
+
+def _fraud_row(score: float, latency_ms: float = 1.0, **overrides) -> dict:
+    return {**FRAUD, "fraud_probability": score, "model_version": "fraud-v1.0.0",
+            "latency_ms": latency_ms, **overrides}
+
+
+def _anomaly_row(score: float, latency_ms: float = 1.0) -> dict:
+    return {**ANOMALY, "anomaly_score": score, "model_version": "anomaly-v1.0.0",
+            "latency_ms": latency_ms}
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sink.db'}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def _sink(tmp_path, Session, **kwargs) -> SegmentLogSink:
+    return SegmentLogSink(str(tmp_path / "segments"), Session,
+                          max_bytes=kwargs.get("max_bytes", 1 << 20), max_age_s=60,
+                          compact_interval_s=60, batch_rows=kwargs.get("batch_rows", 3))
+
+
+def _count(Session, table) -> int:
+    with Session() as db:
+        return db.scalar(select(func.count(table.id)))
+
+
+def test_segment_sink_defers_writes_until_compaction(tmp_path, Session, monkeypatch):
+    index = AnomalyIndex(get_model_loader().model_version("anomaly"), max_points=100,
+                         rebuild_ratio=0.5)
+    monkeypatch.setattr(similarity, "_anomaly_index", index)
+    sink = _sink(tmp_path, Session)
+    with Session() as db:
+        assert sink.write(db, "fraud", [_fraud_row(0.1 * i) for i in range(5)]) is None
+        assert sink.write(db, "anomaly", [_anomaly_row(0.9)], similar=[True]) is None
+        assert _count(Session, FraudPrediction) == 0
+        assert sink.unflushed() == {"fraud": (5, 5.0, pytest.approx(1.0)),
+                                    "anomaly": (1, 1.0, 0.9)}
+
+    records = read_segment(glob.glob(str(tmp_path / "segments" / "fraud-*.open"))[0])
+    assert records["merchant_type"][0] == b"electronics" and len(records) == 5
+
+    sink.seal()
+    assert sink.compact() == 6
+    assert len(index) == 1                             # indexed once it has a database id
+    assert glob.glob(str(tmp_path / "segments" / "*")) == []
+    with Session() as db:
+        rows = db.scalars(select(FraudPrediction).order_by(FraudPrediction.id)).all()
+        assert [r.fraud_probability for r in rows] == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4])
+        assert rows[0].country == "US" and rows[0].created_at is not None
+        assert db.scalar(select(func.count()).select_from(SegmentLoad)) == 2
+        assert sink.unflushed() == {}
+    assert sink.stats()["compacted_rows"] == 6
+
+
+def test_segments_rotate_by_size(tmp_path, Session):
+    sink = _sink(tmp_path, Session, max_bytes=1024)
+    with Session() as db:
+        for i in range(20):
+            sink.write(db, "anomaly", [_anomaly_row(0.5)])
+    assert sink.stats()["sealed_segments"] >= 2
+    sink.stop()
+    assert _count(Session, AnomalyPrediction) == 20
+
+
+def test_already_loaded_segment_is_not_loaded_twice(tmp_path, Session):
+    sink = _sink(tmp_path, Session)
+    with Session() as db:
+        sink.write(db, "fraud", [_fraud_row(0.5)] * 4)
+    sink.seal()
+    (segment,) = glob.glob(str(tmp_path / "segments" / "*.seg"))
+    shutil.copy(segment, tmp_path / "copy.seg")
+    sink.compact()
+
+    # crash between commit and delete: the loaded segment is still on disk
+    shutil.copy(tmp_path / "copy.seg", segment)
+    assert sink.compact() == 0
+    assert not os.path.exists(segment)
+    assert _count(Session, FraudPrediction) == 4
+    assert sink.stats()["skipped_segments"] == 1
+
+
+def test_segment_loaded_elsewhere_leaves_no_cached_totals(tmp_path, Session):
+    sink = _sink(tmp_path, Session)
+    with Session() as db:
+        sink.write(db, "fraud", [_fraud_row(0.5)] * 2)
+        sink.seal()
+        assert sink.unflushed()["fraud"][0] == 2
+        assert len(sink._segment_totals) == 1
+
+        other = _sink(tmp_path, Session)           # another process compacts the segment
+        assert other.compact() == 2
+        assert sink.unflushed() == {}
+        assert sink._segment_totals == {}
+
+
+def test_unflushed_reads_only_records_it_has_not_summed(tmp_path, Session, monkeypatch):
+    sink = _sink(tmp_path, Session)
+    other = _sink(tmp_path, Session)               # a second writer on the same directory
+    other._seq = 1000                              # same pid here: keep segment names apart
+    with Session() as db:
+        sink.write(db, "fraud", [_fraud_row(0.5)] * 2)
+        other.write(db, "fraud", [_fraud_row(0.25)] * 2)
+        assert sink.unflushed() == {"fraud": (4, 4.0, 1.5)}
+        other.write(db, "fraud", [_fraud_row(0.25)] * 3)
+
+        read = sinks.read_segment
+        lengths = []
+
+        def counting_read(path):
+            records = read(path)
+            lengths.append(len(records))
+            return records
+
+        monkeypatch.setattr(sinks, "read_segment", counting_read)
+        assert sink.unflushed() == {"fraud": (7, 7.0, 2.25)}
+        # our own active segment comes from running totals; the other one is mapped once
+        assert lengths == [5] and sink._segment_totals[next(iter(sink._segment_totals))][0] == 5
+
+        sink.seal()                                # sealed here: totals handed over, no read
+        other.seal()                               # sealed elsewhere: mapped once more, then cached
+        assert sink.unflushed() == {"fraud": (7, 7.0, 2.25)} and len(lengths) == 2
+        assert sink.unflushed() == {"fraud": (7, 7.0, 2.25)} and len(lengths) == 2
+
+
+def test_open_segment_is_recovered_without_torn_tail(tmp_path, Session):
+    sink = _sink(tmp_path, Session)
+    with Session() as db:
+        sink.write(db, "fraud", [_fraud_row(0.5)] * 3)
+    (path,) = glob.glob(str(tmp_path / "segments" / "*.open"))
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 17)                     # half-written record
+
+    restarted = _sink(tmp_path, Session)           # same pid, new sink: previous one is gone
+    assert len(read_segment(path.replace(".open", ".seg"))) == 3
+    assert restarted.compact() == 3
+
+
+def test_long_strings_fall_back_to_sql(tmp_path, Session):
+    sink = _sink(tmp_path, Session)
+    with Session() as db:
+        ids = sink.write(db, "fraud", [_fraud_row(0.5, merchant_type="m" * 40)])
+    assert ids and _count(Session, FraudPrediction) == 1
+    assert sink.stats()["sql_fallback_rows"] == 1
+
+
+def test_metrics_include_unflushed_segments(client, tmp_path, Session, monkeypatch):
+    def file_db():
+        with Session() as db:
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, file_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, file_db)
+    sink = _sink(tmp_path, Session)
+    monkeypatch.setattr(sinks, "_prediction_sink", sink)
+
+    assert client.post("/v1/fraud/predict", json=FRAUD).status_code == 200
+    assert client.post("/v1/anomaly/predict-batch",
+                       json={"items": [ANOMALY, ANOMALY]}).status_code == 200
+    before = client.get("/v1/metrics").json()
+    assert _count(Session, FraudPrediction) == 0
+    assert before["unflushed_predictions"] == 3
+    assert (before["fraud_predictions"], before["anomaly_predictions"]) == (1, 2)
+    assert client.get("/v1/metrics/sink").json()["unflushed_rows"] == 3
+
+    sink.seal()
+    sink.compact()
+    after = client.get("/v1/metrics").json()
+    assert after["unflushed_predictions"] == 0
+    assert {k: v for k, v in after.items() if k != "unflushed_predictions"} == \
+        {k: v for k, v in before.items() if k != "unflushed_predictions"}
+
+    sink_stats = client.get("/v1/metrics/sink").json()
+    assert sink_stats["sink"] == "segment" and sink_stats["compacted_rows"] == 3
+
+
+def test_sql_sink_metrics(client):
+    data = client.get("/v1/metrics/sink").json()
+    assert data["sink"] == "sql" and data["unflushed_rows"] == 0
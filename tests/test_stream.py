@@ -0,0 +1,85 @@
+"""
+tests/test_stream.py — Tests for POST /v1/{kind}/score-stream.
+"""
+import json
+
+from app.config import settings
+from app.scoring import RecordError, RecordParser
+
+FRAUD_ROW = {
+    "transaction_amount": 2500.0,
+    "merchant_type": "electronics",
+    "country": "US",
+    "time_delta": 5.2,
+    "device_type": "mobile",
+}
+
+
+def _lines(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_parser_handles_lines_split_across_chunks():
+    parser = RecordParser("ndjson")
+    out = list(parser.feed(b'{"a": 1}\n{"a"'))
+    out += list(parser.feed(b': 2}\nnot json\n'))
+    out += list(parser.close())
+    assert [row for row, _ in out] == [1, 2, 3]
+    assert out[1][1] == {"a": 2}
+    assert isinstance(out[2][1], RecordError)
+
+
+def test_parser_rejects_over_long_lines_without_buffering_them():
+    parser = RecordParser("ndjson", max_line_bytes=16)
+    out = list(parser.feed(b'{"a": 1}\n{"a": "' + b"x" * 40))
+    assert len(parser._buffer) == 0
+    out += list(parser.feed(b"y" * 100))
+    out += list(parser.feed(b'"}\n{"a": 3}\n' + b"z" * 20 + b"\n"))
+    out += list(parser.close())
+    assert [row for row, _ in out] == [1, 2, 3, 4]
+    assert out[0][1] == {"a": 1} and out[2][1] == {"a": 3}
+    assert isinstance(out[1][1], RecordError) and isinstance(out[3][1], RecordError)
+
+
+def test_csv_parser_uses_header_and_drops_empty_cells():
+    parser = RecordParser("csv")
+    out = list(parser.feed(b"a,b\n1,\n")) + list(parser.close())
+    assert out == [(1, {"a": "1"})]
+
+
+def test_fraud_ndjson_stream_with_inline_errors(client):
+    rows = [FRAUD_ROW, {**FRAUD_ROW, "transaction_amount": -1}, FRAUD_ROW]
+    body = "\n".join(json.dumps(r) for r in rows)
+    response = client.post("/v1/fraud/score-stream", content=body,
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = _lines(response)
+    assert [line.get("row") for line in lines[:3]] == [1, 2, 3]
+    assert 0.0 <= lines[0]["fraud_probability"] <= 1.0
+    assert "transaction_amount" in lines[1]["error"]
+    assert lines[-1]["summary"] == {**lines[-1]["summary"],
+                                    "rows": 3, "scored": 2, "errors": 1, "persisted": False}
+
+
+def test_anomaly_csv_stream_spans_multiple_blocks_and_persists(client, monkeypatch):
+    monkeypatch.setattr(settings, "SCORE_STREAM_BLOCK_SIZE", 4)
+    before = client.get("/v1/metrics").json()["anomaly_predictions"]
+    header = "response_time,error_rate,cpu_usage,memory_usage\n"
+    body = header + "".join(f"{100 + i},0.02,35,50\n" for i in range(10))
+
+    def chunks():
+        data = body.encode()
+        for i in range(0, len(data), 17):
+            yield data[i:i + 17]
+
+    response = client.post("/v1/anomaly/score-stream?persist=true", content=chunks(),
+                           headers={"Content-Type": "text/csv"})
+    lines = _lines(response)
+    assert [line["row"] for line in lines[:-1]] == list(range(1, 11))
+    assert lines[-1]["summary"]["scored"] == 10
+    after = client.get("/v1/metrics").json()["anomaly_predictions"]
+    assert after - before == 10
+
+
+def test_unknown_kind_returns_422(client):
+    assert client.post("/v1/other/score-stream", content=b"").status_code == 422
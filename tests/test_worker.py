@@ -0,0 +1,173 @@
+"""
+tests/test_worker.py — Tests for the queue backends, the scoring worker and GET /v1/metrics/queue.
+"""
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.db.models import AnomalyPrediction, Base, FraudPrediction, ScoringJob
+from app.models.loader import get_model_loader
+import app.queues as queues
+from app.queues import QueueBackend, SQLiteQueue, load_consumer_stats, open_queue
+from app.worker import ScoringWorker
+
+from tests.conftest import TestingSessionLocal, engine
+
+FRAUD = {"transaction_amount": 2500.0, "merchant_type": "electronics", "country": "US",
+         "time_delta": 5.2, "device_type": "mobile"}
+ANOMALY = {"response_time": 950.0, "error_rate": 0.12, "cpu_usage": 91.0, "memory_usage": 87.0}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = SQLiteQueue(str(tmp_path / "queue.db"), consumer="test", visibility_timeout_s=60)
+    yield q
+    q.close()
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    with TestingSessionLocal() as session:
+        yield session
+
+
+def _count(db, column) -> int:
+    return db.scalar(select(func.count(column)))
+
+
+def _worker(queue, **kwargs) -> ScoringWorker:
+    return ScoringWorker(queue, TestingSessionLocal, get_model_loader(),
+                         batch_size=kwargs.get("batch_size", 4),
+                         prefetch=kwargs.get("prefetch", 8), consumer="test",
+                         stats_dir=kwargs.get("stats_dir", ""))
+
+
+def test_sqlite_queue_claims_acks_and_redelivers(tmp_path):
+    q = SQLiteQueue(str(tmp_path / "q.db"), visibility_timeout_s=0.2)
+    ids = q.publish([{"n": i} for i in range(5)])
+    first = q.fetch(3, block_ms=0)
+    assert [m for m, _ in first] == ids[:3] and first[0][1] == {"n": 0}
+    assert [m for m, _ in q.fetch(10, block_ms=0)] == ids[3:]      # claimed ones are skipped
+    assert q.fetch(10, block_ms=0) == []
+
+    q.ack(ids[:3])
+    assert q.lag()["backlog"] == 2
+    threading.Event().wait(0.25)                                      # visibility timeout
+    assert [m for m, _ in q.fetch(10, block_ms=0)] == ids[3:]        # unacked: redelivered
+    q.close()
+
+
+def test_worker_scores_mixed_batches_and_acks(queue, db):
+    fraud_before = _count(db, FraudPrediction.id)
+    anomaly_before = _count(db, AnomalyPrediction.id)
+    queue.publish([{"job_id": f"w1-f{i}", "kind": "fraud", "payload": FRAUD} for i in range(6)]
+                  + [{"job_id": f"w1-a{i}", "kind": "anomaly", "payload": ANOMALY}
+                     for i in range(3)])
+
+    summary = _worker(queue).run(threading.Event(), drain=True)
+    assert (summary["messages"], summary["scored"], summary["batches"]) == (9, 9, 3)
+    assert queue.lag()["backlog"] == 0
+    assert _count(db, FraudPrediction.id) == fraud_before + 6
+    assert _count(db, AnomalyPrediction.id) == anomaly_before + 3
+
+    job = db.get(ScoringJob, "w1-f0")
+    prediction = db.get(FraudPrediction, job.prediction_id)
+    assert job.status == "scored" and prediction.fraud_probability == pytest.approx(job.score)
+    assert job.model_version == get_model_loader().model_version("fraud")
+
+
+def test_redelivered_jobs_are_not_written_twice(queue, db):
+    before = _count(db, FraudPrediction.id)
+    jobs = [{"job_id": f"w2-{i}", "kind": "fraud", "payload": FRAUD} for i in range(3)]
+    worker = _worker(queue)
+    assert worker.process(list(zip(queue.publish(jobs), jobs)))
+    # the same jobs arrive again (crash between commit and ack), plus one repeat in-batch
+    assert worker.process(list(zip(queue.publish(jobs + jobs[:1]), jobs + jobs[:1])))
+    assert _count(db, FraudPrediction.id) == before + 3
+    assert worker.counters["duplicates"] == 4
+
+
+def test_invalid_jobs_are_recorded_and_acked(queue, db):
+    queue.publish([
+        {"job_id": "w3-bad-kind", "kind": "credit", "payload": FRAUD},
+        {"job_id": "w3-bad-payload", "kind": "anomaly", "payload": {**ANOMALY, "cpu_usage": 400}},
+        {"kind": "anomaly", "payload": ANOMALY},                    # job_id from the message id
+    ])
+    summary = _worker(queue).run(threading.Event(), drain=True)
+    assert (summary["invalid"], summary["scored"]) == (2, 1)
+    assert queue.lag()["backlog"] == 0
+    assert "cpu_usage" in db.get(ScoringJob, "w3-bad-payload").error
+    assert db.scalar(select(func.count()).where(ScoringJob.job_id.like("sqlite:%"))) >= 1
+
+
+def test_failed_batch_is_left_for_redelivery(queue):
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    worker = ScoringWorker(queue, broken_session, get_model_loader(), 4, 8, "test")
+    queue.publish([{"job_id": "w4", "kind": "anomaly", "payload": ANOMALY}])
+    assert worker.process(queue.fetch(8, block_ms=0)) is False
+    assert worker.counters["failed_batches"] == 1
+    assert queue.lag()["backlog"] == 1
+
+
+def test_queue_metrics_report_lag_and_consumers(client, tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'metrics-queue.db'}"
+    monkeypatch.setattr(settings, "QUEUE_URL", url)
+    monkeypatch.setattr(settings, "WORKER_STATS_DIR", str(tmp_path / "stats"))
+    q = open_queue(url)
+    q.publish([{"job_id": f"w5-{i}", "kind": "anomaly", "payload": ANOMALY} for i in range(5)])
+    worker = _worker(q, prefetch=2, stats_dir=str(tmp_path / "stats"))
+    worker.process(q.fetch(2, block_ms=0))
+    worker.write_stats()
+    q.close()
+
+    assert [s["consumer"] for s in load_consumer_stats()] == ["test"]
+    data = client.get("/v1/metrics/queue").json()
+    assert data["backend"] == "sqlite" and data["backlog"] == 3
+    assert data["oldest_age_s"] >= 0
+    assert data["consumers"][0]["scored"] == 2
+
+
+def test_queue_metrics_survive_an_unavailable_backend(client, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_URL", "redis://127.0.0.1:1/0")
+
+    def unreachable(url, consumer="local", create_group=True):
+        assert not create_group                   # the metrics path never creates groups
+        raise ValueError("Redis queues require the redis package (pip install redis)")
+
+    monkeypatch.setattr(queues, "open_queue", unreachable)
+    response = client.get("/v1/metrics/queue")
+    assert response.status_code == 200
+    assert response.json()["backlog"] is None and response.json()["oldest_age_s"] is None
+
+
+def test_lag_reader_is_shared_until_the_url_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUEUE_URL", f"sqlite:///{tmp_path / 'a.db'}")
+    first = queues.get_lag_reader()
+    assert queues.get_lag_reader() is first
+    monkeypatch.setattr(settings, "QUEUE_URL", f"sqlite:///{tmp_path / 'b.db'}")
+    assert queues.get_lag_reader() is not first
+    queues.close_lag_reader()
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class NoLag(QueueBackend):
+        def publish(self, jobs):
+            return []
+
+    with pytest.raises(TypeError):
+        NoLag()
+
+
+def test_queue_metrics_without_queue(client):
+    data = client.get("/v1/metrics/queue").json()
+    assert data["backend"] is None and data["consumers"] == []
+
+
+def test_open_queue_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        open_queue("amqp://localhost")